@@ -1 +1 @@
-from .agent import get_agent, get_chat_response
\ No newline at end of file
+from .agent import get_agent, get_chat_response, stream_chat_response, warm_agents, reset_agents
\ No newline at end of file
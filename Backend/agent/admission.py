@@ -0,0 +1,192 @@
+import asyncio
+import contextlib
+import os
+from collections import Counter, deque
+from utils.metrics import Counter as MetricCounter, Gauge, Histogram
+
+
+# Agent graph runs (chat turns that reach the LLM) allowed at once in this process
+CHAT_CONCURRENCY = int(os.getenv("CHAT_CONCURRENCY", "32"))
+# Per-role caps, e.g. "user=24,admin=16"; a role without one is only held to CHAT_CONCURRENCY.
+# Capping bulk user traffic below the global limit keeps room for operational turns.
+CHAT_ROLE_LIMITS = os.getenv("CHAT_ROLE_LIMITS", "user=24")
+# Turns allowed to wait for a slot before new ones are refused with a 429
+CHAT_QUEUE_LIMIT = int(os.getenv("CHAT_QUEUE_LIMIT", "64"))
+# Seconds a turn may wait for a slot before it is refused with a 503
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "15"))
+# Seconds of waiting that make up for one priority level, so queued user turns aren't starved
+CHAT_AGING_SECONDS = float(os.getenv("CHAT_AGING_SECONDS", "5"))
+# Seconds a refused client is told to wait before retrying
+CHAT_RETRY_AFTER = int(os.getenv("CHAT_RETRY_AFTER", "2"))
+
+# Lower runs first
+ROLE_PRIORITY = {"super_admin": 0, "admin": 1, "user": 2}
+
+QUEUE_DEPTH = Gauge("chat_queue_depth", "Chat turns waiting for an agent slot", ["role"])
+RUNNING = Gauge("chat_running", "Chat turns running the agent graph", ["role"])
+QUEUE_WAIT = Histogram("chat_queue_wait_seconds", "Time chat turns waited for an agent slot", ["role"])
+ADMISSIONS = MetricCounter("chat_admission_total", "Chat turns by admission outcome", ["role", "outcome"])
+
+
+def _parse_limits(value: str) -> dict:
+    limits = {}
+    for item in value.split(","):
+        role, _, limit = item.partition("=")
+        if role.strip() and limit.strip():
+            limits[role.strip()] = int(limit)
+    return limits
+
+
+class AdmissionRejected(Exception):
+    """Raised when a chat turn can't get an agent slot; carries the HTTP status and Retry-After to send."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int = CHAT_RETRY_AFTER):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("role", "key", "enqueued", "future")
+
+    def __init__(self, role, key, enqueued, future):
+        self.role = role
+        self.key = key
+        self.enqueued = enqueued
+        self.future = future
+
+
+class Scheduler:
+    """
+    Admission control for agent graph runs.
+
+    A turn runs at once while the global and its role's caps allow it; otherwise it
+    waits in a bounded queue. When the queue is full, a turn that ranks ahead of the
+    last one in line takes its place and that one is refused instead. Freed slots go to
+    the waiter with the lowest priority * aging + enqueue time, i.e. by role priority,
+    with every `aging` seconds of waiting worth one priority level. Since that key only grows with enqueue time
+    within a role, each role's queue is a plain FIFO and picking the next turn only
+    compares the heads. Runs on the event loop, so no locking is needed.
+
+    Args:
+        concurrency (int): Turns running at once across roles.
+        role_limits (dict): Role -> turns of that role running at once.
+        queue_limit (int): Turns allowed to wait; more are refused with a 429.
+        queue_timeout (float): Seconds a turn may wait; then it is refused with a 503.
+        aging (float): Seconds of waiting worth one priority level.
+    """
+
+    def __init__(self, concurrency=CHAT_CONCURRENCY, role_limits=None, queue_limit=CHAT_QUEUE_LIMIT,
+                 queue_timeout=CHAT_QUEUE_TIMEOUT, aging=CHAT_AGING_SECONDS):
+        self.concurrency = concurrency
+        self.role_limits = _parse_limits(CHAT_ROLE_LIMITS) if role_limits is None else dict(role_limits)
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self.aging = aging
+        self.running = 0
+        self._running = Counter()
+        self._queues = {}
+        self.waiting = 0
+
+    def _can_run(self, role) -> bool:
+        return self.running < self.concurrency and self._running[role] < self.role_limits.get(role, self.concurrency)
+
+    def _start(self, role):
+        self.running += 1
+        self._running[role] += 1
+        RUNNING.inc(role=role)
+
+    def _dequeue(self, waiter):
+        self._queues[waiter.role].remove(waiter)
+        self.waiting -= 1
+        QUEUE_DEPTH.dec(role=waiter.role)
+
+    def release(self, role):
+        self.running -= 1
+        self._running[role] -= 1
+        RUNNING.dec(role=role)
+        self._dispatch()
+
+    def _dispatch(self):
+        # Hand freed slots to waiters. Afterwards anyone still waiting is held by a cap,
+        # which is why acquire() can let a turn in without looking at the queue.
+        while self.running < self.concurrency:
+            best = None
+            for role, queue in self._queues.items():
+                if queue and self._can_run(role) and (best is None or queue[0].key < best.key):
+                    best = queue[0]
+            if best is None:
+                return
+            self._dequeue(best)
+            self._start(best.role)
+            best.future.set_result(None)
+
+    async def acquire(self, role: str):
+        """
+        Waits for an agent slot for a turn of the given role; pair with `release`.
+
+        Raises:
+            AdmissionRejected: 429 if the queue is full (or the turn was pushed out of it by
+                a higher-priority one), 503 if no slot freed up in time.
+        """
+        if self._can_run(role):
+            self._start(role)
+            ADMISSIONS.inc(role=role, outcome="admitted")
+            QUEUE_WAIT.observe(0, role=role)
+            return
+        loop = asyncio.get_running_loop()
+        enqueued = loop.time()
+        waiter = _Waiter(role, ROLE_PRIORITY.get(role, max(ROLE_PRIORITY.values())) * self.aging + enqueued, enqueued, loop.create_future())
+        if self.waiting >= self.queue_limit:
+            # Each role's queue is ordered by key, so the last in line is one of the tails
+            last = max((queue[-1] for queue in self._queues.values() if queue), key=lambda w: w.key, default=None)
+            if last is None or last.key <= waiter.key:
+                ADMISSIONS.inc(role=role, outcome="queue_full")
+                raise AdmissionRejected(429, "Too many chat requests are waiting, please retry")
+            self._dequeue(last)
+            last.future.set_exception(AdmissionRejected(429, "Too many chat requests are waiting, please retry"))
+        self._queues.setdefault(role, deque()).append(waiter)
+        self.waiting += 1
+        QUEUE_DEPTH.inc(role=role)
+        try:
+            await asyncio.wait({waiter.future}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # The client went away; give back a slot that was granted in the meantime
+            if waiter.future.done():
+                if waiter.future.exception() is None:
+                    self.release(role)
+            else:
+                self._dequeue(waiter)
+                waiter.future.cancel()
+            ADMISSIONS.inc(role=role, outcome="cancelled")
+            raise
+        QUEUE_WAIT.observe(loop.time() - enqueued, role=role)
+        if not waiter.future.done():
+            self._dequeue(waiter)
+            waiter.future.cancel()
+            ADMISSIONS.inc(role=role, outcome="timeout")
+            raise AdmissionRejected(503, "The assistant is busy, please retry")
+        if waiter.future.exception() is not None:
+            ADMISSIONS.inc(role=role, outcome="shed")
+            raise waiter.future.exception()
+        ADMISSIONS.inc(role=role, outcome="admitted")
+
+    @contextlib.asynccontextmanager
+    async def slot(self, role: str):
+        """Holds an agent slot for the body of the `async with` block."""
+        await self.acquire(role)
+        try:
+            yield
+        finally:
+            self.release(role)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "by_role": {role: {"running": self._running[role], "waiting": len(queue)} for role, queue in self._queues.items()},
+        }
+
+
+scheduler = Scheduler()
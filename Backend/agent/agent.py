@@ -1,21 +1,40 @@
-from utils import llm, State, config
-from langgraph.checkpoint.memory import MemorySaver
+import logging
+import threading
+import time
+from utils import get_llm, invoke_llm, State
 from langgraph.graph import StateGraph, START, END
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from agent.tools.database import  place_request_for_equipment, place_request_for_project, get_details, add_new_equipment, add_new_labour, approve_or_reject_project, remove_equipment, remove_labour, remove_project
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from agent.tools.database import  place_request_for_equipment, place_bulk_request_for_equipment, check_equipment_availability, estimate_project_cost, find_labour, place_request_for_project, get_details, add_new_equipment, add_new_labour, approve_or_reject_project, remove_equipment, remove_labour, remove_project
 from langgraph.prebuilt import ToolNode
 from schema import ChatRequest
+from agent.checkpointer import checkpointer, thread_key
+from agent.context import fit_to_budget, token_budget, track_context
+from agent.tools.concurrency import limit_tool_concurrency
+from agent.router import router
+from agent.admission import scheduler
+from utils.metrics import metrics_callbacks, trace_id
 
-memory=MemorySaver()
+logger = logging.getLogger(__name__)
 
+ROLES = ("super_admin", "admin", "user")
 
-def get_agent(role:str):
+# Compiled graphs keyed by role, see get_agent, and the chat model they were built with
+_agents = {}
+_agents_llm = None
+_agents_lock = threading.Lock()
+
+
+def _role_config(role:str):
+    """Returns the tool list and prompt messages for the given role."""
     if role == "super_admin":
         tools = [
             get_details,
             place_request_for_project,
             place_request_for_equipment,
+            place_bulk_request_for_equipment,
+            check_equipment_availability,
+            estimate_project_cost,
+            find_labour,
             add_new_equipment,
             add_new_labour,
             approve_or_reject_project,
@@ -28,6 +47,10 @@ def get_agent(role:str):
                 ("system", """You are the AI Assistant for Rise Construction. Rise Construction is a construction company that provides services like get_details – View details of equipment, labor, and projects.
                         place_request_for_project – Submit a request for a project.
                         place_request_for_equipment – Submit a request for equipment.
+                        place_bulk_request_for_equipment – Submit one request for several equipment items.
+                        check_equipment_availability – Check how many units of equipment are free for given dates.
+                        estimate_project_cost – Estimate a project's cost and its likely range from past projects.
+                        find_labour – Find available workers by skill, or assemble a team, within a budget.
                         add_new_equipment – Add new equipment to the system.
                         add_new_labour – Add new labor to the system.
                         approve_or_reject_project – Approve or reject project requests.
@@ -51,13 +74,17 @@ def get_agent(role:str):
                         Build trust and ensure a smooth hiring experience.
                     If you do not know the answer, do not guess.
                 """),
-                ("human", "{QUESTION}"),
+                MessagesPlaceholder("messages"),
             ]
     elif role == "admin":
         tools = [
             get_details,
             place_request_for_project,
             place_request_for_equipment,
+            place_bulk_request_for_equipment,
+            check_equipment_availability,
+            estimate_project_cost,
+            find_labour,
             add_new_equipment,
             add_new_labour,
             approve_or_reject_project
@@ -79,6 +106,8 @@ def get_agent(role:str):
                 - Place requests for projects and equipment.
                 - Add new equipment and labor to the system.
                 - Approve or reject project requests.
+                - Estimate what a project will cost from past projects.
+                - Find available workers by skill, or put together a team, within a budget.
 
             **Guidelines:**
                 - Be professional, helpful, and efficient.
@@ -89,7 +118,7 @@ def get_agent(role:str):
                 - If you do not know the answer, do not guess. Instead.  
                     
             """),
-            ("human", "{QUESTION}"),
+            MessagesPlaceholder("messages"),
         ]
 
         
@@ -98,6 +127,10 @@ def get_agent(role:str):
             get_details,
             place_request_for_project,
             place_request_for_equipment,
+            place_bulk_request_for_equipment,
+            check_equipment_availability,
+            estimate_project_cost,
+            find_labour,
         ]
         
         prompt=[
@@ -114,6 +147,8 @@ def get_agent(role:str):
             **Users Capabilities:**
                 - View details of equipment, labor, and projects.
                 - Place requests for projects and equipment.
+                - Estimate what a project will cost from past projects.
+                - Find available workers by skill, or put together a team, within a budget.
 
             **Guidelines:**
                 - Be professional, helpful, and efficient.
@@ -123,31 +158,42 @@ def get_agent(role:str):
                 - Build trust and ensure a smooth hiring experience.
                 - If you do not know the answer, do not guess.
             """),
-            ("human", "{QUESTION}"),
+            MessagesPlaceholder("messages"),
         ]
+    else:
+        raise ValueError(f"Unknown role: {role}")
+
+    return tools, prompt
+
+
+def build_agent(role:str):
+    """Builds and compiles the LangGraph agent for the given role.
+
+    This is the expensive path (tool node, graph and prompt construction plus
+    compilation); callers should go through `get_agent`, which caches the result.
+    """
+    tools, prompt = _role_config(role)
+    budget = token_budget(role)
+
     tool_node = ToolNode(tools)
 
     graph_builder = StateGraph(State)
 
-    def agent(state: State):
-        message = state["messages"]
+    # Bind the tools and compile the prompt once per role rather than on every graph step.
+    llm_with_tools=get_llm().bind_tools(tools=tools)
 
-        llm_with_tools=llm.bind_tools(tools=tools)
-        
-        chat_prompt = ChatPromptTemplate.from_messages(prompt)
+    chat_prompt = ChatPromptTemplate.from_messages(prompt)
 
+    def agent(state: State):
+        # Keep the history within the role's token budget; trimmed turns live on in the summary.
+        # Only the trimmed messages (and the summary) reach the prompt, after the role's system message.
+        messages, update = fit_to_budget(state["messages"], state.get("summary", ""), budget)
 
-        chain = (
-            {"QUESTION": RunnablePassthrough()} |
-            chat_prompt |
-            llm_with_tools
-        )
-
-        response = chain.invoke({
-            "QUESTION": message,
-        })
+        # Conversations at the same point (e.g. the same opening question) share one model call
+        response = invoke_llm(chat_prompt.invoke({"messages": messages}), llm_with_tools)
 
-        return {"messages": [response]}
+        update["messages"] = update.get("messages", []) + [response]
+        return update
 
 
     def should_continue(state: State):
@@ -168,34 +214,167 @@ def get_agent(role:str):
     graph_builder.add_edge("tools", "agent")
 
 
-    graph = graph_builder.compile(checkpointer=memory)
+    graph = graph_builder.compile(checkpointer=checkpointer)
     
     return graph
 
 
-async def get_chat_response(request: ChatRequest, thread_id: str = "1"):
+def get_agent(role:str):
+    """
+    Returns the compiled agent for the given role, building it on first use.
+
+    The graphs are rebuilt if the chat model was swapped with `utils.set_llm`.
+    """
+    global _agents_llm
+    if _agents_llm is not get_llm():
+        with _agents_lock:
+            if _agents_llm is not get_llm():
+                _agents.clear()
+                _agents_llm = get_llm()
+    graph = _agents.get(role)
+    if graph is None:
+        with _agents_lock:
+            graph = _agents.get(role)
+            if graph is None:
+                graph = build_agent(role)
+                _agents[role] = graph
+    return graph
+
+
+def warm_agents():
+    """Compiles the agents for every role up front so the first chat turn doesn't pay for it."""
+    for role in ROLES:
+        get_agent(role)
+
+
+def reset_agents():
+    """Drops the compiled agents; they are rebuilt lazily on the next `get_agent` call."""
+    with _agents_lock:
+        _agents.clear()
+
+
+async def _fast_path(graph, request: ChatRequest, config: dict):
+    """
+    Answers the message with the intent router if it can, recording the turn in the
+    conversation so later turns still see it. Returns None when the graph should run.
+    """
+    answer = await router.route(request.message)
+    if answer is None:
+        return None
+    await graph.aupdate_state(config, {"messages": [("human", request.message), ("ai", answer)]}, as_node="agent")
+    logger.info("chat trace=%s role=%s fast_path=hit router=%s", trace_id(), request.role, router.stats())
+    return answer
+
+
+async def get_chat_response(request: ChatRequest, thread_id: str = None):
     responses = []
     graph = get_agent(request.role)
+    thread_id = thread_id or thread_key(request.user_id, request.conversation_id)
+    config = {"configurable": {"thread_id": thread_id}, "callbacks": [metrics_callbacks]}
+
+    answer = await _fast_path(graph, request, config)
+    if answer is not None:
+        return answer
+
+    context_stats = track_context()
+    limit_tool_concurrency()
+
+    # Turns that need the LLM wait for a slot; raises AdmissionRejected when overloaded
+    async with scheduler.slot(request.role):
+        async for chunk in graph.astream(
+            {
+                "messages": [("human", request.message)],
+            },
+            config=config,
+            stream_mode="values",
+
+        ):
+            if chunk["messages"]:
+                responses.append(chunk["messages"][-1].content)
     
-    config = {"configurable": {"thread_id": thread_id}}
+    # Get final response
+    final_response = responses[-1] if responses else "Please Try again later"
 
+    logger.info("chat trace=%s role=%s context_tokens_saved=%d", trace_id(), request.role, context_stats.tokens_saved)
     
-    async for chunk in graph.astream(
+    return final_response
+
+
+async def stream_chat_response(request: ChatRequest, thread_id: str = None):
+    """
+    Runs the role agent and yields (event, data) pairs as the run progresses.
+
+    Events are "token" for each chunk of text generated by the agent node, "tool_start"
+    and "tool_end" around each tool call, and a final "done" carrying the full response and
+    conversation id together with the time to the first token and the total run time.
+
+    Unlike get_chat_response it doesn't wait for an agent slot; the caller admits the
+    turn first, see routes.chat.chat_stream.
+    """
+    graph = get_agent(request.role)
+    tools, _ = _role_config(request.role)
+    tool_names = {tool.name for tool in tools}
+    thread_id = thread_id or thread_key(request.user_id, request.conversation_id)
+    config = {"configurable": {"thread_id": thread_id}, "callbacks": [metrics_callbacks]}
+
+    started = time.perf_counter()
+    answer = await _fast_path(graph, request, config)
+    if answer is not None:
+        total_ms = (time.perf_counter() - started) * 1000
+        yield "token", {"content": answer}
+        yield "done", {"response": answer, "conversation_id": request.conversation_id, "ttfb_ms": total_ms, "total_ms": total_ms, "context_tokens_saved": 0}
+        return
+
+    context_stats = track_context()
+    limit_tool_concurrency()
+
+    first_token_ms = None
+    final_response = ""
+    streamed = False
+
+    async for event in graph.astream_events(
         {
             "messages": [("human", request.message)],
         },
         config=config,
-        stream_mode="values",
-        
+        version="v2",
     ):
-        if chunk["messages"]:
-            responses.append(chunk["messages"][-1].content)
-    
-    # Get final response
-    final_response = responses[-1] if responses else "Please Try again later"
-    
-    return final_response
-
-
-            
-            
+        kind = event["event"]
+        node = event.get("metadata", {}).get("langgraph_node")
+
+        # Only the agent node talks to the user; LLM calls made inside tools (get_details) are internal
+        if kind == "on_chain_start" and event["name"] == "agent" and node == "agent":
+            streamed = False
+        elif kind == "on_chat_model_stream" and node == "agent":
+            content = event["data"]["chunk"].content
+            if content:
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                streamed = True
+                yield "token", {"content": content}
+        elif kind == "on_chain_end" and event["name"] == "agent" and node == "agent":
+            final_response = event["data"]["output"]["messages"][-1].content
+            # A model call shared with another conversation streamed there; send its reply in one piece
+            if final_response and not streamed:
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                yield "token", {"content": final_response}
+        elif kind == "on_tool_start" and event["name"] in tool_names:
+            yield "tool_start", {"name": event["name"], "input": event["data"].get("input")}
+        elif kind == "on_tool_end" and event["name"] in tool_names:
+            output = event["data"].get("output")
+            yield "tool_end", {"name": event["name"], "output": getattr(output, "content", output)}
+
+    total_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        "chat stream trace=%s role=%s ttfb_ms=%s total_ms=%.1f context_tokens_saved=%d",
+        trace_id(), request.role, first_token_ms and round(first_token_ms, 1), total_ms, context_stats.tokens_saved,
+    )
+
+    yield "done", {
+        "response": final_response or "Please Try again later",
+        "conversation_id": request.conversation_id,
+        "ttfb_ms": first_token_ms,
+        "total_ms": total_ms,
+        "context_tokens_saved": context_stats.tokens_saved,
+    }
@@ -0,0 +1,363 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+from sqlalchemy import delete, select
+from sqlalchemy.engine import make_url
+from database.database import AsyncSessionLocal, DATABASE_URL
+from database.models import ChatThread
+from utils.cache import LRUCache
+
+
+logger = logging.getLogger(__name__)
+
+
+def _default_checkpoint_url() -> str:
+    """
+    Production shares the application's Postgres database. Local runs use a SQLite file
+    next to the application's SQLite database, or in the Backend directory, so the
+    location doesn't depend on the directory the server was started from.
+    """
+    url = make_url(DATABASE_URL) if DATABASE_URL else None
+    if url is not None and url.get_backend_name() == "postgresql":
+        return DATABASE_URL
+    if url is not None and url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        directory = os.path.dirname(os.path.abspath(url.database))
+    else:
+        directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return f"sqlite:///{os.path.join(directory, 'checkpoints.sqlite')}"
+
+
+CHECKPOINT_URL = os.getenv("CHECKPOINT_URL") or _default_checkpoint_url()
+# Idle conversations are deleted after this many seconds
+CHECKPOINT_TTL = float(os.getenv("CHECKPOINT_TTL", str(7 * 24 * 3600)))
+# At most this many conversations are kept; the least recently active ones go first
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "10000"))
+# Checkpoints kept per conversation; only the latest one is needed to resume it
+CHECKPOINT_MAX_PER_THREAD = int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "20"))
+CHECKPOINT_SWEEP_INTERVAL = float(os.getenv("CHECKPOINT_SWEEP_INTERVAL", "300"))
+
+# last_active is only written when it is older than this, to avoid a write per graph step
+_TOUCH_INTERVAL = 60
+
+
+def new_conversation_id() -> str:
+    """Returns a fresh, unguessable conversation id for a client that didn't send one."""
+    return uuid.uuid4().hex
+
+
+def thread_key(user_id=None, conversation_id=None) -> str:
+    """
+    Returns the checkpoint thread id of a user's conversation. Without a conversation id
+    the turn gets a thread of its own, so callers without ids never share a conversation.
+    """
+    return f"{user_id or 'anonymous'}:{conversation_id or new_conversation_id()}"
+
+
+class BoundedCheckpointer(BaseCheckpointSaver):
+    """
+    Disk-backed checkpointer with bounded growth.
+
+    Delegates storage to AsyncSqliteSaver or AsyncPostgresSaver (picked from the URL),
+    opened lazily on the event loop that first uses it. On top of that it:
+
+    - keeps at most `max_per_thread` checkpoints per conversation,
+    - records each conversation's last activity in the `chat_threads` table,
+    - periodically deletes conversations idle for longer than `ttl` and, beyond
+      `max_threads`, the least recently active ones.
+
+    Because state lives in the database, conversations survive restarts and are
+    shared by every uvicorn worker.
+    """
+
+    def __init__(
+        self,
+        url: str = CHECKPOINT_URL,
+        ttl: float = CHECKPOINT_TTL,
+        max_threads: int = CHECKPOINT_MAX_THREADS,
+        max_per_thread: int = CHECKPOINT_MAX_PER_THREAD,
+        sweep_interval: float = CHECKPOINT_SWEEP_INTERVAL,
+    ):
+        super().__init__()
+        self.url = url
+        self.ttl = ttl
+        self.max_threads = max_threads
+        self.max_per_thread = max_per_thread
+        self.sweep_interval = sweep_interval
+        self.backend = "memory" if url == "memory" else make_url(url).get_backend_name()
+        self._saver = None
+        self._resource = None
+        self._loop = None
+        self._open_lock = None
+        self._sync_lock = threading.Lock()
+        self._sync_loop = None
+        # Per-thread bookkeeping, bounded so idle threads don't accumulate in memory
+        self._last_touch = LRUCache(maxsize=max_threads)
+        self._puts = LRUCache(maxsize=max_threads)
+        self._last_sweep = 0.0
+        self._sweep_task = None
+
+    async def _get_saver(self):
+        if self._resource is not None and self._loop is not asyncio.get_running_loop() and not self._loop.is_running():
+            # Opened on a loop that has since finished (an earlier asyncio.run); its connections are unusable
+            self._saver = self._resource = self._loop = None
+        if self._saver is None:
+            if self._open_lock is None:
+                self._open_lock = asyncio.Lock()
+            async with self._open_lock:
+                if self._saver is None:
+                    self._saver = await self._open()
+                    self._loop = asyncio.get_running_loop()
+        return self._saver
+
+    async def _open(self):
+        if self.backend == "memory":
+            return MemorySaver()
+        if self.backend == "sqlite":
+            import aiosqlite
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+            conn = await aiosqlite.connect(make_url(self.url).database)
+            self._resource = conn
+            saver = AsyncSqliteSaver(conn)
+        elif self.backend == "postgresql":
+            from psycopg.rows import dict_row
+            from psycopg_pool import AsyncConnectionPool
+            from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+            conninfo = make_url(self.url).set(drivername="postgresql").render_as_string(hide_password=False)
+            pool = AsyncConnectionPool(
+                conninfo,
+                max_size=int(os.getenv("CHECKPOINT_POOL_SIZE", "10")),
+                kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+                open=False,
+            )
+            await pool.open()
+            self._resource = pool
+            saver = AsyncPostgresSaver(pool)
+        else:
+            raise ValueError(f"Unsupported checkpoint backend: {self.backend}")
+        await saver.setup()
+        return saver
+
+    async def aclose(self):
+        """Closes the underlying connection or pool."""
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+        if self._resource is not None:
+            await self._resource.close()
+        self._saver = None
+        self._resource = None
+        self._loop = None
+
+    # Checkpoint API, delegated to the underlying saver
+
+    async def aget_tuple(self, config):
+        saver = await self._get_saver()
+        return await saver.aget_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        saver = await self._get_saver()
+        async for item in saver.alist(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        saver = await self._get_saver()
+        next_config = await saver.aput(config, checkpoint, metadata, new_versions)
+
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        await self._touch(thread_id)
+
+        # Prune once the thread has grown by half its cap rather than on every put
+        puts = self._puts.get(thread_id, 0) + 1
+        if puts >= max(1, self.max_per_thread // 2):
+            puts = 0
+            await self.prune(thread_id, checkpoint_ns)
+        self._puts.set(thread_id, puts)
+
+        self._maybe_sweep()
+        return next_config
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        saver = await self._get_saver()
+        return await saver.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        saver = await self._get_saver()
+        await saver.adelete_thread(thread_id)
+        self._last_touch.pop(thread_id, None)
+        self._puts.pop(thread_id, None)
+
+    # Synchronous API, for callers outside the event loop (graph.invoke, scripts). The
+    # saver's connections belong to the loop that opened them, so a call runs there; with
+    # no loop running it runs on a loop of its own, one call at a time, and closes what it
+    # opened.
+
+    def _call(self, method, *args, **kwargs):
+        loop = self._loop
+        if loop is not None and loop.is_running() and loop is not self._sync_loop:
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                raise asyncio.InvalidStateError(
+                    "Synchronous checkpointer calls would block the event loop; use the async methods there"
+                )
+            return asyncio.run_coroutine_threadsafe(method(*args, **kwargs), loop).result()
+        # The graph calls put and put_writes from several threads at once
+        with self._sync_lock:
+            return asyncio.run(self._call_once(method, *args, **kwargs))
+
+    async def _call_once(self, method, *args, **kwargs):
+        self._sync_loop = asyncio.get_running_loop()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            if self._sweep_task is not None and not self._sweep_task.done():
+                await self._sweep_task
+            # An in-memory saver isn't tied to the loop and holds the only copy of the state
+            if self._resource is not None:
+                await self.aclose()
+            self._sync_loop = None
+
+    async def _alist_all(self, config, **kwargs):
+        return [item async for item in self.alist(config, **kwargs)]
+
+    def get_tuple(self, config):
+        return self._call(self.aget_tuple, config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        return iter(self._call(self._alist_all, config, filter=filter, before=before, limit=limit))
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        return self._call(self.aput, config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        return self._call(self.aput_writes, config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id):
+        return self._call(self.adelete_thread, thread_id)
+
+    def get_next_version(self, current, channel):
+        # Same scheme as the SQLite and Postgres savers, which store versions as strings
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # Bounding
+
+    async def _touch(self, thread_id):
+        now = time.monotonic()
+        if now - self._last_touch.get(thread_id, float("-inf")) < _TOUCH_INTERVAL:
+            return
+        self._last_touch.set(thread_id, now)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.merge(ChatThread(
+                    thread_id=thread_id,
+                    user_id=thread_id.split(":", 1)[0],
+                    last_active=datetime.utcnow(),
+                ))
+                await db.commit()
+        except Exception:
+            # Activity tracking only drives eviction; never fail the chat turn over it
+            logger.exception("could not record activity for thread %s", thread_id)
+
+    async def prune(self, thread_id, checkpoint_ns=""):
+        """Deletes all but the latest `max_per_thread` checkpoints of a thread, with their writes."""
+        saver = await self._get_saver()
+        keep = self.max_per_thread
+        if self.backend == "sqlite":
+            async with saver.lock, saver.conn.cursor() as cur:
+                await cur.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN "
+                    "(SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT ?)",
+                    (thread_id, checkpoint_ns, thread_id, checkpoint_ns, keep),
+                )
+                await cur.execute(
+                    "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN "
+                    "(SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?)",
+                    (thread_id, checkpoint_ns, thread_id, checkpoint_ns),
+                )
+                await saver.conn.commit()
+        elif self.backend == "postgresql":
+            async with saver._cursor() as cur:
+                await cur.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id NOT IN "
+                    "(SELECT checkpoint_id FROM checkpoints WHERE thread_id = %s AND checkpoint_ns = %s "
+                    "ORDER BY checkpoint_id DESC LIMIT %s)",
+                    (thread_id, checkpoint_ns, thread_id, checkpoint_ns, keep),
+                )
+                await cur.execute(
+                    "DELETE FROM checkpoint_writes w WHERE w.thread_id = %s AND w.checkpoint_ns = %s AND NOT EXISTS "
+                    "(SELECT 1 FROM checkpoints c WHERE c.thread_id = w.thread_id "
+                    "AND c.checkpoint_ns = w.checkpoint_ns AND c.checkpoint_id = w.checkpoint_id)",
+                    (thread_id, checkpoint_ns),
+                )
+                # Channel values are stored once per version; drop versions no remaining checkpoint points at
+                await cur.execute(
+                    "DELETE FROM checkpoint_blobs b WHERE b.thread_id = %s AND b.checkpoint_ns = %s AND NOT EXISTS "
+                    "(SELECT 1 FROM checkpoints c WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns "
+                    "AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version)",
+                    (thread_id, checkpoint_ns),
+                )
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        if self._sweep_task is not None and not self._sweep_task.done():
+            return
+        self._last_sweep = now
+        self._sweep_task = asyncio.create_task(self.sweep())
+
+    async def sweep(self) -> int:
+        """
+        Deletes conversations idle for longer than the TTL, then the least recently active
+        ones beyond `max_threads`.
+
+        Returns:
+            int: The number of conversations deleted.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        try:
+            async with AsyncSessionLocal() as db:
+                expired = (await db.execute(
+                    select(ChatThread.thread_id).where(ChatThread.last_active < cutoff)
+                )).scalars().all()
+                overflow = (await db.execute(
+                    select(ChatThread.thread_id)
+                    .where(ChatThread.last_active >= cutoff)
+                    .order_by(ChatThread.last_active.desc())
+                    .offset(self.max_threads)
+                )).scalars().all()
+
+                evicted = list(expired) + list(overflow)
+                for thread_id in evicted:
+                    await self.adelete_thread(thread_id)
+                if evicted:
+                    await db.execute(delete(ChatThread).where(ChatThread.thread_id.in_(evicted)))
+                    await db.commit()
+        except Exception:
+            logger.exception("checkpoint sweep failed")
+            return 0
+
+        if evicted:
+            logger.info("evicted %d idle conversations (%d expired)", len(evicted), len(expired))
+        return len(evicted)
+
+
+checkpointer = BoundedCheckpointer()
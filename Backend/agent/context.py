@@ -0,0 +1,157 @@
+import contextvars
+import logging
+import os
+from langchain_core.messages import HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from utils import get_llm
+
+
+logger = logging.getLogger(__name__)
+
+
+# Approximate prompt tokens of conversation history each role may send to the model,
+# overridable with CONTEXT_BUDGET_<ROLE> (e.g. CONTEXT_BUDGET_SUPER_ADMIN).
+DEFAULT_BUDGETS = {
+    "super_admin": 8000,
+    "admin": 6000,
+    "user": 4000,
+}
+
+# Tool results from earlier turns are cut down to this many tokens
+TOOL_RESULT_MAX_TOKENS = int(os.getenv("CONTEXT_TOOL_RESULT_MAX_TOKENS", "400"))
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a Rise Construction user and "
+    "the assistant. Extend the existing summary with the new lines below. Keep every fact "
+    "needed later (equipment, quantities, dates, locations, prices, project ids, decisions) "
+    "and drop pleasantries. Reply with the updated summary only."
+)
+
+
+def token_budget(role: str) -> int:
+    return int(os.getenv(f"CONTEXT_BUDGET_{role.upper()}", DEFAULT_BUDGETS.get(role, DEFAULT_BUDGETS["user"])))
+
+
+class ContextStats:
+    """Tokens of history received vs. sent to the model over one chat request."""
+
+    def __init__(self):
+        self.tokens_in = 0
+        self.tokens_sent = 0
+        self.summaries = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_sent
+
+
+_stats = contextvars.ContextVar("context_stats", default=None)
+
+
+def track_context() -> ContextStats:
+    """Starts collecting ContextStats for the current request (graph nodes inherit the context)."""
+    stats = ContextStats()
+    _stats.set(stats)
+    return stats
+
+
+def _compact(message: ToolMessage, max_tokens: int) -> ToolMessage:
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    # count_tokens_approximately works at ~4 characters per token
+    limit = max_tokens * 4
+    if len(content) <= limit:
+        return None
+    compacted = content[:limit] + f"\n...[{len(content) - limit} characters of earlier tool output omitted]"
+    return message.model_copy(update={"content": compacted})
+
+
+def _transcript(messages) -> str:
+    lines = []
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        if message.type == "ai" and message.tool_calls and not content:
+            content = "called " + ", ".join(call["name"] for call in message.tool_calls)
+        if content:
+            lines.append(f"{message.type}: {content[:TOOL_RESULT_MAX_TOKENS * 4]}")
+    return "\n".join(lines)
+
+
+def _summarize(summary: str, messages) -> str:
+    response = get_llm().invoke([
+        SystemMessage(content=SUMMARY_PROMPT),
+        HumanMessage(content=f"Existing summary:\n{summary or '(none)'}\n\nNew lines:\n{_transcript(messages)}"),
+    ])
+    return response.content
+
+
+def _summary_message(summary: str):
+    return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] if summary else []
+
+
+def fit_to_budget(messages: list, summary: str, budget: int):
+    """
+    Fits the conversation history into a token budget before an agent LLM call.
+
+    Tool results from earlier turns are compacted first. If the history is still over
+    budget, the oldest whole turns (a human message and everything up to the next one)
+    are dropped and folded into the running summary. The current turn is always kept,
+    so tool calls stay paired with their results.
+
+    Args:
+        messages (list): The thread's messages from the graph state.
+        summary (str): The running summary stored in the graph state.
+        budget (int): Approximate token budget for summary plus messages.
+
+    Returns:
+        tuple: (context, update) where context is the message list to send to the model
+            and update is the state update (message removals / replacements and the new
+            summary) that persists the trimming in the checkpoint.
+    """
+    update = {}
+    tokens_in = count_tokens_approximately(_summary_message(summary) + messages)
+
+    human_indexes = [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+    current_turn = human_indexes[-1] if human_indexes else 0
+
+    # Compact large tool results of earlier turns; the current turn's results are still being used
+    replaced = []
+    kept = list(messages)
+    for i in range(current_turn):
+        if isinstance(kept[i], ToolMessage):
+            compacted = _compact(kept[i], TOOL_RESULT_MAX_TOKENS)
+            if compacted is not None:
+                kept[i] = compacted
+                replaced.append(compacted)
+
+    # Drop the oldest turns until the rest fits
+    drop_until = 0
+    old_turn_starts = [i for i in human_indexes if i < current_turn] + [current_turn]
+    while count_tokens_approximately(_summary_message(summary) + kept[drop_until:]) > budget:
+        later = [i for i in old_turn_starts if i > drop_until]
+        if not later:
+            break
+        drop_until = later[0]
+
+    if drop_until:
+        dropped = kept[:drop_until]
+        summary = _summarize(summary, dropped)
+        update["summary"] = summary
+        update["messages"] = [RemoveMessage(id=message.id) for message in messages[:drop_until]]
+        replaced = [message for message in replaced if message.id not in {m.id for m in dropped}]
+        kept = kept[drop_until:]
+
+    if replaced:
+        update["messages"] = update.get("messages", []) + replaced
+
+    context = _summary_message(summary) + kept
+    tokens_sent = count_tokens_approximately(context)
+
+    stats = _stats.get()
+    if stats is not None:
+        stats.tokens_in += tokens_in
+        stats.tokens_sent += tokens_sent
+        stats.summaries += 1 if drop_until else 0
+    if tokens_sent < tokens_in:
+        logger.info("context trimmed from %d to %d tokens (budget %d)", tokens_in, tokens_sent, budget)
+
+    return context, update
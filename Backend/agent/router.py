@@ -0,0 +1,196 @@
+import asyncio
+import os
+import re
+from collections import Counter
+from sqlalchemy import select
+from database.database import AsyncSessionLocal
+from database.events import table_versions
+from database.models import Equipment, Labour, Project_Request
+from agent.tools.query_cache import normalize_question
+
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Rows listed in a fast-path answer before it says how many more there are
+_MAX_LISTED = 20
+
+_PRICE_WORDS = {"price", "cost", "rate", "much", "charge", "fee", "daily", "hourly"}
+# Words that may appear in a fast-path question without changing its meaning
+_FILLER = {"how", "per", "day", "hour", "hire", "hiring", "rent", "renting", "rental", "1", "available", "currently", "now", "free", "need", "want", "like"}
+_EQUIPMENT_WORDS = {"equipment", "tool", "catalog", "catalogue", "stock"}
+_LABOUR_WORDS = {"labour", "worker", "labourer", "staff", "skill", "skillset"}
+
+# Words that may appear in a project status question besides the project id
+_STATUS_WORDS = {"project", "status", "state", "approved", "rejected", "cancelled", "canceled", "pending", "progress",
+                 "id", "number", "no", "check", "current", "still", "yet", "how", "going", "where"}
+
+_PROJECT_STATUS = re.compile(r"\bproject\b\D{0,15}?(\d+)\b.*\b(status|state|approved|rejected|cancelled|pending|progress)\b"
+                             r"|\b(status|state)\b.*\bproject\b\D{0,15}?(\d+)\b")
+
+
+def _split_skills(skillset: str) -> list:
+    return [normalize_question(skill) for skill in (skillset or "").split(",") if normalize_question(skill)]
+
+
+class IntentRouter:
+    """
+    Answers a fixed set of high-frequency catalog questions without any LLM call.
+
+    Recognized intents are listing available equipment or labour, the price of an
+    equipment item (or the hourly rate for a skill) by name, and the status of a project
+    by id. Questions are matched with patterns over the normalized question and a local
+    index of equipment names and labour skills; anything else, or anything with extra
+    qualifiers the patterns don't understand, falls through to the agent graph.
+
+    The index is rebuilt when the equipment or labours table versions change.
+    """
+
+    def __init__(self):
+        self.hits = Counter()
+        self.misses = 0
+        self._index = None
+        self._index_versions = None
+        self._lock = None
+
+    def stats(self) -> dict:
+        total = sum(self.hits.values()) + self.misses
+        return {
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_rate": sum(self.hits.values()) / total if total else 0.0,
+        }
+
+    async def _catalog(self, db) -> dict:
+        versions = table_versions(("equipment", "labours"))
+        if self._index is not None and self._index_versions == versions:
+            return self._index
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._index is None or self._index_versions != versions:
+                equipment = {}
+                for name in (await db.execute(select(Equipment.name).distinct())).scalars():
+                    key = normalize_question(name)
+                    if key:
+                        equipment.setdefault(key, set()).add(name)
+                skills = set()
+                for skillset in (await db.execute(select(Labour.skillset).distinct())).scalars():
+                    skills.update(_split_skills(skillset))
+                self._index = {"equipment": equipment, "skills": skills}
+                self._index_versions = versions
+        return self._index
+
+    @staticmethod
+    def _find(text: str, names) -> list:
+        """Returns the longest names that occur in the normalized text as whole words."""
+        found = [name for name in names if re.search(rf"(?:^| ){re.escape(name)}(?: |$)", text)]
+        if not found:
+            return []
+        longest = max(len(name) for name in found)
+        return [name for name in found if len(name) == longest]
+
+    async def route(self, message: str):
+        """
+        Returns a fast-path answer for the message, or None to fall back to the agent graph.
+        """
+        if not FAST_PATH_ENABLED:
+            return None
+
+        text = normalize_question(message)
+        # Stray letters such as the "s" left over from "what's" carry no meaning here
+        tokens = {token for token in text.split() if len(token) > 1 or token.isdigit()}
+        lowered = message.lower()
+
+        async with AsyncSessionLocal() as db:
+            match = _PROJECT_STATUS.search(lowered)
+            # Anything else in the message ("mark", "set ... to", "remove") asks for an action, not the status
+            project_id = match and int(match.group(1) or match.group(4))
+            if match and not tokens - _STATUS_WORDS - {str(project_id)}:
+                return self._hit("project_status", await self._project_status(db, project_id))
+
+            if tokens & _PRICE_WORDS:
+                catalog = await self._catalog(db)
+                names = self._find(text, catalog["equipment"])
+                skills = self._find(text, catalog["skills"])
+                matched = set(" ".join(names + skills).split())
+                if len(names) == 1 and not skills and not tokens - matched - _PRICE_WORDS - _FILLER - _EQUIPMENT_WORDS:
+                    return self._hit("equipment_price", await self._equipment_price(db, catalog["equipment"][names[0]]))
+                if len(skills) == 1 and not names and not tokens - matched - _PRICE_WORDS - _FILLER - _LABOUR_WORDS:
+                    return self._hit("labour_rate", await self._labour_rate(db, skills[0]))
+
+            if "available" in tokens or tokens & {"hire", "rent", "rental"}:
+                leftover = tokens - _FILLER - _PRICE_WORDS
+                if leftover and leftover <= _EQUIPMENT_WORDS:
+                    return self._hit("list_equipment", await self._list_equipment(db))
+                if leftover and leftover <= _LABOUR_WORDS:
+                    return self._hit("list_labour", await self._list_labour(db))
+
+        self.misses += 1
+        return None
+
+    def _hit(self, intent: str, answer: str) -> str:
+        self.hits[intent] += 1
+        return answer
+
+    async def _project_status(self, db, project_id: int) -> str:
+        project = (await db.execute(
+            select(Project_Request.title, Project_Request.status).where(Project_Request.id == project_id)
+        )).first()
+        if project is None:
+            return f"I couldn't find a project with id {project_id}."
+        return f"Project {project_id} ({project.title}) is currently {project.status}."
+
+    async def _equipment_price(self, db, names) -> str:
+        rows = (await db.execute(
+            select(Equipment.name, Equipment.price_per_day, Equipment.available)
+            .where(Equipment.name.in_(names))
+            .order_by(Equipment.price_per_day)
+        )).all()
+        lines = [
+            f"- {row.name}: {row.price_per_day:,.2f} per day" + ("" if row.available else " (currently unavailable)")
+            for row in rows
+        ]
+        return "Here is the daily hire price:\n" + "\n".join(lines)
+
+    async def _labour_rate(self, db, skill: str) -> str:
+        rows = (await db.execute(
+            select(Labour.name, Labour.skillset, Labour.hourly_rate)
+            .where(Labour.available.is_(True))
+            .order_by(Labour.hourly_rate)
+        )).all()
+        rates = [row.hourly_rate for row in rows if skill in _split_skills(row.skillset)]
+        if not rates:
+            return f"There are no {skill} workers available right now."
+        return (
+            f"{len(rates)} {skill} worker(s) are available, at {min(rates):,.2f} to {max(rates):,.2f} per hour "
+            f"(average {sum(rates) / len(rates):,.2f})."
+        )
+
+    async def _list_equipment(self, db) -> str:
+        rows = (await db.execute(
+            select(Equipment.name, Equipment.price_per_day)
+            .where(Equipment.available.is_(True))
+            .order_by(Equipment.name)
+        )).all()
+        if not rows:
+            return "There is no equipment available right now."
+        lines = [f"- {row.name}: {row.price_per_day:,.2f} per day" for row in rows[:_MAX_LISTED]]
+        if len(rows) > _MAX_LISTED:
+            lines.append(f"...and {len(rows) - _MAX_LISTED} more.")
+        return "Here is the equipment available for hire:\n" + "\n".join(lines)
+
+    async def _list_labour(self, db) -> str:
+        rows = (await db.execute(
+            select(Labour.name, Labour.skillset, Labour.hourly_rate)
+            .where(Labour.available.is_(True))
+            .order_by(Labour.name)
+        )).all()
+        if not rows:
+            return "There are no workers available right now."
+        lines = [f"- {row.name} ({row.skillset or 'general'}): {row.hourly_rate:,.2f} per hour" for row in rows[:_MAX_LISTED]]
+        if len(rows) > _MAX_LISTED:
+            lines.append(f"...and {len(rows) - _MAX_LISTED} more.")
+        return "Here are the workers available for hire:\n" + "\n".join(lines)
+
+
+router = IntentRouter()
@@ -0,0 +1,60 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.tools import StructuredTool
+
+
+# Worker threads shared by all tool calls in the process
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "16"))
+# Tool calls from one chat request that may run at the same time
+TOOL_CONCURRENCY_PER_REQUEST = int(os.getenv("TOOL_CONCURRENCY_PER_REQUEST", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="agent-tool")
+_request_limit = contextvars.ContextVar("tool_request_limit", default=None)
+
+
+def limit_tool_concurrency(limit: int = None):
+    """
+    Caps how many tool calls of the current request run at once.
+
+    Call it from the request's task before running the graph; the graph's tasks
+    inherit the limit through the context.
+    """
+    _request_limit.set(asyncio.Semaphore(limit or TOOL_CONCURRENCY_PER_REQUEST))
+
+
+def offload(func):
+    """
+    Returns a coroutine function that runs the sync `func` on the bounded tool pool.
+
+    The caller's context is copied into the worker thread, so LangChain callbacks and
+    request-scoped state keep working inside the tool.
+    """
+    @functools.wraps(func)
+    async def run(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        semaphore = _request_limit.get()
+        if semaphore is None:
+            return await loop.run_in_executor(_executor, call)
+        async with semaphore:
+            return await loop.run_in_executor(_executor, call)
+    return run
+
+
+def parallel_tool(func=None, *, response_format="content"):
+    """
+    Like `@tool`, but the tool also gets an async variant that runs on the bounded pool.
+
+    The ToolNode awaits every tool call of an AIMessage together, so independent calls
+    from one agent step run in parallel, up to the per-request limit.
+
+    Args:
+        response_format: As for `@tool`; "content_and_artifact" tools return (content, artifact).
+    """
+    if func is None:
+        return functools.partial(parallel_tool, response_format=response_format)
+    coroutine = offload(func)
+    return StructuredTool.from_function(func=func, coroutine=coroutine, response_format=response_format)
@@ -1,81 +1,156 @@
-from logging import root
-import re
-from langchain_community.utilities import SQLDatabase
-from regex import T
 from typing_extensions import TypedDict
-from langchain import hub
 from typing_extensions import Annotated
-import os
-from dotenv import load_dotenv
-from langchain_community.tools.sql_database.tool import QuerySQLDatabaseTool
-from utils import llm
-from langchain_core.tools import tool
-import os
+from langchain_core.messages.utils import count_tokens_approximately
+from sqlalchemy.exc import SQLAlchemyError
+from utils import get_llm, invoke_llm
+from utils.config import DETAILS_MAX_ROWS, DETAILS_SYNTHESIS_CELLS, DETAILS_SYNTHESIS_TEXT
+from utils.metrics import Counter
+from utils.singleflight import SingleFlight
+from agent.tools.concurrency import parallel_tool
 from dotenv import load_dotenv, find_dotenv
-from database.database import Base, engine, session
-from database.models import Equipment, Labour, Project_Request, Equipment_Request
+from database.database import session, release_session
+from database.models import Equipment, Labour, Project_Request
+from agent.tools.sql_database import INTERNAL_TABLES, get_db, get_table_info, query_prompt_template, run_query, format_result
+from agent.tools.sql_guard import QueryRejected, guard_query
+from agent.tools.query_cache import sql_cache, result_cache
+from services.bookings import book_equipment, resolve_equipment
+from services.availability import check_availability
+from services.cost_estimates import cost_estimator
+from services.labour_index import labour_index
+from schema import EquipmentLineItem, LabourSkill
+from typing import List, Optional
 
 
 load_dotenv(find_dotenv())
 
 
-@tool
-def get_details(question: str) -> str:
-    """
-    Retrieves equipment and labour details and project history based on a user's question by constructing and executing an SQL query.
+class QueryOutput(TypedDict):
+    """Generated SQL query."""
+    query: Annotated[str, ..., "Syntactically valid SQL query."]
 
-    Args:
-        question (str): The user's question about equipment ,labour details or project history.
 
-    Returns:
-        str: The response generated from the queried information.
-    """
-    # Establish a connection to the database
-    db = SQLDatabase.from_uri(os.getenv("DATABASE_URL"))
+SYNTHESIS = Counter("details_synthesis_total", "get_details results, by whether an LLM call summarised them", ["outcome"])
+SYNTHESIS_TOKENS_SAVED = Counter("details_synthesis_tokens_saved_total", "Approximate prompt tokens of the summarising LLM calls skipped")
+QUERY_RETRIES = Counter("details_query_retries_total", "get_details queries regenerated after the SQL guard refused them", ["outcome"])
+
+# The same SQL run by several get_details calls at once (e.g. rewordings of one question) executes once
+_query_flight = SingleFlight("details_query")
 
-    class QueryOutput(TypedDict):
-        """Generated SQL query."""
-        query: Annotated[str, ..., "Syntactically valid SQL query."]
+_structured_llm = None
 
-    # Pull the query prompt template from the hub
-    query_prompt_template = hub.pull("langchain-ai/sql-query-system-prompt")
 
-    # Ensure the prompt template contains exactly one message
-    assert len(query_prompt_template.messages) == 1
+def structured_llm():
+    """Returns the chat model wrapped to produce a QueryOutput, rebuilt if the model was swapped."""
+    global _structured_llm
+    llm = get_llm()
+    if _structured_llm is None or _structured_llm[0] is not llm:
+        _structured_llm = (llm, llm.with_structured_output(QueryOutput))
+    return _structured_llm[1]
 
-    # Invoke the prompt template with the necessary parameters
-    prompt = query_prompt_template.invoke(
+
+def _query_prompt(db, question: str, refused=None):
+    """Builds the NL-to-SQL prompt; `refused` is the (query, reason) of a refused first attempt."""
+    if refused:
+        question = (
+            f"{question}\n\nA previous query for this question was refused.\n"
+            f"Query: {refused[0]}\nReason: {refused[1]}\n"
+            "Write a different query that answers the question and avoids the problem."
+        )
+    return query_prompt_template.invoke(
         {
             "dialect": db.dialect,
             "top_k": 10,
-            "table_info": db.get_table_info(),
+            "table_info": get_table_info(),
             "input": question,
         }
     )
 
-    # Use the language model to generate a structured SQL query
-    structured_llm = llm.with_structured_output(QueryOutput)
-    result = structured_llm.invoke(prompt)
 
-    # Execute the generated SQL query
-    execute_query_tool = QuerySQLDatabaseTool(db=db)
-    result = execute_query_tool.invoke(result)
+def _cached_query(sql: str, result_key):
+    """Runs the guarded SQL, unless the same read already ran against the current table versions."""
+    result = result_cache.get(result_key)
+    if result is None:
+        result = run_query(sql)
+        result_cache.set(result_key, result)
+    return result
+
+
+def _needs_synthesis(result) -> bool:
+    """Whether a result is too large or wordy to hand to the agent as a table."""
+    if result.cells > DETAILS_SYNTHESIS_CELLS:
+        return True
+    return any(isinstance(value, str) and len(value) > DETAILS_SYNTHESIS_TEXT for row in result.rows for value in row)
+
+
+@parallel_tool(response_format="content_and_artifact")
+def get_details(question: str) -> str:
+    """
+    Retrieves equipment and labour details and project history based on a user's question by constructing and executing an SQL query.
+
+    Args:
+        question (str): The user's question about equipment ,labour details or project history.
 
+    Returns:
+        str: The queried information, as a compact table or, for large results, a summary.
+    """
+    # The tool's content is text for the agent; the artifact carries the columns and typed rows
+    # Reuse the process-wide database handle and memoized schema
+    db = get_db()
+
+    # Reworded repeats of a question reuse the SQL generated the first time
+    cache_key = sql_cache.key(question)
+    query = sql_cache.get(cache_key)
+    generated = query is None
+    refused = None
+
+    # A query the guard refuses goes back to the model once, together with the reason
+    for attempt in range(2):
+        if query is None:
+            query = invoke_llm(_query_prompt(db, question, refused), structured_llm())
+        try:
+            # Read-only check and row cap; cost and timeout are checked when it runs
+            sql = guard_query(query["query"], DETAILS_MAX_ROWS, INTERNAL_TABLES)
+            result_key = result_cache.key(sql)
+            result = _query_flight.do(result_key, _cached_query, sql, result_key)
+            break
+        except QueryRejected as e:
+            if attempt:
+                QUERY_RETRIES.inc(outcome="refused_again")
+                return f"Error: the query was refused: {e.reason}", None
+            refused = (query["query"], e.reason)
+            query, generated = None, True
+        except SQLAlchemyError as e:
+            return f"Error: {str(e.orig if getattr(e, 'orig', None) else e).splitlines()[0]}", None
+    if refused:
+        QUERY_RETRIES.inc(outcome="recovered")
+
+    # Only keep SQL that actually ran
+    if generated:
+        sql_cache.set(cache_key, query)
+
+    table = format_result(result)
     # Formulate a response using the retrieved SQL result
     answer_prompt = (
         "Given the following user question, corresponding SQL query, "
         "and SQL result, answer the user question.\n\n"
         f'Question: {question}\n'
-        f'SQL Result: {result}\n'
+        f'SQL Result: {table}\n'
         "When making answer, dont include sql query."
     )
-    response = llm.invoke(answer_prompt)
+    if not _needs_synthesis(result):
+        # Small results go to the agent as they are; it phrases the reply anyway
+        SYNTHESIS.inc(outcome="skipped")
+        SYNTHESIS_TOKENS_SAVED.inc(count_tokens_approximately([("human", answer_prompt)]))
+        return table, result.as_dict()
 
-    return response.content
+    SYNTHESIS.inc(outcome="synthesized")
+    response = invoke_llm(answer_prompt)
+    return response.content, result.as_dict()
 
 
 
-@tool
+@parallel_tool
+@release_session
 def place_request_for_project(title:str, description:str, start_date, location=None)-> str:
     """
         Saves a project request in the database with the given title, description, and location.
@@ -102,7 +177,8 @@ def place_request_for_project(title:str, description:str, start_date, location=N
         return "Booking placed unsuccessfully"
     
     
-@tool
+@parallel_tool
+@release_session
 def place_request_for_equipment(equipment_name: str, number_of_dates: int, quantity: int, location: str, start_date)-> str:
     """
         Makes a request to hire the given equipment for a certain number of dates in a certain location.
@@ -118,24 +194,188 @@ def place_request_for_equipment(equipment_name: str, number_of_dates: int, quant
             str: A message confirming whether the equipment request was successfully saved in the database.
     """
     equipment_name=equipment_name.lower()
-    
-    existing_equipment = session.query(Equipment).filter_by(name=equipment_name).first()
 
-    if existing_equipment:
-        if existing_equipment.available:
-            new_equipment_request = Equipment_Request(equipment_id=existing_equipment.id, location=location, start_date=start_date)
-            
-            session.add(new_equipment_request)
-            session.commit()
-            
-            return f"Equipment {equipment_name} request placed successfully. confirmation will be sent to your email" 
-        else:
-            return f"Equipment {equipment_name} is already unavailable."
+    result = book_equipment(
+        session,
+        [{"equipment_name": equipment_name, "number_of_dates": number_of_dates, "quantity": quantity}],
+        location=location,
+        start_date=start_date,
+    )[0]
+
+    equipment_name = result.get("matched_name", equipment_name)
+    if result["status"] == "requested":
+        return f"Equipment {equipment_name} request placed successfully. confirmation will be sent to your email" 
+    elif result["status"] == "unavailable" and "free_units" in result:
+        message = f"Only {result['free_units']} units of {equipment_name} are free for those dates."
+        if result["earliest_start"] is None:
+            return message + f" {equipment_name} does not have {quantity} units."
+        return message + f" {quantity} units are free for {number_of_dates} days starting {result['earliest_start']}."
+    elif result["status"] == "unavailable":
+        return f"Equipment {equipment_name} is already unavailable."
+    elif result["status"] == "invalid":
+        return f"Equipment {equipment_name} request is invalid: {result['detail']}"
+    elif result["suggestions"]:
+        return f"Equipment {equipment_name} not found. Did you mean: {', '.join(result['suggestions'])}?"
     else:
         return f"Equipment {equipment_name} not found."
+
+
+@parallel_tool
+@release_session
+def place_bulk_request_for_equipment(items: List[EquipmentLineItem], location: str, start_date)-> str:
+    """
+        Makes one request to hire several equipment items at once, e.g. "2 excavators, 5 scaffolds and a crane from Monday".
+        Use this instead of calling place_request_for_equipment once per item.
+
+        Args:
+            items (list): The equipment line items, each with equipment_name, quantity, number_of_dates and optionally its own location and start_date.
+            location (str): The location where the equipment is needed.
+            start_date (datetime): The date when the equipment is needed.
+
+        Returns:
+            str: One line per item saying whether its request was placed.
+    """
+    results = book_equipment(session, items, location=location, start_date=start_date)
+
+    lines = []
+    for result in results:
+        line = f"{result.get('matched_name', result['equipment_name'])} x{result['quantity']}: "
+        if result["status"] == "requested":
+            line += f"request placed (request id {result['request_id']})"
+        elif result["status"] == "unavailable" and "free_units" in result:
+            line += f"only {result['free_units']} free for those dates"
+            if result["earliest_start"] is not None:
+                line += f", all {result['quantity']} are free from {result['earliest_start']}"
+        elif result["status"] == "unavailable":
+            line += "currently unavailable"
+        elif result["status"] == "invalid":
+            line += f"invalid request, {result['detail']}"
+        elif result["suggestions"]:
+            line += f"not found, did you mean: {', '.join(result['suggestions'])}?"
+        else:
+            line += "not found"
+        lines.append(line)
+    return "\n".join(lines)
     
-@tool
-def add_new_equipment(equipment_name: str, description: str, price_per_day: float)-> str:
+@parallel_tool
+@release_session
+def check_equipment_availability(equipment_name: str, start_date, end_date=None, quantity: int = 1)-> str:
+    """
+        Checks how many units of the given equipment are free for a date range, and if the requested quantity isn't, from when it is.
+
+        Args:
+            equipment_name (str): The name of the equipment to check.
+            start_date (datetime): The first day the equipment is needed.
+            end_date (datetime): The last day the equipment is needed; defaults to the start date.
+            quantity (int): The number of units needed.
+
+        Returns:
+            str: The number of free units over the range and, if that is not enough, the earliest start date that would work.
+    """
+    name = equipment_name.strip().lower()
+    equipment, _, suggestions = resolve_equipment(session, {name})
+    row = equipment.get(name)
+    if row is None:
+        if suggestions.get(name):
+            return f"Equipment {equipment_name} not found. Did you mean: {', '.join(suggestions[name])}?"
+        return f"Equipment {equipment_name} not found."
+
+    try:
+        summary = check_availability(row.id, start_date, end_date, quantity=quantity)
+    except ValueError:
+        return "The dates are not valid dates."
+
+    period = f"from {summary['start_date']} to {summary['end_date']}"
+    message = f"{summary['free_units']} of {summary['units']} units of {row.name} are free {period}."
+    if not summary["fits"]:
+        if summary["earliest_start"] is None:
+            message += f" {row.name} does not have {quantity} units."
+        else:
+            days = (summary["end_date"] - summary["start_date"]).days + 1
+            message += f" {quantity} units are free for {days} days starting {summary['earliest_start']}."
+    return message
+
+
+@parallel_tool
+def estimate_project_cost(initial_budget: Optional[float] = None, location: Optional[str] = None, duration_days: Optional[int] = None, workers: Optional[int] = None)-> str:
+    """
+        Estimates what a project will cost, with a 90% range, from the costs of past projects. Give at least one of the budget, the duration or the number of workers.
+
+        Args:
+            initial_budget (float): The budget planned for the project, if known.
+            location (str): Where the project will be.
+            duration_days (int): How many days the project will take, if known.
+            workers (int): How many workers the project will use.
+
+        Returns:
+            str: The estimated cost and its range, and what the estimate is based on.
+    """
+    try:
+        estimate = cost_estimator.estimate(initial_budget, location, duration_days, workers)
+    except ValueError as e:
+        return str(e)
+
+    message = f"Estimated cost: {estimate['estimate']:,.0f} (90% range {estimate['low']:,.0f} to {estimate['high']:,.0f})"
+    where = f"projects in {estimate['location']}" if estimate["location"] else "all past projects"
+    if estimate["basis"] == "budget":
+        ratio = estimate["overrun_ratio"]
+        message += f", from the budget and how far {where} ran over or under theirs (typically {ratio['median']:.2f}x the budget)"
+    else:
+        message += f", from the cost per day of {where} (typically {estimate['cost_per_day']['median']:,.0f} a day)"
+        if estimate["basis"] == "workers":
+            days = estimate["duration_days"]
+            message += f" and an expected duration of {days['median']:.0f} days ({days['low']:.0f} to {days['high']:.0f}) for a crew that size"
+    return f"{message}, based on {estimate['samples']} projects."
+
+
+@parallel_tool
+def find_labour(skills: List[LabourSkill], max_hourly_rate: Optional[float] = None, team_budget_per_hour: Optional[float] = None, assemble_team: bool = False)-> str:
+    """
+        Finds available workers by skill, cheapest first. Use it instead of get_details for finding workers.
+        Without assemble_team it ranks workers by how many of the skills each one has ("an electrician who can also do plumbing");
+        with assemble_team it picks a team with `count` workers per skill ("3 masons and 2 carpenters").
+
+        Args:
+            skills (list): The skills needed, each with skill and, for a team, count.
+            max_hourly_rate (float): The most one worker may charge per hour.
+            team_budget_per_hour (float): The most the whole team may cost per hour.
+            assemble_team (bool): Pick a team instead of ranking individual workers.
+
+        Returns:
+            str: One line per worker with their id, skills and hourly rate, and for a team its hourly cost.
+    """
+    if assemble_team:
+        requirements = {}
+        for item in skills:
+            requirements[item.skill] = requirements.get(item.skill, 0) + max(item.count, 1)
+        result = labour_index.assemble_team(requirements, max_hourly_rate=max_hourly_rate, budget_per_hour=team_budget_per_hour)
+        lines = [f"{worker['role']}: {worker['name']} (id {worker['id']}), {worker['hourly_rate']:g} per hour" for worker in result["team"]]
+        lines.append(f"Team cost: {result['hourly_cost']:g} per hour.")
+        if result["missing"]:
+            lines.append("Not enough available workers for: " + ", ".join(f"{count} {skill}" for skill, count in result["missing"].items()) + ".")
+        if not result["within_budget"]:
+            over = result["hourly_cost"] - team_budget_per_hour
+            costs = ", ".join(f"{skill} {cost:g}" for skill, cost in result["cost_by_role"].items())
+            lines.append(f"No team of these workers fits the budget of {team_budget_per_hour:g} per hour; the cheapest is {over:g} over ({costs}).")
+            if result["unaffordable"]:
+                lines.append("The cheapest workers for these skills alone cost more than the budget: " + ", ".join(result["unaffordable"]) + ".")
+        return "\n".join(lines)
+
+    workers = labour_index.find([item.skill for item in skills], max_hourly_rate=max_hourly_rate, limit=10)
+    if not workers:
+        return "No available workers have those skills" + (f" at up to {max_hourly_rate:g} per hour." if max_hourly_rate else ".")
+    lines = []
+    for worker in workers:
+        line = f"{worker['name']} (id {worker['id']}): {', '.join(worker['skills'])}, {worker['hourly_rate']:g} per hour"
+        if worker["coverage"] < 1:
+            line += f" (has {worker['coverage']:.0%} of the skills)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+@parallel_tool
+@release_session
+def add_new_equipment(equipment_name: str, description: str, price_per_day: float, units: int = 1)-> str:
     """
     Adds a new equipment to the database with the given name, description, and price per day.
 
@@ -143,12 +383,13 @@ def add_new_equipment(equipment_name: str, description: str, price_per_day: floa
         equipment_name (str): The name of the equipment to add.
         description (str): A detailed description of the equipment.
         price_per_day (float): The rental price of the equipment per day.
+        units (int): How many units of the equipment can be hired out at the same time.
 
     Returns:
         str: A message confirming whether the equipment was successfully added to the database.
     """
     try:
-        new_equipment = Equipment(name=equipment_name, description=description, price_per_day=price_per_day)
+        new_equipment = Equipment(name=equipment_name, description=description, price_per_day=price_per_day, units=units)
         if not new_equipment:
             return f"Equipment {equipment_name} already exists"
         else:
@@ -159,7 +400,8 @@ def add_new_equipment(equipment_name: str, description: str, price_per_day: floa
         return f"Error adding equipment: {str(e)}"
     
     
-@tool
+@parallel_tool
+@release_session
 def add_new_labour(name: str, skill_set: str, hourly_rate: float)-> str:
     """
     Adds a new labour to the database with the given name, skill set, and hourly rate.
@@ -183,7 +425,8 @@ def add_new_labour(name: str, skill_set: str, hourly_rate: float)-> str:
     except Exception as e:
         return f"Error adding Labour: {str(e)}"
     
-@tool 
+@parallel_tool
+@release_session
 def approve_or_reject_project(project_id: int, status:str)-> str:
 
     """
@@ -206,7 +449,8 @@ def approve_or_reject_project(project_id: int, status:str)-> str:
     
         return {"message": "Project approved successfully"}
     
-@tool
+@parallel_tool
+@release_session
 def remove_project(project_id: int)-> str:
     """
     Removes a project request from the database given its id.
@@ -226,7 +470,8 @@ def remove_project(project_id: int)-> str:
     
         return {"message": "Project removed successfully"}
 
-@tool
+@parallel_tool
+@release_session
 def remove_equipment(equipment_id: int)-> str:
     """
     Removes an equipment from the database given its id.
@@ -247,7 +492,8 @@ def remove_equipment(equipment_id: int)-> str:
         return {"message": "Equipment removed successfully"}
     
     
-@tool
+@parallel_tool
+@release_session
 def remove_labour(labour_id: int)-> str:
     """
     Removes a labour from the database given its id.
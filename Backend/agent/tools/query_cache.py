@@ -0,0 +1,180 @@
+import hashlib
+import re
+from database.database import Base
+from database.events import table_versions
+import database.models  # noqa: F401  (registers the tables on Base.metadata)
+from utils.cache import LRUCache
+from utils.config import SQL_CACHE_SIZE, SQL_CACHE_TTL, RESULT_CACHE_SIZE, RESULT_CACHE_TTL
+
+
+# Filler words that don't change which SQL answers a question. Negations ("not", "no",
+# "without") and comparison words are deliberately kept.
+_STOP_WORDS = frozenset("""
+    a an the and or of for to in on at by with from about
+    is are was were be been am do does did has have had
+    i me my we our us you your it its they them their please kindly
+    what which who whats show list give tell find get see know display
+    can could would will shall should may might
+    all any some there here this that these those
+    currently right now today
+""".split())
+
+_NUMBER_WORDS = {
+    "zero": "0", "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+    "eleven": "11", "twelve": "12", "fifteen": "15", "twenty": "20", "thirty": "30",
+    "fifty": "50", "hundred": "100", "thousand": "1000",
+}
+
+# Spelling variants of the entities stored in database.models
+_ENTITIES = {
+    "labor": "labour",
+    "labors": "labour",
+    "labours": "labour",
+    "equipments": "equipment",
+    "machine": "equipment",
+    "machines": "equipment",
+    "machinery": "equipment",
+    "projects": "project",
+}
+
+_TOKEN = re.compile(r"\d+(?:[.,]\d+)*|[a-z]+")
+
+
+def _singular(token: str) -> str:
+    if len(token) <= 3 or token.endswith(("ss", "us", "is")):
+        return token
+    if token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith(("sses", "xes", "zes", "ches", "shes")):
+        return token[:-2]
+    if token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def _canonical_number(token: str) -> str:
+    token = token.replace(",", "")
+    if "." in token:
+        token = token.rstrip("0").rstrip(".")
+    return token.lstrip("0") or "0"
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalizes a question so rewordings that need the same SQL share a cache key.
+
+    Lowercases, drops punctuation and stop words, turns number words into digits and
+    maps plural / spelling variants of catalog entities to one form.
+
+    Args:
+        question (str): The user's question.
+
+    Returns:
+        str: The normalized question, or an empty string if nothing meaningful is left.
+    """
+    tokens = []
+    for token in _TOKEN.findall(question.lower()):
+        if token[0].isdigit():
+            tokens.append(_canonical_number(token))
+            continue
+        if token in _STOP_WORDS:
+            continue
+        token = _NUMBER_WORDS.get(token) or _ENTITIES.get(token) or _singular(token)
+        tokens.append(token)
+    return " ".join(tokens)
+
+
+def schema_fingerprint() -> str:
+    """Returns a short hash of the table definitions in database.models."""
+    parts = []
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        parts.append(table.name)
+        parts.extend(f"{column.name}:{column.type}" for column in table.columns)
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:12]
+
+
+class QueryCache:
+    """
+    Caches the SQL generated for a normalized question.
+
+    Keys include the schema fingerprint, so a change to database.models never serves
+    SQL written against the old tables.
+    """
+
+    def __init__(self, maxsize: int = SQL_CACHE_SIZE, ttl: float = SQL_CACHE_TTL):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._fingerprint = schema_fingerprint()
+
+    def key(self, question: str):
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        return (self._fingerprint, normalized)
+
+    def get(self, key):
+        if key is None:
+            return None
+        return self._cache.get(key)
+
+    def set(self, key, query):
+        if key is not None:
+            self._cache.set(key, query)
+
+    def invalidate(self):
+        """Drops every entry and recomputes the schema fingerprint."""
+        self._fingerprint = schema_fingerprint()
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+_READ_ONLY = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+_WRITE = re.compile(r"\b(insert|update|delete|replace|merge|create|alter|drop|truncate)\b", re.IGNORECASE)
+
+
+def referenced_tables(sql: str) -> tuple:
+    """Returns the names of the known tables that appear in the SQL text, sorted."""
+    words = set(re.findall(r"[a-z_][a-z0-9_]*", sql.lower()))
+    return tuple(sorted(name for name in Base.metadata.tables if name in words))
+
+
+class ResultCache:
+    """
+    Caches SQL results keyed by the statement text plus the versions of the tables it reads.
+
+    Any committed ORM write bumps the versions of the tables it touched (see
+    database.events), so a cached result is never served after its tables changed.
+    Statements that aren't plain reads, or that don't reference a known table, are not cached.
+    """
+
+    def __init__(self, maxsize: int = RESULT_CACHE_SIZE, ttl: float = RESULT_CACHE_TTL):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def key(self, sql: str):
+        if not _READ_ONLY.match(sql) or _WRITE.search(sql):
+            return None
+        tables = referenced_tables(sql)
+        if not tables:
+            return None
+        return (" ".join(sql.split()), tables, table_versions(tables))
+
+    def get(self, key):
+        if key is None:
+            return None
+        return self._cache.get(key)
+
+    def set(self, key, result):
+        if key is not None:
+            self._cache.set(key, result)
+
+    def invalidate(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+sql_cache = QueryCache()
+result_cache = ResultCache()
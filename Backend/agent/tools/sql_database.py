@@ -0,0 +1,159 @@
+import threading
+from datetime import date, datetime
+from typing import NamedTuple
+from langchain_community.utilities import SQLDatabase
+from langchain_core.prompts import ChatPromptTemplate
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from database.database import get_engine, get_readonly_engine
+from database.events import table_versions
+from agent.tools.query_cache import sql_cache, result_cache
+from agent.tools.sql_guard import INTERNAL_TABLES, check_plan, reject_timeout, statement_timed_out
+from utils.config import DETAILS_MAX_ROWS
+
+
+# Vendored copy of the "langchain-ai/sql-query-system-prompt" hub prompt, so building the
+# NL-to-SQL prompt needs neither a network round trip nor outbound network access.
+SQL_QUERY_SYSTEM_PROMPT = """Given an input question, create a syntactically correct {dialect} query to run to help find the answer. Unless the user specifies in his question a specific number of examples they wish to obtain, always limit your query to at most {top_k} results. You can order the results by a relevant column to return the most interesting examples in the database.
+
+Never query for all the columns from a specific table, only ask for a the few relevant columns given the question.
+
+Pay attention to use only the column names that you can see in the schema description. Be careful to not query for columns that do not exist. Also, pay attention to which column is in which table.
+
+Only use the following tables:
+{table_info}
+
+Question: {input}"""
+
+query_prompt_template = ChatPromptTemplate.from_messages([("system", SQL_QUERY_SYSTEM_PROMPT)])
+
+
+_db = None
+_table_info = None
+_lock = threading.Lock()
+
+
+def get_db() -> SQLDatabase:
+    """
+    Returns the process-wide SQLDatabase, reusing the application's engine and its pool.
+
+    The schema is reflected once, on first use. INTERNAL_TABLES are left out of it.
+    """
+    global _db
+    if _db is None:
+        with _lock:
+            if _db is None:
+                # SQLDatabase refuses to ignore tables that don't exist
+                tables = set(inspect(get_engine()).get_table_names())
+                _db = SQLDatabase(get_engine(), ignore_tables=[table for table in INTERNAL_TABLES if table in tables])
+    return _db
+
+
+def get_table_info() -> str:
+    """
+    Returns the rendered table info (DDL plus sample rows) for the SQL prompt.
+
+    Rendering runs a sample-row query per table, so the result is memoized and only
+    rebuilt once a committed write bumps one of the table versions (or after
+    `invalidate_schema_cache`).
+    """
+    global _table_info
+    db = get_db()
+    versions = table_versions(sorted(db.get_usable_table_names()))
+    cached = _table_info
+    if cached is None or cached[0] != versions:
+        with _lock:
+            cached = _table_info
+            if cached is None or cached[0] != versions:
+                cached = (versions, db.get_table_info())
+                _table_info = cached
+    return cached[1]
+
+
+def invalidate_schema_cache(reflect: bool = False):
+    """
+    Drops the memoized table info, for changes the table versions don't see
+    (writes from other processes or outside the ORM).
+
+    Args:
+        reflect (bool): Also drop the SQLDatabase so the schema is reflected again,
+            needed after tables or columns change. This also drops the cached
+            question -> SQL entries, which were generated against the old schema.
+    """
+    global _db, _table_info
+    with _lock:
+        _table_info = None
+        if reflect:
+            _db = None
+    result_cache.invalidate()
+    if reflect:
+        sql_cache.invalidate()
+
+
+class QueryResult(NamedTuple):
+    """Columns and typed rows of an executed query; `truncated` is set when rows were cut at DETAILS_MAX_ROWS."""
+    columns: tuple
+    rows: tuple
+    truncated: bool = False
+
+    @property
+    def cells(self) -> int:
+        return len(self.columns) * len(self.rows)
+
+    def as_dict(self) -> dict:
+        return {"columns": list(self.columns), "rows": [list(row) for row in self.rows], "truncated": self.truncated}
+
+
+def run_query(query: str, max_rows: int = DETAILS_MAX_ROWS) -> QueryResult:
+    """
+    Executes a generated query, already passed through `guard_query`, on the read-only
+    engine and returns its columns and rows.
+
+    Raises:
+        QueryRejected: The planner estimates it as too expensive, or it ran past the
+            statement timeout.
+    """
+    with get_readonly_engine().connect() as connection:
+        check_plan(connection, query)
+        try:
+            result = connection.execute(text(query))
+            if not result.returns_rows:
+                return QueryResult((), ())
+            columns = tuple(result.keys())
+            rows = result.fetchmany(max_rows + 1)
+        except OperationalError as e:
+            if statement_timed_out(e):
+                reject_timeout()
+            raise
+    return QueryResult(columns, tuple(tuple(row) for row in rows[:max_rows]), len(rows) > max_rows)
+
+
+def _format_value(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, float):
+        return f"{value:.2f}".rstrip("0").rstrip(".")
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat(sep=" ", timespec="minutes")
+    if isinstance(value, date):
+        return value.isoformat()
+    return " ".join(str(value).split())
+
+
+def format_result(result: QueryResult) -> str:
+    """
+    Renders a query result as compact text: a single value as "column: value", anything
+    else as a header line and one line per row, with values separated by " | ".
+    """
+    if not result.rows:
+        return "No matching records."
+    if result.cells == 1:
+        return f"{result.columns[0]}: {_format_value(result.rows[0][0])}"
+    lines = [" | ".join(result.columns)]
+    lines.extend(" | ".join(_format_value(value) for value in row) for row in result.rows)
+    if result.truncated:
+        lines.append(f"(first {len(result.rows)} rows shown)")
+    return "\n".join(lines)
+
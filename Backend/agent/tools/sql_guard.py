@@ -0,0 +1,213 @@
+import json
+import os
+import re
+from sqlalchemy import text
+from utils.metrics import Counter
+
+
+# Queries whose estimated total cost (Postgres/MySQL planner units) is above this are refused
+SQL_MAX_COST = float(os.getenv("SQL_MAX_COST", "100000"))
+# Queries where any plan step is estimated to produce more rows than this are refused
+SQL_MAX_PLAN_ROWS = float(os.getenv("SQL_MAX_PLAN_ROWS", "1000000"))
+
+REJECTIONS = Counter("sql_guard_rejections_total", "Generated queries refused by the guard", ["reason"])
+LIMITS = Counter("sql_guard_limits_total", "Generated queries whose LIMIT the guard added or lowered", ["action"])
+
+_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<quoted>"(?:[^"]|"")*"|`[^`]*`)
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<dollar>\$[A-Za-z_]*\$)
+  | (?P<punct>.)
+""", re.S | re.X)
+
+# Keywords that make a SELECT/WITH statement write or lock: data-modifying CTEs,
+# SELECT ... INTO, SELECT ... FOR UPDATE/SHARE, and statements smuggled in otherwise
+_WRITE_KEYWORDS = frozenset("""
+    insert update delete merge upsert into truncate drop alter create grant revoke copy lock share
+""".split())
+
+# Functions that sleep, touch the server's files or sessions, or load code
+_DENIED_FUNCTIONS = frozenset("""
+    sleep benchmark load_file load_extension lo_import lo_export dblink dblink_exec
+    set_config current_setting randomblob zeroblob readfile writefile pg_sleep pg_sleep_for pg_sleep_until
+    pg_read_file pg_read_binary_file pg_ls_dir pg_stat_file pg_terminate_backend pg_cancel_backend pg_reload_conf
+""".split())
+
+# Tables model-written SQL must never read: credentials and sessions, and the application's
+# conversation bookkeeping (the checkpointer's tables share the database on Postgres)
+INTERNAL_TABLES = (
+    "users", "tokens", "chat_threads",
+    "checkpoints", "checkpoint_blobs", "checkpoint_writes", "checkpoint_migrations", "writes",
+)
+
+# Catalogs the model has no business reading
+_SYSTEM_PREFIXES = ("pg_", "sqlite_")
+_SYSTEM_SCHEMAS = frozenset(["information_schema", "mysql", "performance_schema", "sys"])
+
+# EXPLAIN keys holding the estimated rows of a plan step
+_PLAN_ROW_KEYS = ("Plan Rows", "rows_produced_per_join", "rows_examined_per_scan")
+
+
+class QueryRejected(Exception):
+    """Raised when a generated query is refused; `reason` is phrased for the model to act on."""
+
+    def __init__(self, reason: str, kind: str):
+        super().__init__(reason)
+        self.reason = reason
+        self.kind = kind
+
+
+def _reject(reason: str, kind: str):
+    REJECTIONS.inc(reason=kind)
+    raise QueryRejected(reason, kind)
+
+
+def _tokens(sql: str) -> list:
+    """Splits the statement into (kind, text, start, end, depth) tokens, dropping whitespace and comments."""
+    tokens, depth = [], 0
+    for match in _TOKEN.finditer(sql):
+        kind, value = match.lastgroup, match.group()
+        if kind in ("space", "comment"):
+            continue
+        if kind == "dollar" or value in ("'", '"', "`"):
+            _reject("The query has an unterminated or dollar-quoted literal; use plain single-quoted strings.", "syntax")
+        if value == ")":
+            depth -= 1
+        tokens.append((kind, value, match.start(), match.end(), depth))
+        if value == "(":
+            depth += 1
+    return tokens
+
+
+def guard_query(sql: str, max_rows: int, hidden_tables=INTERNAL_TABLES) -> str:
+    """
+    Checks that a generated query is a single read-only SELECT and bounds its result.
+
+    A missing LIMIT is added and one above max_rows + 1 is lowered to that; the extra
+    row lets the caller tell the result was cut. Returns the query to run.
+
+    Raises:
+        QueryRejected: The query writes, locks, calls a denied function, reads a hidden
+            table or system catalog, or holds more than one statement.
+    """
+    tokens = _tokens(sql)
+    while tokens and tokens[-1][1] == ";":
+        tokens.pop()
+    if not tokens:
+        _reject("The query is empty.", "syntax")
+    if any(value == ";" for _, value, *_ in tokens):
+        _reject("Only a single statement may be run; drop everything after the first semicolon.", "multiple_statements")
+    first = next((value.lower() for kind, value, *_ in tokens if value != "("), "")
+    if first not in ("select", "with"):
+        _reject("Only SELECT queries are allowed.", "not_select")
+
+    hidden = {table.lower() for table in hidden_tables}
+    for i, (kind, value, *_) in enumerate(tokens):
+        name = value.lower() if kind == "word" else value[1:-1].lower() if kind == "quoted" else None
+        if name is None:
+            continue
+        if kind == "word" and name in _WRITE_KEYWORDS:
+            _reject(f"The query may only read data; {value.upper()} is not allowed.", "write")
+        calls = i + 1 < len(tokens) and tokens[i + 1][1] == "("
+        if calls and name in _DENIED_FUNCTIONS:
+            _reject(f"The function {value} is not allowed.", "denied_function")
+        if name in hidden:
+            _reject(f"The table {value} is not available; use the tables in the schema.", "hidden_table")
+        if not calls and (name.startswith(_SYSTEM_PREFIXES) or name in _SYSTEM_SCHEMAS):
+            _reject(f"System catalogs such as {value} are not available; use the tables in the schema.", "system_catalog")
+
+    cap = max_rows + 1
+    end = tokens[-1][3]
+    top = [token for token in tokens if token[4] == 0]
+    limit = next((i for i in range(len(top) - 1, -1, -1) if top[i][0] == "word" and top[i][1].lower() == "limit"), None)
+    if limit is None:
+        if any(kind == "word" and value.lower() in ("fetch", "top") for kind, value, *_ in top):
+            return _wrap(sql[:end], cap)
+        LIMITS.inc(action="added")
+        return f"{sql[:end]} LIMIT {cap}"
+
+    # LIMIT n, LIMIT n OFFSET m, or MySQL's LIMIT offset, n; anything else is wrapped
+    after = top[limit + 1:]
+    if len(after) >= 3 and after[0][0] == "number" and after[1][1] == "," and after[2][0] == "number":
+        count, rest = after[2], after[3:]
+    elif after and after[0][0] == "number":
+        count, rest = after[0], after[1:]
+    else:
+        return _wrap(sql[:end], cap)
+    if rest and rest[0][1].lower() != "offset":
+        return _wrap(sql[:end], cap)
+    if not count[1].isdigit() or int(count[1]) > cap:
+        LIMITS.inc(action="lowered")
+        return f"{sql[:count[2]]}{cap}{sql[count[3]:end]}"
+    return sql[:end]
+
+
+def _wrap(sql: str, cap: int) -> str:
+    # For row limits the guard can't rewrite in place (FETCH FIRST, LIMIT with an expression)
+    LIMITS.inc(action="wrapped")
+    return f"SELECT * FROM ({sql}) AS limited LIMIT {cap}"
+
+
+def _plan_rows(node) -> float:
+    """Largest row estimate of any step in an EXPLAIN (FORMAT JSON) tree."""
+    if isinstance(node, list):
+        return max((_plan_rows(item) for item in node), default=0)
+    if not isinstance(node, dict):
+        return 0
+    rows = max((float(node[key]) for key in _PLAN_ROW_KEYS if key in node), default=0)
+    return max([rows] + [_plan_rows(value) for value in node.values() if isinstance(value, (dict, list))])
+
+
+def check_plan(connection, sql: str):
+    """
+    Asks the planner for the query's estimated cost and row counts and refuses it when
+    they are above SQL_MAX_COST or SQL_MAX_PLAN_ROWS.
+
+    SQLite's planner gives no estimates, so there the EXPLAIN only validates the query.
+
+    Raises:
+        QueryRejected: The plan is too expensive.
+    """
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        cost = plan[0]["Plan"]["Total Cost"]
+    elif dialect == "mysql":
+        plan = json.loads(connection.execute(text(f"EXPLAIN FORMAT=JSON {sql}")).scalar())
+        cost = float(plan["query_block"].get("cost_info", {}).get("query_cost", 0))
+    else:
+        connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+        return
+    rows = _plan_rows(plan)
+    if cost > SQL_MAX_COST or rows > SQL_MAX_PLAN_ROWS:
+        _reject(
+            f"The query is too expensive (estimated cost {cost:.0f}, up to {rows:.0f} rows in one step). "
+            "Filter on indexed columns, avoid joining large tables without a condition, "
+            "and select aggregates instead of raw rows where you can.",
+            "cost",
+        )
+
+
+def statement_timed_out(error) -> bool:
+    """Whether a DBAPI error wrapped by SQLAlchemy is the read-only engine's statement timeout."""
+    orig = getattr(error, "orig", None)
+    if (getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)) == "57014":
+        return True
+    args = getattr(orig, "args", ())
+    if args and args[0] == 3024:
+        return True
+    return "interrupted" in str(orig)
+
+
+def reject_timeout():
+    """Raises the rejection for a query the database cancelled for running too long."""
+    _reject(
+        "The query took too long and was cancelled. Make it cheaper: filter on indexed columns, "
+        "avoid unbounded joins, and aggregate instead of returning raw rows.",
+        "timeout",
+    )
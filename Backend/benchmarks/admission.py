@@ -0,0 +1,83 @@
+"""
+Floods the agent with user chat turns while a few admin turns arrive, with a slow fake
+LLM, and reports how long each role waited for an agent slot and how many turns were
+refused (429 queue full / 503 queue timeout). Shows admin turns jumping the queue and
+the queue staying bounded instead of piling up.
+
+Run from the Backend directory:
+    python -m benchmarks.admission --users 60 --admins 5 --concurrency 4 --latency 0.3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import Counter, defaultdict
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.sqlite")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("CHECKPOINT_URL", "memory")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=60, help="user turns sent at once")
+    parser.add_argument("--admins", type=int, default=5, help="admin turns sent shortly after the flood")
+    parser.add_argument("--concurrency", type=int, default=4, help="agent slots")
+    parser.add_argument("--queue-limit", type=int, default=40)
+    parser.add_argument("--queue-timeout", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per fake LLM call")
+    args = parser.parse_args()
+
+    from database.database import Base, engine
+    from utils import set_llm
+    from utils.fake_llm import FakeChatModel
+    from agent import get_chat_response
+    from agent.admission import AdmissionRejected, scheduler
+    from agent.checkpointer import checkpointer
+    from schema import ChatRequest
+
+    engine.echo = False
+    Base.metadata.create_all(engine)
+    set_llm(FakeChatModel(responses=["Sure, here is a plan."], latency=args.latency))
+    scheduler.concurrency = args.concurrency
+    scheduler.role_limits = {}
+    scheduler.queue_limit = args.queue_limit
+    scheduler.queue_timeout = args.queue_timeout
+
+    finished = defaultdict(list)
+    outcomes = Counter()
+
+    async def turn(role, n):
+        start = time.perf_counter()
+        try:
+            await get_chat_response(ChatRequest(message="Can you help me plan a garden wall?", role=role, user_id=f"{role}{n}", conversation_id="load"))
+        except AdmissionRejected as e:
+            outcomes[(role, e.status_code)] += 1
+            return
+        outcomes[(role, 200)] += 1
+        finished[role].append(time.perf_counter() - start)
+
+    async def admins():
+        await asyncio.sleep(args.latency)
+        await asyncio.gather(*(turn("admin", n) for n in range(args.admins)))
+
+    async def run():
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(*(turn("user", n) for n in range(args.users)), admins())
+            elapsed = time.perf_counter() - start
+        finally:
+            await checkpointer.aclose()
+        for role in ("admin", "user"):
+            latencies = finished[role]
+            codes = ", ".join(f"{code}: {count}" for (r, code), count in sorted(outcomes.items()) if r == role)
+            summary = f"p50 {statistics.median(latencies):5.2f} s, max {max(latencies):5.2f} s" if latencies else "none finished"
+            print(f"{role:>6}: turn {summary} | {codes}")
+        print(f"total {elapsed:.2f} s with {args.concurrency} slots; scheduler now {scheduler.stats()}")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
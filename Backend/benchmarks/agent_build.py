@@ -0,0 +1,70 @@
+"""
+Measures the per-request overhead of getting a role agent before the LLM is called.
+
+"before" rebuilds the graph for every request and re-binds the tools / recompiles the
+prompt on every graph step (the old get_chat_response behaviour); "after" is the cached
+registry used by get_agent.
+
+Run from the Backend directory:
+    python -m benchmarks.agent_build --requests 200
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.sqlite")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from agent import get_agent, reset_agents
+from agent.agent import ROLES, build_agent, _role_config
+from utils import llm
+
+
+def before(role, steps):
+    build_agent(role)
+    tools, prompt = _role_config(role)
+    # The old agent node did this on every step of the tool loop
+    for _ in range(steps):
+        llm.bind_tools(tools=tools)
+        ChatPromptTemplate.from_messages(prompt)
+
+
+def after(role, steps):
+    get_agent(role)
+
+
+def run(fn, requests, steps):
+    timings = []
+    for i in range(requests):
+        role = ROLES[i % len(ROLES)]
+        start = time.perf_counter()
+        fn(role, steps)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "mean_ms": sum(timings) / len(timings) * 1000,
+        "p50_ms": timings[len(timings) // 2] * 1000,
+        "p95_ms": timings[int(len(timings) * 0.95)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=3, help="graph steps per request (agent node runs)")
+    args = parser.parse_args()
+
+    reset_agents()
+    results = {
+        "before": run(before, args.requests, args.steps),
+        "after": run(after, args.requests, args.steps),
+    }
+    for name, stats in results.items():
+        print(f"{name:>6}: mean {stats['mean_ms']:.3f} ms  p50 {stats['p50_ms']:.3f} ms  p95 {stats['p95_ms']:.3f} ms")
+    print(f"speedup (mean): {results['before']['mean_ms'] / results['after']['mean_ms']:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Seeds approved equipment requests and compares the availability engine against the
+equivalent SQL aggregation (peak units booked per day over the window, computed with a
+recursive day series joined to the overlapping requests). Both sides answer "how many
+units are free from D1 to D2"; the SQL side gets an index on the requests so the
+comparison is fair. Also times incremental approve / cancel updates.
+
+Run from the Backend directory:
+    python -m benchmarks.availability --bookings 1000000 --equipment 500 --queries 500
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.sqlite")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+PEAK_SQL = """
+WITH RECURSIVE days(d) AS (
+    SELECT julianday(:start)
+    UNION ALL
+    SELECT d + 1 FROM days WHERE d + 1 <= julianday(:end)
+)
+SELECT COALESCE(MAX(booked), 0) FROM (
+    SELECT days.d, SUM(r.quantity) AS booked
+    FROM days
+    JOIN equipment_requests r
+      ON r.equipment_id = :equipment_id
+     AND r.status = 'approved'
+     AND r.start_date <= :end_ts
+     AND julianday(date(r.start_date)) <= days.d
+     AND julianday(date(r.start_date)) + r.number_of_dates > days.d
+    GROUP BY days.d
+)
+"""
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    parser.add_argument("--equipment", type=int, default=500)
+    parser.add_argument("--days", type=int, default=3 * 365, help="span of the booked period")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    from sqlalchemy import insert, text
+    from database.database import Base, Session, engine
+    from database.models import Equipment, Equipment_Request
+    from services.availability import availability
+
+    rng = random.Random(11)
+    engine.echo = False
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    origin = datetime(2025, 1, 1)
+    start = time.perf_counter()
+    with Session() as db:
+        db.execute(insert(Equipment), [
+            {"id": i + 1, "name": f"equipment {i}", "price_per_day": 100.0, "units": rng.randint(20, 200)}
+            for i in range(args.equipment)
+        ])
+        for offset in range(0, args.bookings, 100_000):
+            db.execute(insert(Equipment_Request), [
+                {
+                    "equipment_id": rng.randint(1, args.equipment),
+                    "start_date": origin + timedelta(days=rng.randrange(args.days)),
+                    "number_of_dates": rng.randint(1, 14),
+                    "quantity": rng.randint(1, 3),
+                    "status": "approved",
+                }
+                for _ in range(min(100_000, args.bookings - offset))
+            ])
+        db.execute(text("CREATE INDEX IF NOT EXISTS ix_bench_requests ON equipment_requests (equipment_id, status, start_date)"))
+        db.commit()
+    print(f"seeded {args.bookings} bookings over {args.equipment} equipment in {time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter()
+    availability.load()
+    print(f"engine load: {time.perf_counter() - start:.1f} s")
+
+    windows = []
+    for _ in range(args.queries):
+        first = origin + timedelta(days=rng.randrange(args.days))
+        windows.append((rng.randint(1, args.equipment), first, first + timedelta(days=rng.randint(0, 30))))
+
+    engine_timings, answers = [], []
+    for equipment_id, first, last in windows:
+        t = time.perf_counter()
+        answers.append(availability.free_units(equipment_id, first, last))
+        engine_timings.append((time.perf_counter() - t) * 1e6)
+
+    sql_timings, mismatches = [], 0
+    with Session() as db:
+        for (equipment_id, first, last), answer in zip(windows[:100], answers):
+            t = time.perf_counter()
+            peak = db.execute(text(PEAK_SQL), {
+                "equipment_id": equipment_id,
+                "start": first.date().isoformat(),
+                "end": last.date().isoformat(),
+                "end_ts": last.replace(hour=23, minute=59, second=59),
+            }).scalar()
+            units = db.get(Equipment, equipment_id).units
+            sql_timings.append((time.perf_counter() - t) * 1e6)
+            mismatches += max(units - peak, 0) != answer
+
+    print(f"    engine: p50 {statistics.median(engine_timings):9.0f} us, p99 {_percentile(engine_timings, 0.99):9.0f} us")
+    print(f"       SQL: p50 {statistics.median(sql_timings):9.0f} us, p99 {_percentile(sql_timings, 0.99):9.0f} us ({mismatches} mismatches)")
+
+    timings = []
+    for equipment_id, first, last in windows[:100]:
+        t = time.perf_counter()
+        availability.earliest_start(equipment_id, quantity=10, number_of_dates=7, after=first)
+        timings.append((time.perf_counter() - t) * 1e6)
+    print(f"  earliest: p50 {statistics.median(timings):9.0f} us, p99 {_percentile(timings, 0.99):9.0f} us")
+
+    # Incremental updates go through the same commit hook the admin routes trigger
+    with Session() as db:
+        requests = db.query(Equipment_Request).limit(200).all()
+        t = time.perf_counter()
+        for request in requests:
+            request.status = "cancelled"
+            db.commit()
+        for request in requests:
+            request.status = "approved"
+            db.commit()
+        elapsed = time.perf_counter() - t
+    print(f"cancel + approve: {elapsed / (2 * len(requests)) * 1e3:.2f} ms per commit (including the database write)")
+
+
+if __name__ == "__main__":
+    main()
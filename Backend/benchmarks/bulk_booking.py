@@ -0,0 +1,84 @@
+"""
+Compares booking several equipment items through the agent one tool call per item
+(place_request_for_equipment in a loop) against a single place_bulk_request_for_equipment
+call. Reports LLM calls and wall time per chat turn, using the fake LLM with a fixed
+per-call latency.
+
+Run from the Backend directory:
+    python -m benchmarks.bulk_booking --items 5 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.sqlite")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("CHECKPOINT_URL", "memory")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per fake LLM call")
+    args = parser.parse_args()
+
+    from langchain_core.messages import AIMessage, ToolMessage
+    from database.database import Base, Session, engine
+    from database.models import Equipment
+    from utils import set_llm
+    from utils.fake_llm import FakeChatModel
+    from agent import get_chat_response
+    from agent.checkpointer import checkpointer
+    from schema import ChatRequest
+
+    engine.echo = False
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    names = [f"machine {i}" for i in range(args.items)]
+    with Session() as db:
+        db.add_all(Equipment(name=name, price_per_day=100.0) for name in names)
+        db.commit()
+
+    def per_item(messages):
+        # The role prompt is its system message followed by the history; book the next
+        # item until every item has a tool result
+        booked = sum(isinstance(message, ToolMessage) for message in messages)
+        if booked >= len(names):
+            return "All equipment has been requested."
+        return AIMessage(content="", tool_calls=[{
+            "name": "place_request_for_equipment",
+            "args": {"equipment_name": names[booked], "number_of_dates": 3, "quantity": 2, "location": "Colombo", "start_date": "2025-06-02"},
+            "id": f"call-{booked}",
+        }])
+
+    def bulk(messages):
+        if any(isinstance(message, ToolMessage) for message in messages):
+            return "All equipment has been requested."
+        return AIMessage(content="", tool_calls=[{
+            "name": "place_bulk_request_for_equipment",
+            "args": {
+                "items": [{"equipment_name": name, "quantity": 2, "number_of_dates": 3} for name in names],
+                "location": "Colombo",
+                "start_date": "2025-06-02",
+            },
+            "id": "call-bulk",
+        }])
+
+    async def run():
+        try:
+            for label, respond in (("per-item loop", per_item), ("bulk tool", bulk)):
+                model = FakeChatModel(responses=[respond], latency=args.latency)
+                set_llm(model)
+                start = time.perf_counter()
+                await get_chat_response(ChatRequest(message=f"Book {args.items} machines from Monday", user_id="bench", conversation_id=label))
+                elapsed = time.perf_counter() - start
+                print(f"{label:>14}: {model.calls} LLM calls, {elapsed:.2f} s")
+        finally:
+            await checkpointer.aclose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
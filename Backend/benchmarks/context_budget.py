@@ -0,0 +1,80 @@
+"""
+Replays a long conversation through the user agent with the deterministic fake LLM and
+reports, per turn, the history tokens in the thread vs. the tokens actually sent to the
+model after trimming/summarizing. Runs fully offline.
+
+Run from the Backend directory:
+    python -m benchmarks.context_budget --turns 40 --budget 1500
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.sqlite")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("CHECKPOINT_URL", "memory")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--budget", type=int, default=1500)
+    args = parser.parse_args()
+    os.environ["CONTEXT_BUDGET_USER"] = str(args.budget)
+
+    from database.database import Base, engine
+    from langchain_core.messages import AIMessage, ToolMessage
+    from langchain_core.messages.utils import count_tokens_approximately
+    from utils import set_llm
+    from utils.fake_llm import FakeChatModel
+    from agent import get_agent, get_chat_response
+    from agent.checkpointer import checkpointer
+    from schema import ChatRequest
+
+    engine.echo = False
+    Base.metadata.create_all(engine)
+    # get_chat_response logs the tokens saved per request
+    logging.basicConfig(format="%(name)s: %(message)s")
+    logging.getLogger("agent.agent").setLevel(logging.INFO)
+
+    # Every other turn the agent calls a tool with a large payload before answering
+    turn = {"n": 0}
+
+    def respond(messages):
+        if "running summary" in messages[0].content:
+            return "Summary: user is planning a site build and asked about equipment and labour."
+        # The role prompt is its system message followed by the trimmed history
+        if isinstance(messages[-1], ToolMessage):
+            return "Your project request has been placed. " * 6
+        if turn["n"] % 2:
+            return AIMessage(content="", tool_calls=[{
+                "name": "place_request_for_project",
+                "args": {"title": "Site", "description": "x" * 4000, "start_date": "2025-01-01"},
+                "id": f"call-{turn['n']}",
+            }])
+        return "Sure, tell me more about the site and dates. " * 6
+
+    set_llm(FakeChatModel(responses=[respond]))
+    graph = get_agent("user")
+
+    async def run():
+        try:
+            for n in range(args.turns):
+                turn["n"] = n
+                request = ChatRequest(message=f"Turn {n}: we need equipment and labour for block {n}. " * 5, user_id="bench", conversation_id="context")
+                await get_chat_response(request)
+                state = await graph.aget_state({"configurable": {"thread_id": "bench:context"}})
+                print(
+                    f"turn {n:3d}: messages in thread {len(state.values['messages']):3d}  "
+                    f"thread tokens {count_tokens_approximately(state.values['messages']):6d}  "
+                    f"summary chars {len(state.values.get('summary', '')):5d}"
+                )
+        finally:
+            await checkpointer.aclose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Seeds project history and compares the cost estimator against computing the same
+overrun-ratio percentiles in SQL (count, then ORDER BY ... OFFSET per percentile, per
+location). Also reports how far the estimator's binned quantiles are from the exact
+ones, and times incremental updates through the commit hook.
+
+Run from the Backend directory:
+    python -m benchmarks.cost_estimate --projects 1000000 --queries 1000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.sqlite")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+LOCATIONS = ["Colombo", "Kandy", "Galle", "Jaffna", "Negombo", "Matara", "Kurunegala", "Trincomalee"]
+
+PERCENTILE_SQL = """
+SELECT actual_cost / initial_budget AS ratio FROM project_history
+WHERE location = :location AND initial_budget > 0 AND actual_cost > 0
+ORDER BY ratio LIMIT 1 OFFSET :offset
+"""
+
+COUNT_SQL = "SELECT count(*) FROM project_history WHERE location = :location AND initial_budget > 0 AND actual_cost > 0"
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--projects", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--sql-queries", type=int, default=20)
+    args = parser.parse_args()
+
+    import numpy as np
+    from sqlalchemy import insert, text
+    from database.database import Base, Session, engine
+    from database.models import ProjectHistory
+    from services.cost_estimates import cost_estimator
+
+    rng = random.Random(5)
+    engine.echo = False
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    origin = datetime(2015, 1, 1)
+    # Each location has its own typical overrun and daily spend
+    overrun = {location: rng.uniform(0.95, 1.3) for location in LOCATIONS}
+    start = time.perf_counter()
+    with Session() as db:
+        for offset in range(0, args.projects, 100_000):
+            rows = []
+            for _ in range(min(100_000, args.projects - offset)):
+                location = rng.choice(LOCATIONS)
+                workers = rng.randint(2, 80)
+                days = max(int(rng.lognormvariate(4, 0.6) * (1 + workers / 40)), 1)
+                budget = days * workers * rng.uniform(40, 120)
+                started = origin + timedelta(days=rng.randrange(3650))
+                rows.append({
+                    "initial_budget": budget,
+                    "actual_cost": budget * overrun[location] * rng.lognormvariate(0, 0.15),
+                    "start_date": started,
+                    "completion_date": started + timedelta(days=days - 1),
+                    "location": location,
+                    "workers_used": workers,
+                    "description": "project",
+                })
+            db.execute(insert(ProjectHistory), rows)
+        db.execute(text("CREATE INDEX IF NOT EXISTS ix_bench_history_location ON project_history (location)"))
+        db.commit()
+    print(f"seeded {args.projects} projects in {time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter()
+    cost_estimator.load()
+    columns = cost_estimator._columns
+    footprint = sum(getattr(columns, name).nbytes for name in columns.NAMES + ("live",))
+    print(f"estimator load: {time.perf_counter() - start:.1f} s, columns {footprint / 2**20:.0f} MiB")
+
+    queries = []
+    for _ in range(args.queries):
+        workers = rng.randint(2, 80)
+        queries.append(rng.choice([
+            {"initial_budget": rng.uniform(1e4, 1e6), "location": rng.choice(LOCATIONS)},
+            {"duration_days": rng.randint(10, 400), "location": rng.choice(LOCATIONS)},
+            {"workers": workers, "location": rng.choice(LOCATIONS)},
+        ]))
+    timings = []
+    for query in queries:
+        t = time.perf_counter()
+        cost_estimator.estimate(**query)
+        timings.append((time.perf_counter() - t) * 1e6)
+    print(f" estimator: p50 {statistics.median(timings):9.0f} us, p99 {_percentile(timings, 0.99):9.0f} us")
+
+    sql_timings = []
+    with Session() as db:
+        for location in (rng.choice(LOCATIONS) for _ in range(args.sql_queries)):
+            t = time.perf_counter()
+            count = db.execute(text(COUNT_SQL), {"location": location}).scalar()
+            for q in (0.05, 0.5, 0.95):
+                db.execute(text(PERCENTILE_SQL), {"location": location, "offset": int(q * (count - 1))}).scalar()
+            sql_timings.append((time.perf_counter() - t) * 1e6)
+    print(f"       SQL: p50 {statistics.median(sql_timings):9.0f} us, p99 {_percentile(sql_timings, 0.99):9.0f} us (overrun percentiles only)")
+
+    # Binned quantiles against the exact ones over the same columns
+    size = columns.size
+    ratios = columns.actual[:size] / columns.budget[:size]
+    worst = 0.0
+    for location in LOCATIONS:
+        row = cost_estimator.match_location(location)
+        exact = np.quantile(ratios[columns.location[:size] == row], [0.05, 0.5, 0.95])
+        estimated = cost_estimator._overrun.quantiles(row, [0.05, 0.5, 0.95])
+        worst = max(worst, float(np.max(np.abs(estimated / exact - 1))))
+    print(f"  accuracy: overrun quantiles within {worst * 100:.2f}% of exact")
+
+    # Incremental updates go through the same commit hook the agent tools and routes trigger
+    with Session() as db:
+        t = time.perf_counter()
+        for i in range(200):
+            started = origin + timedelta(days=i)
+            db.add(ProjectHistory(
+                initial_budget=50_000, actual_cost=55_000, start_date=started, completion_date=started + timedelta(days=30),
+                location=LOCATIONS[i % len(LOCATIONS)], workers_used=10, description="new project",
+            ))
+            db.commit()
+        elapsed = time.perf_counter() - t
+    print(f"    insert: {elapsed / 200 * 1e3:.2f} ms per commit (including the database write), {len(cost_estimator)} projects loaded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Drives /auth/login and /admin/projects with many concurrent clients against a seeded
+SQLite database and reports throughput and latency percentiles.
+
+Run from the Backend directory (pool settings come from the DB_POOL_* variables):
+    python -m benchmarks.db_concurrency --clients 100 --requests 5
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.sqlite")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("AUTH_SECRET", "benchmark-secret")
+# Cheap hashes keep the benchmark about the database layer, not bcrypt
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# Every client may be waiting on a hash at once; the default queue would shed most of them with 503s
+os.environ.setdefault("HASH_QUEUE_LIMIT", "1000")
+
+import httpx
+
+from database.database import Base, Session, engine
+from database.models import Project_Request, User
+from main import app
+from utils import hash_pass
+
+
+def seed(users, projects):
+    engine.echo = False
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with Session() as db:
+        db.add_all(
+            User(username=f"user{i}", email=f"user{i}@example.com", phone_number="0", password=hash_pass("benchmark"), role="user")
+            for i in range(users)
+        )
+        db.add_all(
+            Project_Request(title=f"Project {i}", description="Benchmark project " * 10, location="Colombo")
+            for i in range(projects)
+        )
+        db.commit()
+
+
+async def drive(client, method, url, clients, requests, payload=None):
+    latencies = []
+    shed = 0
+
+    async def worker(n):
+        nonlocal shed
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = await client.request(method, url, json=payload(n) if payload else None)
+            if response.status_code == 503:
+                # Load shedding (e.g. the login hash queue is full) is a result, not a failure
+                shed += 1
+                continue
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    if not latencies:
+        raise SystemExit(f"every request to {url} was shed with a 503")
+    return {
+        "requests": len(latencies),
+        "shed": shed,
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=5, help="requests per client")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--projects", type=int, default=200)
+    args = parser.parse_args()
+
+    seed(args.users, args.projects)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        login = await drive(
+            client, "POST", "/auth/login", args.clients, args.requests,
+            payload=lambda n: {"email": f"user{n % args.users}@example.com", "password": "benchmark"},
+        )
+        projects = await drive(client, "GET", "/admin/projects", args.clients, args.requests)
+
+    for name, stats in (("/auth/login", login), ("/admin/projects", projects)):
+        print(
+            f"{name:<16} {stats['requests']} requests ({stats['shed']} shed)  {stats['throughput_rps']:.1f} req/s  "
+            f"p50 {stats['p50_ms']:.1f} ms  p95 {stats['p95_ms']:.1f} ms  p99 {stats['p99_ms']:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
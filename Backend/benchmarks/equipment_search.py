@@ -0,0 +1,105 @@
+"""
+Seeds a large equipment catalog (many units of a few thousand models) and compares name
+lookups through the in-memory fuzzy index against the exact-match SQL query the booking
+tools used before. Reports index build time, per-lookup latency and how many misspelled /
+plural names each one resolves.
+
+Run from the Backend directory:
+    python -m benchmarks.equipment_search --rows 100000 --lookups 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.sqlite")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+KINDS = [
+    "excavator", "concrete mixer", "scaffolding", "crane", "bulldozer", "forklift", "backhoe loader",
+    "road roller", "compactor", "generator", "water pump", "dump truck", "jackhammer", "welding machine",
+]
+MAKES = ["jcb", "cat", "komatsu", "volvo", "hitachi", "liebherr", "bobcat", "doosan", "kubota", "hyundai"]
+
+
+def _misspell(name: str, rng: random.Random) -> str:
+    """Plural, swapped letters, a dropped letter or an extra word, like a user would type it."""
+    choice = rng.randrange(4)
+    if choice == 0:
+        return name + "s"
+    if choice == 1 and len(name) > 4:
+        i = rng.randrange(1, len(name) - 2)
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    if choice == 2 and len(name) > 4:
+        i = rng.randrange(1, len(name) - 1)
+        return name[:i] + name[i + 1:]
+    return "the " + name + " please"
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    from sqlalchemy import insert
+    from database.database import Base, Session, engine
+    from database.models import Equipment
+    from services.equipment_index import equipment_index
+
+    rng = random.Random(7)
+    engine.echo = False
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    models = sorted({
+        f"{make} {rng.choice('abcdefghjkmnprstvwxz')}{rng.choice('abcdefghjkmnprstvwxz')}{rng.randint(10, 999)} {kind}"
+        for make in MAKES for kind in KINDS for _ in range(30)
+    })
+    rows = [rng.choice(models) for _ in range(args.rows)]
+    with Session() as db:
+        db.execute(insert(Equipment), [
+            {"name": name, "description": f"{rng.randint(1, 40)} ton {name.split()[-1]}", "price_per_day": rng.uniform(20, 900), "available": rng.random() < 0.8}
+            for name in rows
+        ])
+        db.commit()
+
+    start = time.perf_counter()
+    equipment_index.load()
+    print(f"index build: {time.perf_counter() - start:.2f} s for {len(equipment_index)} rows, {len(models)} distinct names")
+
+    targets = [rng.choice(models) for _ in range(args.lookups)]
+    queries = [_misspell(name, rng) for name in targets]
+
+    timings, resolved, suggested = [], 0, 0
+    for target, query in zip(targets, queries):
+        start = time.perf_counter()
+        best, candidates = equipment_index.match(query)
+        timings.append((time.perf_counter() - start) * 1e6)
+        resolved += best is not None and best["name"] == target
+        suggested += any(candidate["name"] == target for candidate in candidates)
+    print(
+        f"fuzzy index: p50 {statistics.median(timings):8.0f} us, p99 {_percentile(timings, 0.99):8.0f} us, "
+        f"resolved {resolved / args.lookups:.0%} of misspelled names, {suggested / args.lookups:.0%} in the top 3"
+    )
+
+    timings, resolved = [], 0
+    with Session() as db:
+        for target, query in zip(targets[:200], queries[:200]):
+            start = time.perf_counter()
+            row = db.query(Equipment).filter_by(name=query.lower()).first()
+            timings.append((time.perf_counter() - start) * 1e6)
+            resolved += row is not None and row.name == target
+    print(
+        f"  exact SQL: p50 {statistics.median(timings):8.0f} us, p99 {_percentile(timings, 0.99):8.0f} us, "
+        f"resolved {resolved / min(200, args.lookups):.0%} of misspelled names"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Measures chat latency for common catalog questions answered by the fast-path intent
+router, against the same questions going through the agent graph (fake LLM with a fixed
+per-call latency). Also prints the router's hit counters.
+
+Run from the Backend directory:
+    python -m benchmarks.fast_path --turns 50 --latency 0.3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.sqlite")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("CHECKPOINT_URL", "memory")
+
+QUESTIONS = [
+    "What's the daily price of a concrete mixer?",
+    "How much does an excavator cost per day?",
+    "What equipment is available?",
+    "Which workers are available for hire?",
+    "What is the hourly rate for an electrician?",
+    "What is the status of project 1?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per fake LLM call")
+    args = parser.parse_args()
+
+    from database.database import Base, Session, engine
+    from database.models import Equipment, Labour, Project_Request
+    from utils import set_llm
+    from utils.fake_llm import FakeChatModel
+    from agent import get_chat_response
+    import agent.router as router_module
+    from agent.checkpointer import checkpointer
+    from schema import ChatRequest
+
+    engine.echo = False
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with Session() as db:
+        db.add_all([
+            Equipment(name="concrete mixer", price_per_day=80.0),
+            Equipment(name="excavator", price_per_day=450.0),
+            Equipment(name="scaffolding", price_per_day=35.0),
+            Labour(name="Nimal", skillset="electrician, wiring", hourly_rate=12.5),
+            Labour(name="Kamal", skillset="mason", hourly_rate=9.0),
+            Project_Request(title="Warehouse", description="Steel frame warehouse", status="pending"),
+        ])
+        db.commit()
+
+    model = FakeChatModel(responses=["Here you go."], latency=args.latency)
+    set_llm(model)
+
+    async def measure(label, enabled):
+        router_module.FAST_PATH_ENABLED = enabled
+        calls = model.calls
+        timings = []
+        for n in range(args.turns):
+            question = QUESTIONS[n % len(QUESTIONS)]
+            start = time.perf_counter()
+            await get_chat_response(ChatRequest(message=question, user_id="bench", conversation_id=f"{label}-{n}"))
+            timings.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{label:>10}: p50 {statistics.median(timings):8.1f} ms, max {max(timings):8.1f} ms, "
+            f"{(model.calls - calls) / args.turns:.1f} LLM calls per turn"
+        )
+
+    async def run():
+        try:
+            await measure("graph", False)
+            await measure("fast path", True)
+            print("router:", router_module.router.stats())
+        finally:
+            await checkpointer.aclose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Seeds the labours table with free-text skill sets and compares the labour index against
+the SQL a generated query would use (skillset LIKE '%skill%' ORDER BY hourly_rate), for
+single-skill and multi-skill searches. Also reports how many workers a LIKE search on a
+synonym misses, times team assembly, and times incremental updates through the commit hook.
+
+Run from the Backend directory:
+    python -m benchmarks.labour_search --labour 500000 --queries 1000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.sqlite")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+LIKE_SQL = "SELECT id FROM labours WHERE available AND {conditions} ORDER BY hourly_rate LIMIT 10"
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def _skillset(rng, skills, variants) -> str:
+    # Workers write their skills in many ways: synonyms, plurals, capitals and separators
+    chosen = rng.sample(skills, rng.choice([1, 1, 2, 2, 3]))
+    words = [rng.choice(variants[skill]) for skill in chosen]
+    words = [word.title() if rng.random() < 0.3 else word for word in words]
+    return rng.choice([", ", " & ", " and ", "/"]).join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--labour", type=int, default=500_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--sql-queries", type=int, default=20)
+    args = parser.parse_args()
+
+    from sqlalchemy import insert, text
+    from database.database import Base, Session, engine
+    from database.models import Labour
+    from services.labour_index import SKILL_SYNONYMS, labour_index
+
+    rng = random.Random(11)
+    engine.echo = False
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    skills = list(SKILL_SYNONYMS)
+    variants = {skill: [skill, skill + "s", *SKILL_SYNONYMS[skill]] for skill in skills}
+    start = time.perf_counter()
+    with Session() as db:
+        for offset in range(0, args.labour, 100_000):
+            db.execute(insert(Labour), [
+                {
+                    "name": f"worker {offset + i}",
+                    "skillset": _skillset(rng, skills, variants),
+                    "hourly_rate": round(rng.uniform(8, 60), 2),
+                    "available": rng.random() < 0.8,
+                }
+                for i in range(min(100_000, args.labour - offset))
+            ])
+        db.commit()
+    print(f"seeded {args.labour} workers in {time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter()
+    labour_index.load()
+    print(f"index load: {time.perf_counter() - start:.1f} s, {len(labour_index._postings)} skills")
+
+    searches = {
+        "single skill": [[rng.choice(skills)] for _ in range(args.queries)],
+        "two skills": [rng.sample(skills, 2) for _ in range(args.queries)],
+        "three skills": [rng.sample(skills, 3) for _ in range(args.queries)],
+    }
+    for label, queries in searches.items():
+        timings = []
+        for query in queries:
+            t = time.perf_counter()
+            labour_index.find(query, limit=10)
+            timings.append((time.perf_counter() - t) * 1e6)
+        sql_timings = []
+        with Session() as db:
+            for query in queries[:args.sql_queries]:
+                conditions = " AND ".join(f"lower(skillset) LIKE :skill{i}" for i in range(len(query)))
+                params = {f"skill{i}": f"%{skill}%" for i, skill in enumerate(query)}
+                t = time.perf_counter()
+                db.execute(text(LIKE_SQL.format(conditions=conditions)), params).fetchall()
+                sql_timings.append((time.perf_counter() - t) * 1e6)
+        print(f"{label:>13}: index p50 {statistics.median(timings):8.0f} us, p99 {_percentile(timings, 0.99):8.0f} us"
+              f" | LIKE p50 {statistics.median(sql_timings):8.0f} us, p99 {_percentile(sql_timings, 0.99):8.0f} us")
+
+    timings = []
+    for _ in range(args.queries):
+        requirements = {skill: rng.randint(1, 5) for skill in rng.sample(skills, rng.randint(2, 5))}
+        t = time.perf_counter()
+        labour_index.assemble_team(requirements, budget_per_hour=500)
+        timings.append((time.perf_counter() - t) * 1e6)
+    print(f"team assembly: p50 {statistics.median(timings):8.0f} us, p99 {_percentile(timings, 0.99):8.0f} us")
+
+    # What a LIKE on the canonical name misses among workers who wrote a synonym
+    with Session() as db:
+        for skill in ("electrician", "mason", "plumber"):
+            like = db.execute(text("SELECT count(*) FROM labours WHERE available AND lower(skillset) LIKE :skill"),
+                              {"skill": f"%{skill}%"}).scalar()
+            indexed = len(labour_index._postings.get(skill, ()))
+            print(f"   recall: '{skill}' LIKE finds {like}, index finds {indexed} ({1 - like / indexed:.0%} missed by LIKE)")
+
+    # Incremental updates go through the same commit hook add_new_labour and remove_labour trigger
+    with Session() as db:
+        t = time.perf_counter()
+        added = []
+        for i in range(200):
+            labour = Labour(name=f"new worker {i}", skillset=_skillset(rng, skills, variants), hourly_rate=20)
+            db.add(labour)
+            db.commit()
+            added.append(labour)
+        for labour in added:
+            db.delete(labour)
+            db.commit()
+        elapsed = time.perf_counter() - t
+    print(f"   update: {elapsed / 400 * 1e3:.2f} ms per commit (including the database write), {len(labour_index)} workers loaded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+End-to-end load test of the FastAPI app, fully offline. The app runs in-process against
+SQLite seeded with synthetic equipment, labour, projects and project history, and the
+LLM is the scripted fake model, so results are repeatable and cost nothing.
+
+Each scenario (chat, auth, admin) sends a fixed number of requests at the given
+concurrency and reports p50/p95/p99 latency, throughput, and LLM calls and SQL
+statements per request. Chat turns are a mix of fast-path catalog questions, direct
+answers, and turns where the model calls get_details.
+
+Results can be saved as JSON and compared with an earlier run, e.g. from another commit:
+    python -m benchmarks.load --output before.json
+    git checkout my-branch
+    python -m benchmarks.load --output after.json --compare before.json
+
+Run from the Backend directory:
+    python -m benchmarks.load --requests 200 --concurrency 8 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.sqlite")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("AUTH_SECRET", "benchmark-secret")
+os.environ.setdefault("CHECKPOINT_URL", "memory")
+# Logins are part of the load; production cost would make the auth scenario measure bcrypt only
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+SCENARIOS = ("chat", "auth", "admin")
+
+KINDS = ["excavator", "concrete mixer", "scaffolding", "generator", "jackhammer", "crane", "compactor", "water pump"]
+SKILLS = ["mason", "electrician", "carpenter", "plumber", "welder", "painter", "steel fixer", "tiler"]
+LOCATIONS = ["Colombo", "Kandy", "Galle", "Jaffna", "Negombo"]
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def seed(args, rng):
+    from sqlalchemy import insert
+    from database.database import Base, Session, engine
+    from database.models import Equipment, Labour, Project_Request, ProjectHistory, User
+    from utils import hash_pass
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    origin = datetime(2025, 1, 1)
+    with Session() as db:
+        db.execute(insert(Equipment), [
+            {"name": f"{KINDS[i % len(KINDS)]} {i}", "price_per_day": rng.uniform(20, 500), "units": rng.randint(1, 20), "available": rng.random() > 0.2}
+            for i in range(args.equipment)
+        ])
+        db.execute(insert(Labour), [
+            {"name": f"Worker {i}", "skillset": ", ".join(rng.sample(SKILLS, 2)), "hourly_rate": rng.uniform(5, 30), "available": rng.random() > 0.3}
+            for i in range(args.labours)
+        ])
+        db.execute(insert(Project_Request), [
+            {
+                "title": f"Project {i}", "description": f"Build a {rng.choice(['house', 'warehouse', 'road', 'bridge'])}",
+                "location": rng.choice(LOCATIONS), "status": rng.choice(["pending", "approved", "cancelled"]),
+                "start_date": origin + timedelta(days=rng.randrange(365)),
+            }
+            for i in range(args.projects)
+        ])
+        history = []
+        for i in range(args.history):
+            start = origin - timedelta(days=rng.randrange(3 * 365))
+            budget = rng.uniform(10_000, 1_000_000)
+            history.append({
+                "initial_budget": budget, "actual_cost": budget * rng.uniform(0.8, 1.4),
+                "start_date": start, "completion_date": start + timedelta(days=rng.randint(30, 400)),
+                "location": rng.choice(LOCATIONS), "workers_used": rng.randint(3, 80), "description": f"Past project {i}",
+            })
+        db.execute(insert(ProjectHistory), history)
+        # Hashed per user, since password hashes are unique
+        db.add_all([
+            User(username=f"{role}{i}", email=f"{role}{i}@example.com", phone_number="0", password=hash_pass("benchmark"), role=role)
+            for role in ("user", "admin") for i in range(10)
+        ])
+        db.commit()
+
+
+class Counters:
+    """SQL statements executed by the given engines, counted with a cursor event."""
+
+    def __init__(self, engines):
+        from sqlalchemy import event
+
+        self.statements = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.statements += 1
+
+
+def _chat_model(latency):
+    from langchain_core.messages import AIMessage, ToolMessage
+    from utils.fake_llm import FakeChatModel
+
+    def respond(messages):
+        # The role prompt is its system message followed by the history; every turn is a new conversation
+        last = messages[-1]
+        if isinstance(last, ToolMessage):
+            return "Here is what I found in our records."
+        if "SQL Result" in last.content:
+            return "The records show the requested details."
+        if "details" in last.content.lower():
+            return AIMessage(content="", tool_calls=[{"name": "get_details", "args": {"question": "available equipment under 100 per day"}, "id": "call-1"}])
+        return "Happy to help with your construction project."
+
+    return FakeChatModel(
+        responses=[respond],
+        structured_responses=[{"query": "SELECT name, price_per_day FROM equipment WHERE available = 1 AND price_per_day < 100 LIMIT 20"}],
+        latency=latency,
+    )
+
+
+def _chat_requests(args, rng, tokens):
+    messages = [
+        lambda: f"What's the daily price of a {KINDS[rng.randrange(len(KINDS))]} {rng.randrange(args.equipment)}?",
+        lambda: "Which workers are available for hire?",
+        lambda: "Hello, can you help me plan a small house extension?",
+        lambda: "Show me the details of available equipment under 100 per day",
+    ]
+    for i in range(args.requests):
+        yield "POST", "/chat/", {
+            "json": {"message": messages[i % len(messages)](), "conversation_id": f"load-{i}"},
+            "headers": {"Authorization": f"Bearer {tokens[i % len(tokens)]}"},
+        }
+
+
+def _auth_requests(args, rng, refresh_tokens):
+    for i in range(args.requests):
+        if i % 2:
+            yield "POST", "/auth/refresh", {"json": {"refresh_token": refresh_tokens[i % len(refresh_tokens)]}}
+        else:
+            yield "POST", "/auth/login", {"json": {"email": f"user{i % 10}@example.com", "password": "benchmark"}}
+
+
+def _admin_requests(args, rng):
+    listings = [
+        lambda: ("/admin/projects", {"status": rng.choice(["pending", "approved"]), "limit": 50}),
+        lambda: ("/admin/projects", {"sort": "start_date", "start_date_from": "2025-06-01T00:00:00", "limit": 20}),
+        lambda: ("/admin/equipment", {"available": "true", "limit": 100}),
+        lambda: ("/admin/labours", {"limit": 100}),
+        lambda: ("/admin/equipment-requests", {"status": "approved", "limit": 50}),
+    ]
+    for i in range(args.requests):
+        path, params = listings[i % len(listings)]()
+        yield "GET", path, {"params": params}
+
+
+async def run_scenario(client, name, requests, concurrency, model, counters) -> dict:
+    queue = list(requests)
+    queue.reverse()
+    latencies, errors = [], 0
+    llm_calls, statements = model.calls, counters.statements
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            method, path, kwargs = queue.pop()
+            start = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(_percentile(latencies, 0.95), 2),
+        "p99_ms": round(_percentile(latencies, 0.99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "llm_calls_per_request": round((model.calls - llm_calls) / count, 3),
+        "sql_per_request": round((counters.statements - statements) / count, 2),
+    }
+
+
+def report(results, baseline=None):
+    print(f"{'scenario':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'LLM/req':>8} {'SQL/req':>8} {'errors':>7}")
+    for name, result in results["scenarios"].items():
+        print(
+            f"{name:>8} {result['throughput_rps']:8.1f} {result['p50_ms']:8.1f} {result['p95_ms']:8.1f} {result['p99_ms']:8.1f} "
+            f"{result['llm_calls_per_request']:8.2f} {result['sql_per_request']:8.1f} {result['errors']:7d}"
+        )
+        before = (baseline or {}).get("scenarios", {}).get(name)
+        if before:
+            deltas = []
+            for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "llm_calls_per_request", "sql_per_request"):
+                if before[key]:
+                    deltas.append(f"{key} {100 * (result[key] - before[key]) / before[key]:+.1f}%")
+            print(f"{'':>8} vs {baseline.get('commit', '?')}: " + ", ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of " + ", ".join(SCENARIOS))
+    parser.add_argument("--equipment", type=int, default=2000)
+    parser.add_argument("--labours", type=int, default=2000)
+    parser.add_argument("--projects", type=int, default=5000)
+    parser.add_argument("--history", type=int, default=10000, help="ProjectHistory rows")
+    parser.add_argument("--seed", type=int, default=17)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    import httpx
+    from database.database import engine, get_async_engine, get_readonly_engine
+    from main import app
+    from utils import set_llm
+
+    rng = random.Random(args.seed)
+    engine.echo = False
+    start = time.perf_counter()
+    seed(args, rng)
+    print(f"seeded in {time.perf_counter() - start:.1f} s")
+
+    model = _chat_model(args.latency)
+    set_llm(model)
+    readonly = get_readonly_engine()
+    counters = Counters([engine, get_async_engine().sync_engine] + ([readonly] if readonly is not engine else []))
+    results = {
+        "commit": _commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": vars(args),
+        "scenarios": {},
+    }
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        # Runs the startup and shutdown hooks (index preloading, closing the checkpointer)
+        async with app.router.lifespan_context(app), httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+            sessions = []
+            for i in range(10):
+                for role in ("user", "admin"):
+                    response = await client.post("/auth/login", json={"email": f"{role}{i}@example.com", "password": "benchmark"})
+                    response.raise_for_status()
+                    sessions.append(response.json())
+            access_tokens = [session["access_token"] for session in sessions]
+            refresh_tokens = [session["refresh_token"] for session in sessions]
+            requests = {
+                "chat": lambda: _chat_requests(args, rng, access_tokens),
+                "auth": lambda: _auth_requests(args, rng, refresh_tokens),
+                "admin": lambda: _admin_requests(args, rng),
+            }
+            for name in scenarios:
+                results["scenarios"][name] = await run_scenario(client, name, requests[name](), args.concurrency, model, counters)
+
+    asyncio.run(run())
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
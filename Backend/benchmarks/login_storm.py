@@ -0,0 +1,111 @@
+"""
+Measures /chat/ latency while a storm of concurrent /auth/login requests runs, with
+bcrypt on the hashing pool vs. inline on the event loop (the old behaviour), plus a
+quiet baseline. Uses the fake LLM, so only the server's own work is measured.
+
+Run from the Backend directory:
+    python -m benchmarks.login_storm --logins 64 --seconds 5 --rounds 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.sqlite")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("AUTH_SECRET", "benchmark-secret")
+os.environ.setdefault("CHECKPOINT_URL", "memory")
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=64, help="concurrent login clients in the storm")
+    parser.add_argument("--chats", type=int, default=4, help="concurrent chat clients")
+    parser.add_argument("--seconds", type=float, default=5.0, help="length of each phase")
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost")
+    args = parser.parse_args()
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+
+    import httpx
+    from database.database import Base, Session, engine
+    from database.models import User
+    from main import app
+    from routes import auth as auth_routes
+    from utils import hash_pass, set_llm
+    from utils.auth import verify_and_update
+    from utils.fake_llm import FakeChatModel
+    from agent.checkpointer import checkpointer
+
+    engine.echo = False
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with Session() as db:
+        db.add_all(
+            User(username=f"user{i}", email=f"user{i}@example.com", phone_number="0", password=hash_pass("benchmark"), role="user")
+            for i in range(20)
+        )
+        db.commit()
+    set_llm(FakeChatModel(responses=["Hello, how can I help?"], latency=0.02))
+
+    async def inline_verify(plain_password, hashed_password):
+        return verify_and_update(plain_password, hashed_password)
+
+    async def phase(client, label, storm):
+        stop = time.perf_counter() + args.seconds
+        chat_latencies, logins, refused = [], 0, 0
+
+        async def chatter(n):
+            i = 0
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                response = await client.post("/chat/", json={"message": "hello there", "user_id": f"chat{n}", "conversation_id": f"{label}-{i}"})
+                response.raise_for_status()
+                chat_latencies.append((time.perf_counter() - start) * 1000)
+                i += 1
+
+        async def login(n):
+            nonlocal logins, refused
+            while time.perf_counter() < stop:
+                response = await client.post("/auth/login", json={"email": f"user{n % 20}@example.com", "password": "benchmark"})
+                if response.status_code == 503:
+                    refused += 1
+                    await asyncio.sleep(float(response.headers.get("Retry-After", "1")) / 10)
+                else:
+                    response.raise_for_status()
+                    logins += 1
+
+        workers = [chatter(n) for n in range(args.chats)]
+        if storm:
+            workers += [login(n) for n in range(args.logins)]
+        await asyncio.gather(*workers)
+        print(
+            f"{label:>14}: chat p50 {statistics.median(chat_latencies):7.1f} ms, p95 {_percentile(chat_latencies, 0.95):7.1f} ms, "
+            f"max {max(chat_latencies):7.1f} ms | {logins / args.seconds:6.1f} logins/s, {refused} refused with 503"
+        )
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+                await phase(client, "quiet", storm=False)
+                await phase(client, "storm, pool", storm=True)
+                pooled = auth_routes.averify_and_update
+                auth_routes.averify_and_update = inline_verify
+                try:
+                    await phase(client, "storm, inline", storm=True)
+                finally:
+                    auth_routes.averify_and_update = pooled
+        finally:
+            await checkpointer.aclose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Times an agent turn in which the model issues several get_details calls at once,
+with tool calls run one at a time vs. in parallel. Uses the fake LLM with a fixed
+per-call latency, so it runs offline.
+
+Run from the Backend directory:
+    python -m benchmarks.parallel_tools --tools 3 --latency 0.3
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.sqlite")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("CHECKPOINT_URL", "memory")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tools", type=int, default=3, help="get_details calls in the agent step")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per fake LLM call")
+    args = parser.parse_args()
+
+    from langchain_core.messages import AIMessage, ToolMessage
+    from database.database import Base, engine
+    from utils import set_llm
+    from utils.fake_llm import FakeChatModel
+    from agent import get_chat_response
+    from agent.checkpointer import checkpointer
+    from agent.tools import concurrency
+    from schema import ChatRequest
+
+    engine.echo = False
+    Base.metadata.create_all(engine)
+
+    def respond(messages):
+        # The role prompt is its system message followed by the history
+        if isinstance(messages[-1], ToolMessage):
+            return "Here is everything you asked for."
+        if "SQL Result" in messages[-1].content:
+            return "Result summary."
+        return AIMessage(content="", tool_calls=[
+            {"name": "get_details", "args": {"question": f"question {i} about {time.time()}"}, "id": f"call-{i}"}
+            for i in range(args.tools)
+        ])
+
+    set_llm(FakeChatModel(
+        responses=[respond],
+        structured_responses=[{"query": "SELECT name, price_per_day FROM equipment LIMIT 10"}],
+        latency=args.latency,
+    ))
+
+    async def turn(limit, n):
+        concurrency.TOOL_CONCURRENCY_PER_REQUEST = limit
+        start = time.perf_counter()
+        await get_chat_response(ChatRequest(message="What equipment and labour do you have?", user_id="bench", conversation_id=f"{limit}-{n}"))
+        return time.perf_counter() - start
+
+    async def run():
+        try:
+            for label, limit in (("sequential", 1), ("parallel", args.tools)):
+                elapsed = min([await turn(limit, n) for n in range(3)])
+                print(f"{label:>10}: {elapsed:.2f} s per turn ({args.tools} tool calls, 2 LLM calls each, {args.latency}s/call)")
+        finally:
+            await checkpointer.aclose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Sends a burst of concurrent chat turns that all ask the same catalog question (each
+answered through get_details), with single-flight coalescing on and off. Uses the fake
+LLM with a fixed per-call latency and counts the model calls made.
+
+Run from the Backend directory:
+    python -m benchmarks.singleflight --users 32 --latency 0.3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark.sqlite")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("CHECKPOINT_URL", "memory")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=32, help="concurrent chat turns in the burst")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per fake LLM call")
+    args = parser.parse_args()
+
+    from langchain_core.messages import AIMessage, ToolMessage
+    from database.database import Base, Session, engine
+    from database.models import Equipment
+    from utils import set_llm
+    from utils.fake_llm import FakeChatModel
+    from utils import singleflight
+    import agent.agent
+    from agent import get_chat_response
+    from agent.admission import Scheduler
+    from agent.checkpointer import checkpointer
+    from agent.tools.query_cache import result_cache, sql_cache
+    from schema import ChatRequest
+
+    engine.echo = False
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with Session() as db:
+        db.add_all(Equipment(name=f"equipment {i}", price_per_day=10.0 + i) for i in range(50))
+        db.commit()
+
+    def respond(messages):
+        if isinstance(messages[-1], ToolMessage):
+            return "Here is what we have."
+        if "SQL Result" in messages[-1].content:
+            return "Equipment under 50 per day: ..."
+        return AIMessage(content="", tool_calls=[{"name": "get_details", "args": {"question": "Which equipment costs under 50 per day?"}, "id": "call-1"}])
+
+    model = FakeChatModel(
+        responses=[respond],
+        structured_responses=[{"query": "SELECT name, price_per_day FROM equipment WHERE price_per_day < 50"}],
+        latency=args.latency,
+    )
+    set_llm(model)
+    # Admit the whole burst at once, so no turn is refused and both runs do the same work
+    agent.agent.scheduler = Scheduler(concurrency=args.users, role_limits={}, queue_limit=args.users)
+
+    async def burst(label, enabled):
+        singleflight.SINGLE_FLIGHT_ENABLED = enabled
+        # Start cold each time, so the caches don't hide the difference
+        sql_cache.invalidate()
+        result_cache.invalidate()
+        calls = model.calls
+
+        async def turn(n):
+            start = time.perf_counter()
+            await get_chat_response(ChatRequest(message="Do you have any cheap equipment?", user_id=f"user{n}", conversation_id=label))
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(turn(n) for n in range(args.users)))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{label:>14}: {model.calls - calls:4d} LLM calls, turn p50 {statistics.median(latencies):.2f} s, "
+            f"max {max(latencies):.2f} s, burst {elapsed:.2f} s"
+        )
+
+    async def run():
+        try:
+            await burst("coalescing off", False)
+            await burst("coalescing on", True)
+        finally:
+            await checkpointer.aclose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Cold start report: how long `import main` takes, which packages that time goes to, and
+the time until the app is ready (imports plus the startup warm-up) in a fresh process.
+
+Every measurement runs in a new interpreter, so nothing is cached between runs; the
+median of --runs runs is reported. The database is SQLite with the app's tables created
+up front and the LLM client is built but never called, so no network access is needed.
+
+For CI, the thresholds make the script exit with status 1 when they are exceeded, and
+--forbid fails it when `import main` loads a module that should only be loaded on first
+use:
+    python -m benchmarks.startup --max-import-seconds 2.5 --max-ready-seconds 6 --forbid openai
+
+Run from the Backend directory:
+    python -m benchmarks.startup --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmark_startup.sqlite")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("AUTH_SECRET", "benchmark-secret")
+os.environ.setdefault("CHECKPOINT_URL", "memory")
+
+PREPARE = """
+import main
+from database.database import Base, get_engine
+Base.metadata.create_all(get_engine())
+"""
+
+# Prints the import and warm-up times once the lifespan startup has finished; the parent
+# takes the wall time from spawning the process to that line as time-to-ready.
+READY = """
+import time
+started = time.perf_counter()
+import asyncio, json
+import main
+imported = time.perf_counter()
+
+async def run():
+    async with main.app.router.lifespan_context(main.app):
+        ready = time.perf_counter()
+        steps = {key[0]: value for key, value in main.STARTUP_SECONDS._values.items()}
+        print(json.dumps({"import_s": imported - started, "startup_s": ready - imported, "steps": steps}), flush=True)
+
+asyncio.run(run())
+"""
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _python(*args, **kwargs):
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True, **kwargs)
+
+
+def import_profile() -> tuple:
+    """
+    Runs `import main` under -X importtime and returns (total seconds, seconds per
+    top-level package, set of modules imported).
+    """
+    stderr = _python("-X", "importtime", "-c", "import main").stderr
+    packages, modules, total = {}, set(), 0.0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        modules.add(name)
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1e6
+        if name == "main":
+            total = int(cumulative_us) / 1e6
+    return total, packages, modules
+
+
+def ready_time() -> dict:
+    """Starts a fresh process that imports the app and runs its startup; returns the timings."""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", READY], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    ready = time.perf_counter() - started
+    _, stderr = process.communicate()
+    if process.returncode or not line:
+        raise RuntimeError(f"startup failed:\n{stderr}")
+    return {"ready_s": ready, **json.loads(line)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="fresh processes per measurement; the median is reported")
+    parser.add_argument("--top", type=int, default=15, help="packages listed by import time")
+    parser.add_argument("--max-import-seconds", type=float, help="fail if `import main` takes longer")
+    parser.add_argument("--max-ready-seconds", type=float, help="fail if time-to-ready is longer")
+    parser.add_argument("--forbid", action="append", default=[], metavar="MODULE",
+                        help="fail if `import main` imports this module (repeatable)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    _python("-c", PREPARE)
+
+    profiles = [import_profile() for _ in range(args.runs)]
+    readies = [ready_time() for _ in range(args.runs)]
+
+    import_s = statistics.median(total for total, _, _ in profiles)
+    packages = {package: statistics.median(profile[1].get(package, 0.0) for profile in profiles) for package in profiles[0][1]}
+    modules = profiles[0][2]
+    ready = {key: statistics.median(run[key] for run in readies) for key in ("ready_s", "import_s", "startup_s")}
+    steps = {step: statistics.median(run["steps"].get(step, 0.0) for run in readies) for step in readies[0]["steps"]}
+
+    print(f"import main: {import_s:.3f} s under -X importtime ({len(modules)} modules)")
+    for package, seconds in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {package:<28} {seconds * 1000:8.1f} ms")
+    print(f"time to ready: {ready['ready_s']:.3f} s (import {ready['import_s']:.3f} s, startup {ready['startup_s']:.3f} s)")
+    for step, seconds in sorted(steps.items(), key=lambda item: -item[1]):
+        print(f"  {step:<28} {seconds * 1000:8.1f} ms")
+
+    failures = []
+    if args.max_import_seconds is not None and import_s > args.max_import_seconds:
+        failures.append(f"import main took {import_s:.3f} s, over {args.max_import_seconds} s")
+    if args.max_ready_seconds is not None and ready["ready_s"] > args.max_ready_seconds:
+        failures.append(f"time to ready was {ready['ready_s']:.3f} s, over {args.max_ready_seconds} s")
+    for module in args.forbid:
+        if module in modules:
+            failures.append(f"import main imports {module}")
+
+    if args.output:
+        results = {
+            "commit": _commit(),
+            "runs": args.runs,
+            "import_s": import_s,
+            "import_by_package_s": packages,
+            **ready,
+            "startup_steps_s": steps,
+            "failures": failures,
+        }
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-import os   
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker, scoped_session
+import functools
+import math
+import os
+import threading
+import time
 from dotenv import load_dotenv, find_dotenv
 
 
@@ -11,12 +17,199 @@ load_dotenv(find_dotenv())
 Base = declarative_base()
 
 
-# Create an engine and bind it to the base
-engine = create_engine(os.getenv("DATABASE_URL"), echo=True)
+DATABASE_URL = os.getenv("DATABASE_URL")
+# Logs every SQL statement; for debugging only, it is slow on the request path
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+
+# Async drivers used for the FastAPI routes when ASYNC_DATABASE_URL isn't set
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def _async_url(url: str) -> str:
+    url = make_url(url)
+    return url.set(drivername=_ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)).render_as_string(hide_password=False)
+
+
+def pool_options(url: str) -> dict:
+    """
+    Returns the connection pool settings for an engine, read from the environment.
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE and DB_POOL_PRE_PING
+    are applied to every engine; in-memory SQLite uses a single-connection pool that
+    doesn't accept them.
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+    }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Returns the sync engine, created on first use.
+
+    Creating it imports the DBAPI driver, so the app only pays for that once something
+    talks to the database (normally the startup warm-up). Also available as the module
+    attribute `engine`.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(DATABASE_URL, echo=DB_ECHO, **pool_options(DATABASE_URL))
+                Session.configure(bind=_engine)
+    return _engine
+
+
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker that creates the engine before the first session is made."""
+
+    def __call__(self, **local_kw):
+        get_engine()
+        return super().__call__(**local_kw)
 
-# Create the tables in the database
 
 # Create a session
-Session = sessionmaker(bind=engine)
+Session = _LazySessionmaker()
+
+# Thread-local session used by the agent tools. The ToolNode runs sync tools on worker
+# threads, so each thread gets its own session; wrap tools with `release_session` so the
+# session is returned to the pool once the tool call finishes.
+session = scoped_session(Session)
+
+
+def __getattr__(name):
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def release_session(func):
+    """Removes the calling thread's scoped session after the wrapped function returns."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            session.remove()
+    return wrapper
+
+
+def get_session():
+    """FastAPI dependency yielding a sync session for the duration of one request."""
+    db = Session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_engine():
+    """Returns the async engine used by the routes, created on first use so the async driver is only needed when it runs."""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=DB_ECHO, **pool_options(ASYNC_DATABASE_URL))
+        _async_session_factory = async_sessionmaker(_async_engine, expire_on_commit=False)
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    """Creates a new AsyncSession bound to the async engine."""
+    get_async_engine()
+    return _async_session_factory()
+
+
+async def get_async_session():
+    """FastAPI dependency yielding an AsyncSession for the duration of one request."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Connection for model-generated queries (get_details). Defaults to the main database;
+# point it at a replica or a role with SELECT-only grants to keep them off the primary.
+READONLY_DATABASE_URL = os.getenv("READONLY_DATABASE_URL") or DATABASE_URL
+# Seconds a statement on the read-only engine may run before the database cancels it
+SQL_STATEMENT_TIMEOUT = float(os.getenv("SQL_STATEMENT_TIMEOUT", "5"))
+
+_readonly_engine = None
+
+
+def _readonly_connect_args(url) -> dict:
+    # Postgres and MySQL enforce read-only transactions and the timeout server-side
+    timeout_ms = int(SQL_STATEMENT_TIMEOUT * 1000)
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        return {"options": f"-c default_transaction_read_only=on -c statement_timeout={timeout_ms}"}
+    if backend == "mysql":
+        return {"init_command": f"SET SESSION transaction_read_only = 1, SESSION max_execution_time = {timeout_ms}"}
+    return {}
+
+
+def _sqlite_readonly(dbapi_connection, connection_record):
+    # SQLite has no statement timeout; a progress handler aborts the statement (with
+    # "interrupted") once the deadline set when it started has passed.
+    dbapi_connection.execute("PRAGMA query_only = ON")
+    info = connection_record.info
+    dbapi_connection.set_progress_handler(lambda: time.monotonic() > info.get("statement_deadline", math.inf), 10000)
+
+
+def _sqlite_deadline(conn, cursor, statement, parameters, context, executemany):
+    conn.connection.info["statement_deadline"] = time.monotonic() + SQL_STATEMENT_TIMEOUT
+
+
+def _sqlite_checkin(dbapi_connection, connection_record):
+    connection_record.info.pop("statement_deadline", None)
+
+
+def get_readonly_engine():
+    """
+    Returns the engine for model-generated queries, created on first use. Its
+    connections are read-only and cancel statements running longer than
+    SQL_STATEMENT_TIMEOUT, and it has its own pool, so a slow generated query can't
+    hold up the connections that write bookings.
+
+    An in-memory SQLite database can't be opened twice, so there the main engine is
+    returned and only the query guard keeps generated queries read-only.
+    """
+    global _readonly_engine
+    url = make_url(READONLY_DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return get_engine()
+    if _readonly_engine is None:
+        with _engine_lock:
+            if _readonly_engine is None:
+                engine = create_engine(
+                    READONLY_DATABASE_URL,
+                    echo=DB_ECHO,
+                    connect_args=_readonly_connect_args(url),
+                    **pool_options(READONLY_DATABASE_URL),
+                )
+                if url.get_backend_name() == "sqlite":
+                    event.listen(engine, "connect", _sqlite_readonly)
+                    event.listen(engine, "before_cursor_execute", _sqlite_deadline)
+                    event.listen(engine, "checkin", _sqlite_checkin)
+                _readonly_engine = engine
+    return _readonly_engine
 
-session = Session()
+# Registers the commit hooks that version tables for the read caches
+from database import events
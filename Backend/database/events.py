@@ -0,0 +1,107 @@
+import logging
+import threading
+from collections import namedtuple
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+
+# A committed row change. `values` holds the row's column values (as of the flush for
+# inserts/updates; for deletes the primary key and whatever else was loaded) and
+# `previous` the old values of the columns an update changed.
+Change = namedtuple("Change", ["op", "table", "values", "previous"])
+
+_versions = {}
+_versions_lock = threading.Lock()
+_listeners = []
+
+logger = logging.getLogger(__name__)
+
+
+def table_version(table: str) -> int:
+    """Returns the number of committed transactions that have written to the table."""
+    return _versions.get(table, 0)
+
+
+def table_versions(tables) -> tuple:
+    """Returns the current versions of the given tables, usable as part of a cache key."""
+    return tuple(_versions.get(table, 0) for table in tables)
+
+
+def on_commit(listener):
+    """
+    Registers a callable that receives the list of Change objects of every committed
+    ORM transaction. It is called after the table versions have been bumped.
+    """
+    _listeners.append(listener)
+    return listener
+
+
+def _snapshot(session, state, load: bool = True) -> dict:
+    """
+    Returns the column values of a flushed object. Columns the object doesn't have loaded
+    (expired by an earlier commit, deferred, or filled in by a server default) are read
+    from the row on the flushing connection, so listeners never see them as None.
+    """
+    mapper = state.mapper
+    values = {attr.key: state.dict[attr.key] for attr in mapper.column_attrs if attr.key in state.dict}
+    keys = [mapper.get_property_by_column(column).key for column in mapper.primary_key]
+    # An expired object still has its primary key in its identity
+    for key, value in zip(keys, state.identity or ()):
+        values.setdefault(key, value)
+    missing = [attr for attr in mapper.column_attrs if attr.key not in values]
+    if load and missing and all(values.get(key) is not None for key in keys):
+        row = session.connection().execute(
+            select(*(attr.columns[0] for attr in missing))
+            .where(*(column == values[key] for column, key in zip(mapper.primary_key, keys)))
+        ).first()
+        if row is not None:
+            values.update(zip((attr.key for attr in missing), row))
+    return values
+
+
+def _previous(state) -> dict:
+    previous = {}
+    for attr in state.mapper.column_attrs:
+        history = state.attrs[attr.key].history
+        if history.deleted:
+            previous[attr.key] = history.deleted[0]
+    return previous
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    changes = session.info.setdefault("committed_changes", [])
+    for obj in session.new:
+        state = inspect(obj)
+        changes.append(Change("insert", state.mapper.local_table.name, _snapshot(session, state), {}))
+    for obj in session.dirty:
+        state = inspect(obj)
+        previous = _previous(state)
+        # A column set while expired has no old value, so look for any change, not just known old values
+        if previous or any(state.attrs[attr.key].history.has_changes() for attr in state.mapper.column_attrs):
+            changes.append(Change("update", state.mapper.local_table.name, _snapshot(session, state), previous))
+    for obj in session.deleted:
+        state = inspect(obj)
+        # The row is already gone
+        changes.append(Change("delete", state.mapper.local_table.name, _snapshot(session, state, load=False), {}))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session):
+    changes = session.info.pop("committed_changes", None)
+    if not changes:
+        return
+    with _versions_lock:
+        for table in {change.table for change in changes}:
+            _versions[table] = _versions.get(table, 0) + 1
+    for listener in _listeners:
+        try:
+            listener(changes)
+        except Exception:
+            # The transaction is already committed; a broken listener must not fail the caller
+            logger.exception("commit listener %r failed", listener)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("committed_changes", None)
@@ -2,7 +2,7 @@ from encodings import unicode_escape
 from enum import auto
 from gc import disable
 from os import access
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, DECIMAL, Enum, Text, TIMESTAMP, Float, DateTime, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, DECIMAL, Enum, Text, TIMESTAMP, Float, DateTime, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from database.database import Base
@@ -25,13 +25,35 @@ class Token(Base):
     __tablename__ = 'tokens'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
+    # Token ids, not the tokens: the current access token's jti and the session id (the refresh token's sid)
     access_token = Column(String(255), nullable=False)
-    refresh_token = Column(String(255), nullable=False)
+    refresh_token = Column(String(255), nullable=False, unique=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+    revoked = Column(Boolean, nullable=False, default=False, server_default="0")
+
+    __table_args__ = (
+        Index("ix_tokens_revoked_expires_at", "revoked", "expires_at"),
+    )
+
+
+class ChatThread(Base):
+    __tablename__ = 'chat_threads'
+    
+    thread_id = Column(String(255), primary_key=True)  # "<user id>:<conversation id>", see agent.checkpointer
+    user_id = Column(String(100), nullable=True)
+    last_active = Column(DateTime, default=datetime.utcnow, index=True)
     
 
 
 class Equipment_Request(Base):
     __tablename__ = 'equipment_requests'
+    # Keyset listings filter on status or start_date and page by id; availability loads by equipment
+    __table_args__ = (
+        Index("ix_equipment_requests_status_id", "status", "id"),
+        Index("ix_equipment_requests_start_date_id", "start_date", "id"),
+        Index("ix_equipment_requests_equipment_id_status", "equipment_id", "status"),
+    )
     
     id = Column(Integer, primary_key=True)
     location = Column(String(255), nullable=True)
@@ -45,18 +67,25 @@ class Equipment_Request(Base):
 
 class Equipment(Base):
     __tablename__ = 'equipment'
+    __table_args__ = (
+        Index("ix_equipment_available_id", "available", "id"),
+    )
     
     id = Column(Integer, primary_key=True)
     name = Column(String(200), nullable=False)
     description = Column(String(500), nullable=True)
     price_per_day = Column(Float, nullable=False)
     available = Column(Boolean, default=True)  # Indicates if the equipment is available for hire
+    units = Column(Integer, nullable=False, default=1, server_default="1")  # Number of units that can be hired out at the same time
     
     requests = relationship('Equipment_Request', back_populates='equipment', cascade="all, delete-orphan")
     
     
 class Labour(Base):
     __tablename__ = 'labours'
+    __table_args__ = (
+        Index("ix_labours_available_id", "available", "id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(200), nullable=False)
@@ -71,6 +100,11 @@ class Labour(Base):
     
 class Project_Request(Base):
     __tablename__ = 'project_requests'
+    # Keyset listings filter on status or start_date and page by id
+    __table_args__ = (
+        Index("ix_project_requests_status_id", "status", "id"),
+        Index("ix_project_requests_start_date_id", "start_date", "id"),
+    )
     
     id = Column(Integer, primary_key=True)
     location = Column(String(255), nullable=True)
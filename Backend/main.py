@@ -1,23 +1,42 @@
-from database.database import Base, engine
-from fastapi import FastAPI, HTTPException
+import asyncio
+import logging
+import time
+from database.database import Base, get_async_engine, get_engine, get_readonly_engine
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import text
 import uvicorn
-from schema import ChatRequest, ChatResponse, RegisterRequest
-from agent import get_agent
-from utils import config
+from agent import warm_agents
+from agent.checkpointer import checkpointer
+from agent.tools.sql_database import get_table_info
 from dotenv import load_dotenv, find_dotenv
-from database.models import User
-from database.database import session
 from routes.admin import admin_router
 from routes.auth import auth_router
 from routes.chat import chat_router
+from routes.client import client_router
+from routes.catalog import catalog_router
+from routes.metrics import metrics_router
+from routes.projects import projects_router
+from services.equipment_index import equipment_index
+from services.availability import availability
+from services.cost_estimates import cost_estimator
+from services.labour_index import labour_index
+from services.tokens import TOKEN_REVOCATION_SYNC, load_revocations
+from utils.metrics import Gauge, TraceMiddleware
 
+logger = logging.getLogger(__name__)
+
+_background_tasks = []
 
 app = FastAPI()
 
 app.include_router(admin_router)
 app.include_router(auth_router)
 app.include_router(chat_router)
+app.include_router(client_router)
+app.include_router(catalog_router)
+app.include_router(metrics_router)
+app.include_router(projects_router)
 
 # Add CORS middleware
 app.add_middleware(
@@ -26,7 +45,81 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id"],
 )
+# Outermost, so the request duration includes the other middleware
+app.add_middleware(TraceMiddleware)
+
+STARTUP_SECONDS = Gauge("app_startup_seconds", "Seconds spent on each startup warm-up step, and on all of them", ["step"])
+
+
+def _warm_sync_pool():
+    # The first connection also runs the dialect's initialization queries
+    for engine in {get_engine(), get_readonly_engine()}:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+
+async def _warm_async_pool():
+    async with get_async_engine().connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def _warm(step: str, func):
+    """Runs one warm-up step (sync functions on a worker thread) and records how long it took."""
+    started = time.perf_counter()
+    try:
+        if asyncio.iscoroutinefunction(func):
+            await func()
+        else:
+            await asyncio.to_thread(func)
+    except Exception:
+        # Whatever didn't warm up is built on first use instead
+        logger.exception("startup: %s failed", step)
+    elapsed = time.perf_counter() - started
+    STARTUP_SECONDS.set(elapsed, step=step)
+    logger.info("startup: %s took %.1f ms", step, elapsed * 1000)
+
+
+@app.on_event("startup")
+async def startup():
+    # Everything deferred at import time (chat model client, engines, schema reflection) is
+    # built here, with independent steps overlapping so the first requests don't pay for them.
+    started = time.perf_counter()
+    await asyncio.gather(
+        # Compile the per-role agent graphs once so chat requests reuse them
+        _warm("agents", warm_agents),
+        _warm("db_pool", _warm_sync_pool),
+        _warm("async_db_pool", _warm_async_pool),
+        # Reflect the schema and render the table info for the get_details prompt
+        _warm("schema", get_table_info),
+        # The equipment and labour indexes, availability schedules and cost distributions are kept in sync after this
+        _warm("equipment_index", equipment_index.ensure_loaded),
+        _warm("availability", availability.ensure_loaded),
+        _warm("cost_estimator", cost_estimator.ensure_loaded),
+        _warm("labour_index", labour_index.ensure_loaded),
+    )
+    STARTUP_SECONDS.set(time.perf_counter() - started, step="total")
+    logger.info("startup: ready in %.1f ms", (time.perf_counter() - started) * 1000)
+    # Replay logged-out sessions from the tokens table, then keep picking up other workers' logouts
+    _background_tasks.append(asyncio.create_task(_sync_revocations()))
+
+
+async def _sync_revocations():
+    while True:
+        try:
+            await asyncio.to_thread(load_revocations)
+        except Exception:
+            logger.exception("could not load token revocations")
+        await asyncio.sleep(TOKEN_REVOCATION_SYNC)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    for task in _background_tasks:
+        task.cancel()
+    await checkpointer.aclose()
+
 
 @app.get("/")
 async def health_check():
@@ -41,6 +134,6 @@ async def health_check():
 
 if __name__ == "__main__":
     load_dotenv(find_dotenv())
-    Base.metadata.create_all(engine)
+    Base.metadata.create_all(get_engine())
     uvicorn.run(app, port=8080)
     
@@ -1,6 +1,13 @@
-from fastapi import APIRouter
-from database.database import session, Base, engine
-from database.models import Project_Request
+import asyncio
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.database import get_async_session
+from database.models import Equipment, Equipment_Request, Labour, Project_Request
+from services.availability import BOOKED_STATUS, availability, free_units_for_update
+from services.listing import MAX_PAGE_SIZE, Listing
 
 
 admin_router = APIRouter(
@@ -9,29 +16,174 @@ admin_router = APIRouter(
 )
 
 
+def _dated_filters(model) -> dict:
+    return {
+        "status": lambda value: model.status == value,
+        "start_date_from": lambda value: model.start_date >= value,
+        "start_date_to": lambda value: model.start_date <= value,
+    }
+
+
+PROJECTS = Listing(
+    Project_Request,
+    columns=["id", "title", "location", "status", "start_date"],
+    optional=["description"],
+    filters=_dated_filters(Project_Request),
+    sorts={"id": ["id"], "start_date": ["start_date", "id"]},
+)
+EQUIPMENT_REQUESTS = Listing(
+    Equipment_Request,
+    columns=["id", "equipment_id", "quantity", "number_of_dates", "location", "start_date", "status"],
+    filters=_dated_filters(Equipment_Request),
+    sorts={"id": ["id"], "start_date": ["start_date", "id"]},
+)
+EQUIPMENT = Listing(
+    Equipment,
+    columns=["id", "name", "price_per_day", "available", "units"],
+    optional=["description"],
+    filters={"available": lambda value: Equipment.available.is_(value)},
+)
+LABOURS = Listing(
+    Labour,
+    columns=["id", "name", "skillset", "hourly_rate", "available"],
+    filters={"available": lambda value: Labour.available.is_(value)},
+)
+
+
+async def _list(listing: Listing, key: str, db: AsyncSession, limit: int, cursor: str, fields: str, sort: str, format: str, **filters):
+    """
+    Returns a page as {key: [...], "next_cursor": ...}, or with format=ndjson streams
+    every matching row from the cursor on, one JSON object per line.
+    """
+    if format == "ndjson":
+        # Validate the parameters before the response starts
+        listing.statement(fields, sort, cursor, **filters)
+        return StreamingResponse(listing.export(fields, sort, cursor, **filters), media_type="application/x-ndjson")
+    page = await listing.page(db, limit, fields, sort, cursor, **filters)
+    return {key: page["items"], "next_cursor": page["next_cursor"]}
+
+
 @admin_router.get("/projects")
-async def get_projects():
-    projects = session.query(Project_Request).all()
-    return {"projects": projects}
+async def get_projects(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    start_date_from: Optional[datetime] = None,
+    start_date_to: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns, e.g. id,title,description"),
+    sort: Optional[str] = Query(None, description="id (default) or start_date"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await _list(
+        PROJECTS, "projects", db, limit, cursor, fields, sort, format,
+        status=status, start_date_from=start_date_from, start_date_to=start_date_to,
+    )
+
+
+@admin_router.get("/equipment-requests")
+async def get_equipment_requests(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    start_date_from: Optional[datetime] = None,
+    start_date_to: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    sort: Optional[str] = Query(None, description="id (default) or start_date"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await _list(
+        EQUIPMENT_REQUESTS, "equipment_requests", db, limit, cursor, fields, sort, format,
+        status=status, start_date_from=start_date_from, start_date_to=start_date_to,
+    )
+
+
+@admin_router.get("/equipment")
+async def get_equipment(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    available: Optional[bool] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns, e.g. id,name,description"),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await _list(EQUIPMENT, "equipment", db, limit, cursor, fields, None, format, available=available)
+
+
+@admin_router.get("/labours")
+async def get_labours(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    available: Optional[bool] = None,
+    fields: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await _list(LABOURS, "labours", db, limit, cursor, fields, None, format, available=available)
 
 
 @admin_router.put("/approve/{project_id}")
-def approve_project(project_id: int):
-    project = session.query(Project_Request).filter_by(id=project_id).first()
+async def approve_project(project_id: int, db: AsyncSession = Depends(get_async_session)):
+    project = await db.get(Project_Request, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
     project.status = "approved"
-    session.commit()
+    await db.commit()
     
     return {"message": "Project approved successfully"}
 
 
 @admin_router.put("/cancel/{project_id}")
-def approve_project(project_id: int):
-    project = session.query(Project_Request).filter_by(id=project_id).first()
+async def cancel_project(project_id: int, db: AsyncSession = Depends(get_async_session)):
+    project = await db.get(Project_Request, project_id)
     if not project:
-        return {"message": "Project not found"}
-    else:
-        project.status = "approved"
-        session.commit()
-        
-        return {"message": "Project cancelled successfully"}
+        raise HTTPException(status_code=404, detail="Project not found")
+    project.status = "cancelled"
+    await db.commit()
+
+    return {"message": "Project cancelled successfully"}
+
+
+@admin_router.put("/equipment-requests/approve/{request_id}")
+async def approve_equipment_request(request_id: int, db: AsyncSession = Depends(get_async_session)):
+    request = await db.get(Equipment_Request, request_id)
+    if not request:
+        raise HTTPException(status_code=404, detail="Equipment request not found")
+    if request.status != BOOKED_STATUS:
+        quantity, number_of_dates = request.quantity, request.number_of_dates or 1
+        if request.start_date is None:
+            # Undated requests would hold no units, so they can't be approved past the capacity check
+            earliest = await asyncio.to_thread(
+                availability.earliest_start, request.equipment_id, quantity, number_of_dates,
+            )
+            raise HTTPException(status_code=409, detail={
+                "message": "The request has no start date; set one before approving it",
+                "earliest_start": str(earliest) if earliest else None,
+            })
+        # Approved requests hold units; check and commit in one transaction so concurrent approvals can't overbook
+        free = await db.run_sync(free_units_for_update, request.equipment_id, request.start_date, number_of_dates)
+        if free < quantity:
+            earliest = await asyncio.to_thread(
+                availability.earliest_start, request.equipment_id, quantity, number_of_dates, request.start_date,
+            )
+            raise HTTPException(status_code=409, detail={
+                "message": "Not enough units are free for the requested dates",
+                "free_units": free,
+                "earliest_start": str(earliest) if earliest else None,
+            })
+    request.status = BOOKED_STATUS
+    await db.commit()
+
+    return {"message": "Equipment request approved successfully"}
+
+
+@admin_router.put("/equipment-requests/cancel/{request_id}")
+async def cancel_equipment_request(request_id: int, db: AsyncSession = Depends(get_async_session)):
+    request = await db.get(Equipment_Request, request_id)
+    if not request:
+        raise HTTPException(status_code=404, detail="Equipment request not found")
+    request.status = "cancelled"
+    await db.commit()
 
+    return {"message": "Equipment request cancelled successfully"}
@@ -1,11 +1,14 @@
-from fastapi import FastAPI, APIRouter
-from database.database import Base, engine
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from schema import RegisterRequest, LoginRequest
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from schema import RegisterRequest, LoginRequest, RefreshRequest
 from database.models import User
-from database.database import session
-from utils import hash_pass, verify_password
+from database.database import get_async_session
+from utils import ahash_pass, averify_and_update, HashingOverloaded
+from utils.auth import HASH_RETRY_AFTER
+from agent.agent import ROLES
+from services.tokens import InvalidToken, bearer_claims, issue_tokens, refresh_tokens, revoke_session
 
 
 auth_router=APIRouter(
@@ -14,38 +17,96 @@ auth_router=APIRouter(
 )
 
 
+def _registered_role(request: RegisterRequest, claims: Optional[dict]) -> str:
+    """
+    Returns the role to register the user with. Anyone can sign up as a "user"; other
+    roles can only be given by a signed-in super admin.
+    """
+    role = request.role or "user"
+    if role == "user":
+        return role
+    if role not in ROLES:
+        raise HTTPException(status_code=400, detail=f"Unknown role: {role}")
+    if claims is None or claims["role"] != "super_admin":
+        raise HTTPException(status_code=403, detail="Only a super admin can register users with this role")
+    return role
+
+
 @auth_router.post("/register")
-async def register(request:RegisterRequest):
+async def register(request:RegisterRequest, db: AsyncSession = Depends(get_async_session), claims: Optional[dict] = Depends(bearer_claims)):
+    role = _registered_role(request, claims)
     try:
-        existing_user=session.query(User).filter_by(username=request.username).first()
+        result=await db.execute(select(User).filter_by(username=request.username))
+        existing_user=result.scalars().first()
         if existing_user:
             return {"message": "User already exists"}
         else:
-            hashed_password = hash_pass(request.password)
-            new_user=User(username=request.username, email=request.email, password=hashed_password, phone_number=request.phone_number, role=request.role)
-            session.add(new_user)
-            session.commit()
+            # End the read transaction so the connection isn't held while bcrypt runs
+            await db.rollback()
+            hashed_password = await ahash_pass(request.password)
+            new_user=User(username=request.username, email=request.email, password=hashed_password, phone_number=request.phone_number, role=role)
+            db.add(new_user)
+            await db.commit()
             
             return {"message": "User registered successfully",
                     "role": new_user.role
                     }
+    except HTTPException:
+        raise
+    except HashingOverloaded:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": str(HASH_RETRY_AFTER)})
     except Exception as e:
-        session.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     
     
 @auth_router.post("/login")
-async def login(request:LoginRequest):
+async def login(request:LoginRequest, db: AsyncSession = Depends(get_async_session)):
     try:
-        existing_user=session.query(User).filter_by(email=request.email).first()
+        result=await db.execute(select(User).filter_by(email=request.email))
+        existing_user=result.scalars().first()
+        if existing_user and existing_user.disabled:
+            return {"message": "User disabled"}
         if existing_user:
-            if verify_password(request.password, existing_user.password):
+            user_id, role, password = existing_user.id, existing_user.role, existing_user.password
+            # End the read transaction so the connection isn't held while bcrypt runs
+            await db.rollback()
+            valid, new_hash = await averify_and_update(request.password, password)
+            if valid:
+                if new_hash:
+                    # The hash was made with a different bcrypt cost; store it at the current one
+                    await db.execute(update(User).where(User.id == user_id).values(password=new_hash))
+                    await db.commit()
+                tokens = await issue_tokens(db, user_id, role)
                 return {"message": "Login successful",
-                        "role": existing_user.role}
+                        "role": role,
+                        **tokens}
             else:
                 return {"message": "Invalid credentials"}
         else:    
             return {"message": "User not found"}
+    except HTTPException:
+        raise
+    except HashingOverloaded:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": str(HASH_RETRY_AFTER)})
     except Exception as e:
-        session.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@auth_router.post("/refresh")
+async def refresh(request: RefreshRequest, db: AsyncSession = Depends(get_async_session)):
+    """Exchanges a refresh token for a new access token carrying the user's current role."""
+    try:
+        return await refresh_tokens(db, request.refresh_token)
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+
+
+@auth_router.post("/logout")
+async def logout(claims: Optional[dict] = Depends(bearer_claims), db: AsyncSession = Depends(get_async_session)):
+    """Ends the session of the bearer token; its access and refresh tokens stop working."""
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    await revoke_session(db, claims["sid"])
+    return {"message": "Logged out"}
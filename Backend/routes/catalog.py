@@ -0,0 +1,27 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from services.availability import availability, check_availability
+from services.equipment_index import equipment_index
+
+
+catalog_router = APIRouter(
+    prefix="/catalog", 
+    tags=["Catalog"]
+)
+
+
+@catalog_router.get("/search")
+def search_catalog(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=100), available_only: bool = False):
+    """Returns equipment ranked by how closely its name (or description) matches the query, tolerating typos and plurals."""
+    return {"results": equipment_index.search(q, limit=limit, available_only=available_only)}
+
+
+@catalog_router.get("/availability/{equipment_id}")
+def get_availability(equipment_id: int, start_date: date, end_date: Optional[date] = None, quantity: int = Query(1, ge=1)):
+    """Returns how many units are free from start_date to end_date (inclusive) and the earliest start at which `quantity` units are free for as long."""
+    if end_date is not None and end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if equipment_id not in availability:
+        raise HTTPException(status_code=404, detail="Equipment not found")
+    return check_availability(equipment_id, start_date, end_date, quantity=quantity)
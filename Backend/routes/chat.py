@@ -1,10 +1,15 @@
-from fastapi import APIRouter
-from database.database import Base, engine
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from fastapi import HTTPException
 from schema import ChatRequest, ChatResponse
-from agent import get_agent
-from utils import config
-from agent import get_chat_response
+import agent.agent
+from agent import get_chat_response, stream_chat_response
+from agent.agent import ROLES
+from agent.admission import AdmissionRejected
+from agent.checkpointer import new_conversation_id
+from services.tokens import bearer_claims
 
 chat_router = APIRouter(
     prefix="/chat", 
@@ -12,31 +17,92 @@ chat_router = APIRouter(
 )
 
 
+def _rejected(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+
+def _authorize(request: ChatRequest, claims: Optional[dict]) -> ChatRequest:
+    """
+    Sets the request's role and user from the verified bearer token. The role sent by the
+    client is ignored, and so is its user id: requests without a token get the "user" agent
+    and no user, so an anonymous conversation can only be resumed with its server-issued
+    conversation id. Requests without a conversation id start a new conversation.
+    """
+    if claims is None:
+        request.role = "user"
+        request.user_id = None
+    else:
+        request.role = claims["role"]
+        request.user_id = claims["sub"]
+    # A new conversation gets its id here; the client sends it back to continue it
+    request.conversation_id = request.conversation_id or new_conversation_id()
+    return request
+
+
 @chat_router.post("/", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, claims: Optional[dict] = Depends(bearer_claims)):
+    _authorize(request, claims)
     try:
-        print(request.role)
-        
         if request.role == "super_admin":
             final_response=await get_chat_response(request)
             
             return ChatResponse(
-                response=final_response
+                response=final_response,
+                conversation_id=request.conversation_id
             )
         elif request.role == "admin":
             final_response=await get_chat_response(request)
             return ChatResponse(
-                response=final_response
+                response=final_response,
+                conversation_id=request.conversation_id
             )
         elif request.role == "user":
             final_response=await get_chat_response(request)
 
             return ChatResponse(
-                response=final_response
+                response=final_response,
+                conversation_id=request.conversation_id
             )
+    except AdmissionRejected as e:
+        raise _rejected(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@chat_router.post("/stream")
+async def chat_stream(request: ChatRequest, claims: Optional[dict] = Depends(bearer_claims)):
+    """Streams the agent's reply as server-sent events (token, tool_start, tool_end, done)."""
+    _authorize(request, claims)
+    if request.role not in ROLES:
+        raise HTTPException(status_code=400, detail=f"Unknown role: {request.role}")
+
+    # Admit the turn before responding, so a refused one gets a 429/503 with Retry-After
+    # instead of an error inside a 200 stream; the slot is held until the stream ends
+    scheduler = agent.agent.scheduler
+    try:
+        await scheduler.acquire(request.role)
+    except AdmissionRejected as e:
+        raise _rejected(e)
 
+    async def events():
+        stream = stream_chat_response(request)
+        try:
+            async for event, data in stream:
+                yield _sse(event, data)
+        except Exception as e:
+            # Headers are already sent, so errors are reported in-band
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            # Stops the run and frees the agent slot right away if the client disconnected mid-stream
+            await stream.aclose()
+            scheduler.release(request.role)
 
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.database import get_async_session
+from schema import BulkEquipmentRequest
+from services.bookings import book_equipment
+
+
+client_router = APIRouter(
+    prefix="/client", 
+    tags=["Client"]
+)
+
+
+@client_router.post("/equipment-requests")
+async def request_equipment(request: BulkEquipmentRequest, db: AsyncSession = Depends(get_async_session)):
+    """Places equipment requests for several line items in one transaction and returns a result per item."""
+    if not request.items:
+        raise HTTPException(status_code=400, detail="At least one item is required")
+
+    results = await db.run_sync(
+        lambda sync_db: book_equipment(sync_db, request.items, location=request.location, start_date=request.start_date)
+    )
+    return {"results": results}
@@ -0,0 +1,22 @@
+from typing import Optional
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from utils.metrics import recent_traces, render
+
+
+metrics_router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+
+@metrics_router.get("", response_class=PlainTextResponse)
+async def metrics():
+    """Request, graph node, tool, LLM and SQL metrics in the Prometheus text format."""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+
+@metrics_router.get("/traces")
+async def traces(trace_id: Optional[str] = None):
+    """The most recent requests' traces (newest first), or the one with the given id (see the X-Trace-Id header)."""
+    return {"traces": recent_traces(trace_id)}
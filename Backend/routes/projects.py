@@ -0,0 +1,24 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from services.cost_estimates import cost_estimator
+
+
+projects_router = APIRouter(
+    prefix="/projects",
+    tags=["Projects"]
+)
+
+
+@projects_router.get("/estimate")
+def estimate_project_cost(
+    initial_budget: Optional[float] = Query(None, gt=0),
+    location: Optional[str] = None,
+    duration_days: Optional[float] = Query(None, gt=0),
+    workers: Optional[int] = Query(None, ge=1),
+    confidence: float = Query(0.9, ge=0.5, le=0.99),
+):
+    """Estimates a project's cost with a confidence interval from past projects; give at least a budget, a duration or a crew size."""
+    try:
+        return cost_estimator.estimate(initial_budget, location, duration_days, workers, confidence=confidence)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
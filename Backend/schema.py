@@ -1,12 +1,16 @@
-from typing import Optional
-from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
 
 class ChatRequest(BaseModel):
     message: str 
     role: str = "user"
+    user_id: Optional[str] = None
+    conversation_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
+    conversation_id: Optional[str] = None
 
 
 class RegisterRequest(BaseModel):
@@ -14,9 +18,33 @@ class RegisterRequest(BaseModel):
     phone_number:str
     email:str
     password:str
-    role:Optional[str]
+    # Only a super admin may register someone with a role other than "user"
+    role:Optional[str] = "user"
     
     
 class LoginRequest(BaseModel):
     email:str
     password:str
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class EquipmentLineItem(BaseModel):
+    equipment_name: str = Field(description="Name of the equipment, e.g. excavator")
+    quantity: int = Field(default=1, description="Number of units needed")
+    number_of_dates: int = Field(default=1, description="Number of days the equipment is needed for")
+    location: Optional[str] = Field(default=None, description="Site location, if different from the request's")
+    start_date: Optional[datetime] = Field(default=None, description="Start date, if different from the request's")
+
+
+class LabourSkill(BaseModel):
+    skill: str = Field(description="Skill or trade needed, e.g. electrician")
+    count: int = Field(default=1, description="Number of workers with this skill needed for a team")
+
+
+class BulkEquipmentRequest(BaseModel):
+    items: List[EquipmentLineItem]
+    location: Optional[str] = None
+    start_date: Optional[datetime] = None
@@ -0,0 +1,371 @@
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+from sqlalchemy import func, select
+from database.database import Session
+from database.events import on_commit
+from database.models import Equipment, Equipment_Request
+
+
+# Only approved requests hold units; pending ones may still be rejected
+BOOKED_STATUS = "approved"
+
+# Smallest number of days a schedule's tree covers, so small ranges don't rebuild often
+_MIN_SPAN = 64
+
+
+def _day(value) -> int:
+    """Returns the proleptic ordinal of a date, datetime or ISO string."""
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    return datetime.fromisoformat(str(value).strip().replace("Z", "+00:00")).date().toordinal()
+
+
+class _DayTree:
+    """
+    Segment tree over consecutive days holding the number of units booked per day.
+
+    Supports adding a quantity to a range of days and, in O(log n), the peak booking
+    over a range and the first day from a given one that is over / within a threshold.
+    Range adds are kept as tags on the covering nodes instead of being pushed down, so
+    a node's max/min include its own tag but not those of its ancestors.
+    """
+
+    def __init__(self, size: int, booked=None):
+        self.size = size
+        self.max = [0] * (2 * size)
+        self.min = [0] * (2 * size)
+        self.tag = [0] * (2 * size)
+        if booked:
+            self.max[size:size + len(booked)] = self.min[size:size + len(booked)] = self.tag[size:size + len(booked)] = booked
+            for node in range(size - 1, 0, -1):
+                self.max[node] = max(self.max[2 * node], self.max[2 * node + 1])
+                self.min[node] = min(self.min[2 * node], self.min[2 * node + 1])
+
+    def add(self, start: int, end: int, quantity: int, node: int = 1, lo: int = 0, hi: int = None):
+        hi = self.size if hi is None else hi
+        if end <= lo or hi <= start:
+            return
+        if start <= lo and hi <= end:
+            self.max[node] += quantity
+            self.min[node] += quantity
+            self.tag[node] += quantity
+            return
+        mid = (lo + hi) // 2
+        self.add(start, end, quantity, 2 * node, lo, mid)
+        self.add(start, end, quantity, 2 * node + 1, mid, hi)
+        self.max[node] = max(self.max[2 * node], self.max[2 * node + 1]) + self.tag[node]
+        self.min[node] = min(self.min[2 * node], self.min[2 * node + 1]) + self.tag[node]
+
+    def peak(self, start: int, end: int, node: int = 1, lo: int = 0, hi: int = None) -> int:
+        hi = self.size if hi is None else hi
+        if end <= lo or hi <= start:
+            return 0
+        if start <= lo and hi <= end:
+            return self.max[node]
+        mid = (lo + hi) // 2
+        return self.tag[node] + max(self.peak(start, end, 2 * node, lo, mid), self.peak(start, end, 2 * node + 1, mid, hi))
+
+    def first(self, start: int, threshold: int, above: bool, node: int = 1, lo: int = 0, hi: int = None, inherited: int = 0):
+        """First day >= start booked above the threshold (or at most it, if not above), or None."""
+        hi = self.size if hi is None else hi
+        if hi <= start:
+            return None
+        if above and self.max[node] + inherited <= threshold:
+            return None
+        if not above and self.min[node] + inherited > threshold:
+            return None
+        if hi - lo == 1:
+            return lo
+        mid = (lo + hi) // 2
+        inherited += self.tag[node]
+        found = self.first(start, threshold, above, 2 * node, lo, mid, inherited)
+        if found is None:
+            found = self.first(start, threshold, above, 2 * node + 1, mid, hi, inherited)
+        return found
+
+
+class _Schedule:
+    """Approved bookings of one equipment row, indexed by day."""
+
+    def __init__(self, units: int = 1, available: bool = True):
+        self.units = units
+        self.available = available
+        self.bookings = {}      # request id -> (first day, day after the last, quantity)
+        self.origin = 0
+        self.tree = None
+
+    @property
+    def capacity(self) -> int:
+        return self.units if self.available else 0
+
+    def rebuild(self, first: int = None, end: int = None):
+        """Rebuilds the tree from the bookings, covering at least [first, end)."""
+        days = [day for booking in self.bookings.values() for day in booking[:2]]
+        days += [day for day in (first, end) if day is not None]
+        if not days:
+            self.tree = None
+            return
+        origin, last = min(days), max(days)
+        size = _MIN_SPAN
+        while size < last - origin:
+            size *= 2
+        # Leave room on both sides so bookings just outside the range don't rebuild again
+        origin -= size // 4
+        size *= 2
+        delta = [0] * (size + 1)
+        for start, stop, quantity in self.bookings.values():
+            delta[start - origin] += quantity
+            delta[stop - origin] -= quantity
+        booked, running = [], 0
+        for change in delta[:size]:
+            running += change
+            booked.append(running)
+        self.origin = origin
+        self.tree = _DayTree(size, booked)
+
+    def book(self, request_id, start: int, end: int, quantity: int):
+        self.cancel(request_id)
+        self.bookings[request_id] = (start, end, quantity)
+        if self.tree is None or start < self.origin or end > self.origin + self.tree.size:
+            self.rebuild(start, end)
+        else:
+            self.tree.add(start - self.origin, end - self.origin, quantity)
+
+    def cancel(self, request_id):
+        booking = self.bookings.pop(request_id, None)
+        if booking is not None and self.tree is not None:
+            start, end, quantity = booking
+            self.tree.add(start - self.origin, end - self.origin, -quantity)
+
+    def peak(self, start: int, end: int) -> int:
+        if self.tree is None:
+            return 0
+        return self.tree.peak(start - self.origin, end - self.origin)
+
+    def first(self, day: int, threshold: int, above: bool):
+        """Like _DayTree.first in days; days outside the tree have nothing booked."""
+        if self.tree is None or day >= self.origin + self.tree.size:
+            return None if above else day
+        if day < self.origin:
+            if not above:
+                return day
+            day = self.origin
+        found = self.tree.first(day - self.origin, threshold, above)
+        if found is None:
+            return None if above else self.origin + self.tree.size
+        return found + self.origin
+
+
+class AvailabilityEngine:
+    """
+    Answers how many units of an equipment are free over a date range, and from when a
+    number of units is free for a number of days, without querying the database.
+
+    Each equipment has a capacity of Equipment.units (none while it's marked unavailable)
+    and a segment tree of the units held by approved requests per day. The engine is
+    loaded from the database on first use and kept in sync with committed ORM changes,
+    so approving or cancelling a request updates it in O(log n).
+    """
+
+    def __init__(self):
+        self._schedules = defaultdict(_Schedule)
+        self._requests = {}     # request id -> equipment id, for requests that hold units
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def load(self):
+        with self._lock, Session() as db:
+            self._schedules.clear()
+            self._requests.clear()
+            for equipment_id, units, available in db.query(Equipment.id, Equipment.units, Equipment.available):
+                self._schedules[equipment_id] = _Schedule(units or 0, available is not False)
+            # Selecting just the day skips parsing a datetime per row, which dominates the load
+            requests = select(
+                Equipment_Request.id, Equipment_Request.equipment_id, func.date(Equipment_Request.start_date),
+                Equipment_Request.number_of_dates, Equipment_Request.quantity,
+            ).where(Equipment_Request.status == BOOKED_STATUS, Equipment_Request.start_date.isnot(None))
+            for request_id, equipment_id, start_day, number_of_dates, quantity in db.execute(requests.execution_options(yield_per=10_000)):
+                start = date.fromisoformat(start_day).toordinal() if isinstance(start_day, str) else _day(start_day)
+                self._schedules[equipment_id].bookings[request_id] = (start, start + max(number_of_dates or 1, 1), quantity)
+                self._requests[request_id] = equipment_id
+            # Build each tree once from all its bookings rather than adding them one by one
+            for schedule in self._schedules.values():
+                schedule.rebuild()
+            self._loaded = True
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def apply(self, changes):
+        """Applies committed Change objects (see database.events) to the schedules."""
+        if not self._loaded:
+            return
+        with self._lock:
+            for change in changes:
+                values = change.values
+                if change.table == Equipment.__tablename__:
+                    if change.op == "delete":
+                        self._schedules.pop(values["id"], None)
+                    else:
+                        schedule = self._schedules[values["id"]]
+                        schedule.units = values.get("units") or 0
+                        schedule.available = values.get("available") is not False
+                elif change.table == Equipment_Request.__tablename__:
+                    self._apply_request(change)
+
+    def _apply_request(self, change):
+        values = change.values
+        request_id = values["id"]
+        equipment_id = self._requests.pop(request_id, None)
+        if equipment_id is not None and equipment_id in self._schedules:
+            self._schedules[equipment_id].cancel(request_id)
+        if change.op == "delete" or values.get("status") != BOOKED_STATUS or values.get("start_date") is None:
+            return
+        start = _day(values["start_date"])
+        end = start + max(values.get("number_of_dates") or 1, 1)
+        self._schedules[values["equipment_id"]].book(request_id, start, end, values["quantity"])
+        self._requests[request_id] = values["equipment_id"]
+
+    def __contains__(self, equipment_id) -> bool:
+        self.ensure_loaded()
+        return equipment_id in self._schedules
+
+    def units(self, equipment_id: int) -> int:
+        """Returns the number of units the equipment can hire out at once (0 while it's unavailable)."""
+        self.ensure_loaded()
+        with self._lock:
+            schedule = self._schedules.get(equipment_id)
+            return schedule.capacity if schedule else 0
+
+    def free_units(self, equipment_id: int, start, end=None) -> int:
+        """
+        Returns how many units of the equipment are free on every day from start to end.
+
+        Args:
+            equipment_id (int): The equipment to check.
+            start: First day (date, datetime or ISO string).
+            end: Last day, inclusive; defaults to the start day.
+
+        Returns:
+            int: The number of units that can still be booked for the whole range.
+        """
+        self.ensure_loaded()
+        first = _day(start)
+        last = _day(end) if end is not None else first
+        with self._lock:
+            schedule = self._schedules.get(equipment_id)
+            if schedule is None:
+                return 0
+            return max(schedule.capacity - schedule.peak(first, last + 1), 0)
+
+    def earliest_start(self, equipment_id: int, quantity: int = 1, number_of_dates: int = 1, after=None):
+        """
+        Returns the earliest date from `after` (today by default) on which `quantity` units
+        of the equipment are free for `number_of_dates` consecutive days, or None if the
+        equipment doesn't have that many units.
+        """
+        self.ensure_loaded()
+        day = _day(after) if after is not None else date.today().toordinal()
+        number_of_dates = max(number_of_dates, 1)
+        with self._lock:
+            schedule = self._schedules.get(equipment_id)
+            if schedule is None:
+                return None
+            threshold = schedule.capacity - quantity
+            if threshold < 0:
+                return None
+            # Each step jumps past one run of days with too many units booked
+            while True:
+                blocked = schedule.first(day, threshold, above=True)
+                if blocked is None or blocked >= day + number_of_dates:
+                    return date.fromordinal(day)
+                day = schedule.first(blocked, threshold, above=False)
+
+
+availability = AvailabilityEngine()
+on_commit(availability.apply)
+
+
+def check_availability(equipment_id: int, start, end=None, quantity: int = 1, number_of_dates: int = None) -> dict:
+    """
+    Summarizes the availability of one equipment for a request window.
+
+    Args:
+        equipment_id (int): The equipment to check.
+        start: First day wanted.
+        end: Last day wanted, inclusive; defaults to start + number_of_dates - 1.
+        quantity (int): Units wanted.
+        number_of_dates (int): Days wanted; defaults to the length of start..end.
+
+    Returns:
+        dict: units, free_units over the window, whether the request fits, and the
+            earliest_start on or after `start` at which it would.
+    """
+    first = _day(start)
+    if number_of_dates is None:
+        number_of_dates = _day(end) - first + 1 if end is not None else 1
+    last = _day(end) if end is not None else first + max(number_of_dates, 1) - 1
+    free = availability.free_units(equipment_id, date.fromordinal(first), date.fromordinal(last))
+    earliest = availability.earliest_start(equipment_id, quantity, number_of_dates, after=date.fromordinal(first))
+    return {
+        "equipment_id": equipment_id,
+        "units": availability.units(equipment_id),
+        "start_date": date.fromordinal(first),
+        "end_date": date.fromordinal(last),
+        "free_units": free,
+        "fits": free >= quantity,
+        "earliest_start": earliest,
+    }
+
+
+def free_units_for_update(db, equipment_id: int, start, number_of_dates: int = 1) -> int:
+    """
+    Returns how many units of the equipment are free on every day of a window, read in
+    the caller's transaction so a decision based on it holds until that transaction
+    commits.
+
+    The equipment row is locked first (SELECT ... FOR UPDATE), so concurrent approvals
+    of the same equipment check one after the other instead of both fitting into the
+    same free units. The engine above only sees committed approvals, which is enough to
+    answer questions but not to commit against.
+
+    Args:
+        db (Session): The session whose transaction the approval is committed in.
+        equipment_id (int): The equipment to check.
+        start: First day wanted.
+        number_of_dates (int): Days wanted.
+
+    Returns:
+        int: The number of units no approved request holds on any day of the window.
+    """
+    equipment = db.execute(
+        select(Equipment.units, Equipment.available).where(Equipment.id == equipment_id).with_for_update()
+    ).one_or_none()
+    if equipment is None or equipment.available is False:
+        return 0
+    first = _day(start)
+    end = first + max(number_of_dates or 1, 1)
+    approved = (Equipment_Request.equipment_id == equipment_id, Equipment_Request.status == BOOKED_STATUS)
+    # Bookings that started up to the longest booking's length before the window can still reach into it
+    longest = db.execute(select(func.max(Equipment_Request.number_of_dates)).where(*approved)).scalar() or 1
+    bookings = db.execute(select(Equipment_Request.start_date, Equipment_Request.number_of_dates, Equipment_Request.quantity).where(
+        *approved,
+        Equipment_Request.start_date >= datetime.fromordinal(first - max(longest, 1) + 1),
+        Equipment_Request.start_date < datetime.fromordinal(end),
+    ))
+    delta = defaultdict(int)
+    for booking_start, days, quantity in bookings:
+        booking_first = _day(booking_start)
+        booking_end = booking_first + max(days or 1, 1)
+        if booking_end > first:
+            delta[max(booking_first, first)] += quantity
+            delta[min(booking_end, end)] -= quantity
+    peak = running = 0
+    for day in sorted(delta):
+        running += delta[day]
+        peak = max(peak, running)
+    return max((equipment.units or 0) - peak, 0)
@@ -0,0 +1,140 @@
+from datetime import date, datetime
+from sqlalchemy import func
+from database.models import Equipment, Equipment_Request
+from services.availability import check_availability
+from services.equipment_index import equipment_index
+
+
+def parse_date(value):
+    """Accepts a datetime, a date or an ISO 8601 string (as produced by the LLM) and returns a datetime."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+
+
+def _field(item, name, default=None):
+    value = item.get(name) if isinstance(item, dict) else getattr(item, name, None)
+    return default if value is None else value
+
+
+def _equipment_by_name(db, names) -> dict:
+    """Loads equipment by lowercase name with one query, preferring an available row when several share a name."""
+    equipment = {}
+    for row in db.query(Equipment).filter(func.lower(Equipment.name).in_(names)):
+        current = equipment.get(row.name.lower())
+        if current is None or (row.available and not current.available):
+            equipment[row.name.lower()] = row
+    return equipment
+
+
+def resolve_equipment(db, names):
+    """
+    Resolves lowercase equipment names to Equipment rows.
+
+    Names are matched exactly (case-insensitively) with one query; the rest are looked up
+    in the fuzzy equipment index, so misspellings and plurals still find the intended item.
+
+    Returns:
+        tuple: (dict of name -> row, set of names resolved by the fuzzy index,
+            dict of unresolved name -> list of suggested catalog names)
+    """
+    equipment = _equipment_by_name(db, names)
+    fuzzy = {}
+    suggestions = {}
+    for name in set(names) - equipment.keys():
+        best, candidates = equipment_index.match(name)
+        if best is not None:
+            fuzzy[name] = best["name"].lower()
+        else:
+            suggestions[name] = [candidate["name"] for candidate in candidates]
+    if fuzzy:
+        matched = _equipment_by_name(db, set(fuzzy.values()))
+        for name, catalog_name in fuzzy.items():
+            if catalog_name in matched:
+                equipment[name] = matched[catalog_name]
+    return equipment, set(fuzzy), suggestions
+
+
+def book_equipment(db, items, location=None, start_date=None) -> list:
+    """
+    Places equipment requests for several line items in one transaction.
+
+    Equipment names are resolved together, see resolve_equipment. Items whose equipment
+    is unknown or unavailable, whose quantity is invalid, or that don't fit into the
+    units free over their dates are reported and skipped; the rest are inserted and
+    committed together. Items without a start date have no window to check; they are
+    checked when approved.
+
+    Args:
+        db (Session): The session to use; it is committed on success.
+        items (list): Line items (dicts or EquipmentLineItem) with equipment_name, quantity,
+            number_of_dates and optionally their own location and start_date.
+        location (str): Default location for items that don't set one.
+        start_date: Default start date for items that don't set one.
+
+    Returns:
+        list: One dict per line item, in order, with equipment_name, quantity and a status
+            of "requested" (with request_id), "not_found" (with suggestions), "unavailable"
+            (with free_units and earliest_start when the dates are the problem) or
+            "invalid". Items resolved by the fuzzy index also carry matched_name.
+    """
+    names = {str(_field(item, "equipment_name", "")).strip().lower() for item in items}
+    equipment, fuzzy, suggestions = resolve_equipment(db, names)
+
+    results = []
+    pending = []
+    for item in items:
+        name = str(_field(item, "equipment_name", "")).strip().lower()
+        quantity = _field(item, "quantity", 1)
+        result = {"equipment_name": name, "quantity": quantity}
+        results.append(result)
+
+        row = equipment.get(name)
+        if row is None:
+            result.update(status="not_found", suggestions=suggestions.get(name, []))
+            continue
+        if name in fuzzy:
+            result["matched_name"] = row.name
+        if not row.available:
+            result["status"] = "unavailable"
+            continue
+        try:
+            item_start = parse_date(_field(item, "start_date", start_date))
+        except ValueError:
+            result.update(status="invalid", detail="start_date is not a valid date")
+            continue
+        number_of_dates = _field(item, "number_of_dates", 1)
+        if quantity < 1 or number_of_dates < 1:
+            result.update(status="invalid", detail="quantity and number_of_dates must be at least 1")
+            continue
+        if item_start is not None:
+            summary = check_availability(row.id, item_start, quantity=quantity, number_of_dates=number_of_dates)
+            if not summary["fits"]:
+                result.update(status="unavailable", free_units=summary["free_units"], earliest_start=summary["earliest_start"])
+                continue
+
+        request = Equipment_Request(
+            equipment_id=row.id,
+            quantity=quantity,
+            number_of_dates=number_of_dates,
+            location=_field(item, "location", location),
+            start_date=item_start,
+        )
+        db.add(request)
+        pending.append((result, request))
+
+    if pending:
+        try:
+            db.flush()
+            for result, request in pending:
+                result.update(status="requested", request_id=request.id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    return results
@@ -0,0 +1,357 @@
+import math
+import os
+import threading
+from datetime import date, datetime
+import numpy as np
+from sqlalchemy import func, select
+from database.database import Session
+from database.events import on_commit
+from database.models import ProjectHistory
+
+
+# A location (or crew size) with fewer past projects than this is estimated from all projects
+ESTIMATE_MIN_SAMPLES = int(os.getenv("ESTIMATE_MIN_SAMPLES", "30"))
+# Log-spaced bins per distribution; 512 keeps quantiles within about 1-3% of the exact value
+ESTIMATE_BINS = int(os.getenv("ESTIMATE_BINS", "512"))
+
+# Crew sizes are grouped by powers of two: 1, 2, 3-4, 5-8, ...
+_WORKER_GROUPS = 16
+
+
+def _location_key(location) -> str:
+    return " ".join(str(location).lower().split()) if location else ""
+
+
+def _worker_group(workers) -> int:
+    """Row of the duration histograms for a crew size; 0 holds every project."""
+    return min(max(int(workers) - 1, 0).bit_length() + 1, _WORKER_GROUPS)
+
+
+def _worker_groups(workers: np.ndarray) -> np.ndarray:
+    """Vectorized _worker_group."""
+    above = np.maximum(workers - 1, 0)
+    bit_length = np.where(above > 0, np.floor(np.log2(np.maximum(above, 1))).astype(np.int64) + 1, 0)
+    return np.minimum(bit_length + 1, _WORKER_GROUPS)
+
+
+def _days(start, end) -> float:
+    """Duration in days, counting both the start and the completion day."""
+    start = start.date() if isinstance(start, datetime) else start
+    end = end.date() if isinstance(end, datetime) else end
+    if isinstance(start, str):
+        start = date.fromisoformat(start[:10])
+    if isinstance(end, str):
+        end = date.fromisoformat(end[:10])
+    return float((end - start).days + 1)
+
+
+def _spread(quantiles) -> dict:
+    low, median, high = (float(value) for value in quantiles)
+    return {"low": low, "median": median, "high": high}
+
+
+class _LogHistograms:
+    """
+    Counts of positive values in log-spaced bins, one row per group, with row 0 holding
+    every value. Adding and removing values is O(1) each; quantiles read a row's
+    cumulative counts and interpolate inside the bin, which is what lets the estimator
+    keep exact-enough distributions up to date without re-sorting anything.
+    """
+
+    def __init__(self, low: float, high: float, bins: int = ESTIMATE_BINS, groups: int = 1):
+        self.log_low = math.log(low)
+        self.width = (math.log(high) - self.log_low) / bins
+        self.bins = bins
+        self.counts = np.zeros((groups, bins), dtype=np.int64)
+
+    def _bins(self, values: np.ndarray) -> np.ndarray:
+        return np.clip(((np.log(values) - self.log_low) / self.width).astype(np.int64), 0, self.bins - 1)
+
+    def ensure_groups(self, groups: int):
+        if groups > len(self.counts):
+            grown = np.zeros((max(groups, 2 * len(self.counts)), self.bins), dtype=np.int64)
+            grown[:len(self.counts)] = self.counts
+            self.counts = grown
+
+    def build(self, groups: np.ndarray, values: np.ndarray, rows: int):
+        """Replaces all counts with those of the given values, in one pass."""
+        cells = groups * self.bins + self._bins(values)
+        self.counts = np.bincount(cells, minlength=rows * self.bins).reshape(rows, self.bins).astype(np.int64)
+        # Row 0 already holds the values without a group; add everyone else's
+        self.counts[0] = self.counts.sum(axis=0)
+
+    def add(self, group: int, value: float, sign: int = 1):
+        if not value > 0:
+            return
+        self.ensure_groups(group + 1)
+        index = self._bins(np.array([value]))[0]
+        self.counts[0, index] += sign
+        if group:
+            self.counts[group, index] += sign
+
+    def samples(self, group: int) -> int:
+        return int(self.counts[group].sum()) if group < len(self.counts) else 0
+
+    def quantiles(self, group: int, qs) -> np.ndarray:
+        counts = self.counts[group]
+        cumulative = np.cumsum(counts)
+        targets = np.asarray(qs, dtype=float) * cumulative[-1]
+        index = np.clip(np.searchsorted(cumulative, targets, side="left"), 0, self.bins - 1)
+        before = np.where(index > 0, cumulative[index - 1], 0)
+        fraction = (targets - before) / np.maximum(counts[index], 1)
+        return np.exp(self.log_low + (index + np.clip(fraction, 0, 1)) * self.width)
+
+
+class _Columns:
+    """Growable NumPy columns of the loaded project history, with a row per project id."""
+
+    NAMES = ("budget", "actual", "days", "workers", "location")
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.rows = {}      # project id -> row
+        self.budget = np.zeros(capacity)
+        self.actual = np.zeros(capacity)
+        self.days = np.zeros(capacity)
+        self.workers = np.zeros(capacity, dtype=np.int64)
+        self.location = np.zeros(capacity, dtype=np.int64)
+        self.live = np.zeros(capacity, dtype=bool)
+
+    def _grow(self, capacity: int):
+        for name in self.NAMES + ("live",):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def fill(self, ids, **columns):
+        self.size = 0
+        self._grow(max(1024, len(ids) + len(ids) // 4))
+        self.size = len(ids)
+        for name, values in columns.items():
+            getattr(self, name)[:self.size] = values
+        self.live[:self.size] = True
+        self.rows = dict(zip(ids, range(self.size)))
+
+    def row(self, project_id) -> int:
+        row = self.rows.get(project_id)
+        if row is None:
+            if self.size == len(self.budget):
+                self._grow(2 * self.size)
+            row = self.rows[project_id] = self.size
+            self.size += 1
+        return row
+
+
+class CostEstimator:
+    """
+    Estimates what a project will cost from past projects, without querying the database.
+
+    Project history is held as NumPy columns, from which three sets of distributions are
+    kept up to date as projects are added, changed or removed:
+
+    - overrun ratio (actual cost / initial budget) per location,
+    - cost per day per location,
+    - duration in days per crew size (workers used, grouped by powers of two).
+
+    An estimate reads quantiles off the matching distribution, falling back to all
+    projects where a location or crew size has fewer than ESTIMATE_MIN_SAMPLES. The
+    engine is loaded from the database on first use and then kept in sync with committed
+    ORM changes.
+    """
+
+    def __init__(self):
+        self._columns = _Columns()
+        self._locations = {}    # location key -> histogram row (0 is every location)
+        self._names = [None]    # histogram row -> location as first stored
+        self._overrun = _LogHistograms(0.05, 20)
+        self._cost_per_day = _LogHistograms(0.01, 1e9)
+        self._duration = _LogHistograms(1, 1e5, groups=_WORKER_GROUPS + 1)
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._columns.rows)
+
+    def _location_row(self, location) -> int:
+        key = _location_key(location)
+        if not key:
+            return 0
+        row = self._locations.get(key)
+        if row is None:
+            row = self._locations[key] = len(self._names)
+            self._names.append(" ".join(str(location).split()))
+        return row
+
+    def load(self, rows=None):
+        """
+        (Re)builds the columns and distributions from (id, initial_budget, actual_cost,
+        start_date, completion_date, location, workers_used) rows, or from the database.
+        """
+        with self._lock:
+            if rows is None:
+                # Core rows are several times cheaper to build than ORM ones at this size; selecting
+                # just the days skips parsing a datetime per row
+                with Session() as db:
+                    rows = db.connection().execute(select(
+                        ProjectHistory.id, ProjectHistory.initial_budget, ProjectHistory.actual_cost,
+                        func.date(ProjectHistory.start_date), func.date(ProjectHistory.completion_date),
+                        ProjectHistory.location, ProjectHistory.workers_used,
+                    )).all()
+            self._locations.clear()
+            del self._names[1:]
+            ids, budget, actual, starts, ends, locations, workers = list(zip(*rows)) or [()] * 7
+            # Dates arrive as ISO strings (SQLite) or dates; either converts in one go
+            days = np.array(ends, dtype="datetime64[D]") - np.array(starts, dtype="datetime64[D]")
+            location_rows = {value: self._location_row(value) for value in dict.fromkeys(locations)}
+            self._columns.fill(
+                list(ids),
+                budget=np.array(budget, dtype=float),
+                actual=np.array(actual, dtype=float),
+                days=days.astype(np.int64) + 1.0,
+                workers=np.array([value or 0 for value in workers], dtype=np.int64),
+                location=np.array([location_rows[value] for value in locations], dtype=np.int64),
+            )
+            self._rebuild()
+            self._loaded = True
+
+    def _rebuild(self):
+        columns, size = self._columns, self._columns.size
+        live = columns.live[:size]
+        budget, actual, days = columns.budget[:size], columns.actual[:size], columns.days[:size]
+        location, workers = columns.location[:size], columns.workers[:size]
+        rows = len(self._names)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            valid = live & (budget > 0) & (actual > 0)
+            self._overrun.build(location[valid], actual[valid] / budget[valid], rows)
+            valid = live & (actual > 0) & (days > 0)
+            self._cost_per_day.build(location[valid], actual[valid] / days[valid], rows)
+            valid = live & (days > 0) & (workers > 0)
+            self._duration.build(_worker_groups(workers[valid]), days[valid], _WORKER_GROUPS + 1)
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def _count(self, row: int, sign: int):
+        columns = self._columns
+        budget, actual, days = columns.budget[row], columns.actual[row], columns.days[row]
+        location, workers = int(columns.location[row]), int(columns.workers[row])
+        if budget > 0:
+            self._overrun.add(location, actual / budget, sign)
+        if days > 0:
+            self._cost_per_day.add(location, actual / days, sign)
+            if workers > 0:
+                self._duration.add(_worker_group(workers), days, sign)
+
+    def apply(self, changes):
+        """Applies committed Change objects (see database.events) to the columns and distributions."""
+        if not self._loaded:
+            return
+        with self._lock:
+            for change in changes:
+                if change.table != ProjectHistory.__tablename__:
+                    continue
+                values = change.values
+                columns = self._columns
+                row = columns.rows.get(values["id"])
+                if row is not None and columns.live[row]:
+                    self._count(row, -1)
+                    columns.live[row] = False
+                if change.op == "delete":
+                    if row is not None:
+                        del columns.rows[values["id"]]
+                    continue
+                row = columns.row(values["id"])
+                columns.budget[row] = values.get("initial_budget") or 0
+                columns.actual[row] = values.get("actual_cost") or 0
+                columns.days[row] = _days(values["start_date"], values["completion_date"])
+                columns.workers[row] = values.get("workers_used") or 0
+                columns.location[row] = self._location_row(values.get("location"))
+                columns.live[row] = True
+                self._count(row, 1)
+
+    def match_location(self, location):
+        """Histogram row for a location: an exact match, else a known location it contains or that contains it, else 0."""
+        key = _location_key(location)
+        if not key:
+            return 0
+        row = self._locations.get(key)
+        if row is not None:
+            return row
+        candidates = [(len(known), row) for known, row in self._locations.items() if known in key or key in known]
+        return max(candidates)[1] if candidates else 0
+
+    def _quantiles(self, histograms, group: int, qs):
+        """Quantiles of the group's distribution, or of every project's if the group has too few."""
+        samples = histograms.samples(group)
+        if group and samples < ESTIMATE_MIN_SAMPLES:
+            group, samples = 0, histograms.samples(0)
+        if not samples:
+            return None, group, 0
+        return histograms.quantiles(group, qs), group, samples
+
+    def estimate(self, initial_budget: float = None, location: str = None, duration_days: float = None,
+                 workers: int = None, confidence: float = 0.9) -> dict:
+        """
+        Estimates a project's cost with a confidence interval.
+
+        The basis is the initial budget scaled by the overrun ratios of past projects
+        if a budget is given, else the duration times the cost per day, else a duration
+        estimated from the crew size times the cost per day. In the last case the
+        interval pairs the low and high ends of both distributions, so it is wider than
+        the stated confidence.
+
+        Args:
+            initial_budget (float): The budget planned for the project.
+            location (str): Where the project is; matched loosely against past locations.
+            duration_days (float): How many days the project will take.
+            workers (int): How many workers it will use.
+            confidence (float): Share of past outcomes the interval should cover.
+
+        Returns:
+            dict: estimate, low, high, basis, the location the figures are for (None
+                for all locations), the samples they come from, and the ratio, cost per
+                day or duration distributions used.
+
+        Raises:
+            ValueError: None of budget, duration or workers was given, or there is no
+                project history to estimate from.
+        """
+        if not (initial_budget or duration_days or workers):
+            raise ValueError("Give at least an initial budget, a duration or the number of workers.")
+        self.ensure_loaded()
+        tail = (1 - min(max(confidence, 0.5), 0.99)) / 2
+        qs = (tail, 0.5, 1 - tail)
+        with self._lock:
+            group = self.match_location(location)
+            result = {"confidence": confidence}
+            if initial_budget:
+                ratio, group, samples = self._quantiles(self._overrun, group, qs)
+                if ratio is None:
+                    raise ValueError("There is no project history to estimate from.")
+                low, mid, high = ratio * initial_budget
+                result.update(basis="budget", overrun_ratio=_spread(ratio))
+            else:
+                per_day, group, samples = self._quantiles(self._cost_per_day, group, qs)
+                if per_day is None:
+                    raise ValueError("There is no project history to estimate from.")
+                result["cost_per_day"] = _spread(per_day)
+                if duration_days:
+                    low, mid, high = per_day * duration_days
+                    result["basis"] = "duration"
+                else:
+                    days, _, _ = self._quantiles(self._duration, _worker_group(workers), qs)
+                    if days is None:
+                        raise ValueError("There is no project history with crew sizes to estimate from.")
+                    low, mid, high = per_day * days
+                    result.update(basis="workers", duration_days=_spread(days))
+            result.update(
+                estimate=float(mid), low=float(low), high=float(high),
+                location=self._names[group], samples=samples,
+            )
+        return result
+
+
+cost_estimator = CostEstimator()
+on_commit(cost_estimator.apply)
@@ -0,0 +1,219 @@
+import heapq
+import re
+import threading
+from collections import Counter
+from database.database import Session
+from database.events import on_commit
+from database.models import Equipment
+
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# A best match is used for booking only if it scores at least this and clearly beats the runner-up
+MATCH_THRESHOLD = 0.55
+MATCH_MARGIN = 0.1
+# Candidates scoring below this are too far off to offer as suggestions
+SUGGEST_THRESHOLD = 0.3
+
+# Weight of query words found in an item's description, relative to its name similarity
+_DESCRIPTION_WEIGHT = 0.25
+
+
+def _words(text: str) -> list:
+    return _WORD.findall((text or "").lower())
+
+
+def _trigrams(words) -> Counter:
+    """Trigrams of each word padded the way pg_trgm does, so short words and word starts still match."""
+    grams = Counter()
+    for word in words:
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class EquipmentIndex:
+    """
+    In-memory trigram index over equipment names, plus a word index over descriptions.
+
+    Rows are grouped by name (case-insensitively), since a catalog lists many units of
+    the same equipment; a lookup ranks names and reports how many units each has.
+    Lookups tolerate misspellings, plurals and extra words ("excavators", "JCB excavator")
+    without touching the database. The index is loaded from the equipment table on
+    first use and then kept in sync with committed ORM changes.
+    """
+
+    def __init__(self):
+        self._names = {}        # lowercase name -> entry, see _entry()
+        self._rows = {}         # row id -> lowercase name
+        self._by_gram = {}      # trigram -> set of lowercase names
+        self._by_word = {}      # description word -> set of lowercase names
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def load(self, rows=None):
+        """
+        (Re)builds the index from the given Equipment-like rows, or from the database.
+        """
+        with self._lock:
+            if rows is None:
+                with Session() as db:
+                    rows = db.query(
+                        Equipment.id, Equipment.name, Equipment.description, Equipment.price_per_day, Equipment.available
+                    ).all()
+            self._names.clear()
+            self._rows.clear()
+            self._by_gram.clear()
+            self._by_word.clear()
+            for row in rows:
+                self._add(row._asdict() if hasattr(row, "_asdict") else row)
+            self._loaded = True
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def _entry(self, name: str) -> dict:
+        key = name.lower()
+        entry = self._names.get(key)
+        if entry is None:
+            grams = _trigrams(_words(name))
+            entry = self._names[key] = {
+                "name": name,
+                "grams": grams,
+                "size": sum(grams.values()),
+                "words": Counter(),     # description words over all units
+                "units": {},            # row id -> (price_per_day, available, description words)
+            }
+            for gram in grams:
+                self._by_gram.setdefault(gram, set()).add(key)
+        return entry
+
+    def _add(self, values: dict):
+        self._remove(values["id"])
+        entry = self._entry(values["name"])
+        key = values["name"].lower()
+        words = set(_words(values.get("description")))
+        for word in words:
+            if not entry["words"][word]:
+                self._by_word.setdefault(word, set()).add(key)
+        entry["words"].update(words)
+        entry["units"][values["id"]] = (values.get("price_per_day"), values.get("available") is not False, words)
+        self._rows[values["id"]] = key
+
+    def _remove(self, row_id):
+        key = self._rows.pop(row_id, None)
+        if key is None:
+            return
+        entry = self._names[key]
+        _, _, words = entry["units"].pop(row_id)
+        entry["words"].subtract(words)
+        for word in words:
+            if entry["words"][word] <= 0:
+                del entry["words"][word]
+                self._by_word[word].discard(key)
+        if not entry["units"]:
+            del self._names[key]
+            for gram in entry["grams"]:
+                self._by_gram[gram].discard(key)
+
+    def apply(self, changes):
+        """Applies committed Change objects (see database.events) to the index."""
+        if not self._loaded:
+            return
+        with self._lock:
+            for change in changes:
+                if change.table != Equipment.__tablename__:
+                    continue
+                if change.op == "delete":
+                    self._remove(change.values["id"])
+                    continue
+                self._add(change.values)
+
+    def search(self, query: str, limit: int = 10, available_only: bool = False) -> list:
+        """
+        Returns up to `limit` catalog names ranked by similarity to the query.
+
+        Args:
+            query (str): An equipment name or description, possibly misspelled.
+            limit (int): Maximum number of candidates.
+            available_only (bool): Leave out equipment with no unit available for hire.
+
+        Returns:
+            list: Dicts with name, id (an available unit if there is one), units,
+                available_units, price_per_day (the lowest) and a score between 0 and 1.
+        """
+        self.ensure_loaded()
+        words = set(_words(query))
+        grams = _trigrams(words)
+        if not grams:
+            return []
+        query_size = sum(grams.values())
+
+        with self._lock:
+            # Rare trigrams and description words nominate candidates; common ones (" ex",
+            # "or ") only add to the scores of those, so a lookup never walks a posting
+            # list covering most of the catalog.
+            postings = [(self._by_gram.get(gram, ()), count) for gram, count in grams.items()]
+            postings.sort(key=lambda posting: len(posting[0]))
+            cap = max(256, len(self._names) // 20)
+            shared = Counter()
+            for keys, count in postings:
+                matched = keys if len(keys) <= cap or not shared else keys.intersection(shared)
+                for _ in range(count):
+                    shared.update(matched)
+            described = Counter()
+            for word in words:
+                keys = self._by_word.get(word, ())
+                described.update(keys if len(keys) <= cap else keys.intersection(shared))
+
+            # Only the names sharing the most trigrams can rank in the top `limit`
+            candidates = {key for key, _ in shared.most_common(max(50, limit * 10))}
+            candidates.update(key for key, _ in described.most_common(limit))
+            scored = []
+            for key in candidates:
+                entry = self._names[key]
+                if available_only and not any(is_available for _, is_available, _ in entry["units"].values()):
+                    continue
+                name_score = 2 * min(shared[key], entry["size"]) / (query_size + entry["size"])
+                score = min(1.0, name_score + _DESCRIPTION_WEIGHT * described[key] / len(words))
+                scored.append((-score, entry["name"], entry))
+
+            results = []
+            for score, _, entry in heapq.nsmallest(limit, scored):
+                available = [row_id for row_id, (_, is_available, _) in entry["units"].items() if is_available]
+                prices = [price for price, _, _ in entry["units"].values() if price is not None]
+                results.append({
+                    "id": min(available) if available else min(entry["units"]),
+                    "name": entry["name"],
+                    "units": len(entry["units"]),
+                    "available_units": len(available),
+                    "price_per_day": min(prices) if prices else None,
+                    "score": round(-score, 3),
+                })
+        return results
+
+    def match(self, name: str):
+        """
+        Resolves a free-text equipment name to one catalog name.
+
+        Returns:
+            tuple: (best candidate or None, list of candidates). The best candidate is only
+                set when it is a confident match; otherwise the candidates can be offered
+                to the user as suggestions.
+        """
+        candidates = [candidate for candidate in self.search(name, limit=3) if candidate["score"] >= SUGGEST_THRESHOLD]
+        if not candidates:
+            return None, []
+        best = candidates[0]
+        runner_up = candidates[1]["score"] if len(candidates) > 1 else 0.0
+        if best["score"] >= MATCH_THRESHOLD and best["score"] - runner_up >= MATCH_MARGIN:
+            return best, candidates
+        return None, candidates
+
+
+equipment_index = EquipmentIndex()
+on_commit(equipment_index.apply)
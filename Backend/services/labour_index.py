@@ -0,0 +1,348 @@
+import bisect
+import heapq
+import itertools
+import math
+import re
+import threading
+from collections import Counter, deque
+from sqlalchemy import select
+from database.database import Session
+from database.events import on_commit
+from database.models import Labour
+
+
+# Canonical skill -> other ways it is written. Variants are normalized like skills, so
+# plurals and punctuation don't need listing.
+SKILL_SYNONYMS = {
+    "mason": ["bricklayer", "brick layer", "masonry", "block layer", "stone mason", "stonemason"],
+    "electrician": ["electrical", "electrical work", "electric", "wireman", "sparky", "electrical technician"],
+    "carpenter": ["carpentry", "joiner", "joinery", "woodworker", "woodwork", "formwork carpenter"],
+    "plumber": ["plumbing", "pipefitter", "pipe fitter", "pipe fitting"],
+    "welder": ["welding", "fabricator", "metal fabricator", "steel welder"],
+    "painter": ["painting", "decorator", "painter and decorator"],
+    "steel fixer": ["steelfixer", "rebar", "rebar worker", "rebar fixer", "bar bender", "ironworker", "iron worker"],
+    "tiler": ["tiling", "tile setter", "tile layer", "tile fixer"],
+    "plasterer": ["plastering", "renderer", "rendering"],
+    "roofer": ["roofing", "roof fixer"],
+    "labourer": ["laborer", "general labourer", "general laborer", "helper", "general worker", "unskilled"],
+    "scaffolder": ["scaffolding", "scaffold erector"],
+    "concreter": ["concrete worker", "concrete finisher", "concreting"],
+    "machine operator": ["equipment operator", "heavy equipment operator", "plant operator", "operator"],
+    "crane operator": ["crane driver", "rigger"],
+    "driver": ["truck driver", "lorry driver", "tipper driver"],
+    "foreman": ["supervisor", "site supervisor", "site foreman", "charge hand", "chargehand"],
+    "surveyor": ["land surveyor", "quantity surveyor", "setting out engineer"],
+    "glazier": ["glass fitter", "glazing"],
+    "hvac technician": ["hvac", "air conditioning technician", "ac technician", "air conditioning"],
+}
+
+_SEPARATORS = re.compile(r"\s*(?:[,;/&+|\n]|\band\b)\s*")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def _singular(word: str) -> str:
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def _phrase(text: str) -> str:
+    words = _NON_WORD.sub(" ", text.lower()).split()
+    if words:
+        words[-1] = _singular(words[-1])
+    return " ".join(words)
+
+
+_CANONICAL = {_phrase(variant): canonical for canonical, variants in SKILL_SYNONYMS.items() for variant in variants}
+
+
+def normalize_skill(text: str) -> str:
+    """Lowercases, singularizes and maps a skill to its canonical name ("Electrical" -> "electrician")."""
+    phrase = _phrase(text or "")
+    return _CANONICAL.get(phrase, phrase)
+
+
+def parse_skills(skillset: str) -> frozenset:
+    """Splits a free-text skill set ("Mason, Electrician & Carpenter") into normalized skills."""
+    return frozenset(skill for skill in map(normalize_skill, _SEPARATORS.split(skillset or "")) if skill)
+
+
+def _cheapest_assignment(needed: dict, candidates: dict) -> dict:
+    """
+    Gives each worker at most one skill, filling as many places as possible and, among
+    the ways to fill that many, the one with the lowest total rate. This is a min-cost
+    flow (source -> skill -> worker -> sink) solved by successive shortest paths.
+
+    Args:
+        needed (dict): Skill -> places to fill.
+        candidates (dict): Skill -> [(hourly_rate, id)] of the workers that may fill it.
+
+    Returns:
+        dict: Worker id -> the skill they fill.
+    """
+    # Without a worker shared between skills, each skill's cheapest workers are the answer
+    listed = [labour_id for skill in needed for _, labour_id in candidates.get(skill, ())]
+    if len(listed) == len(set(listed)):
+        return {labour_id: skill for skill, count in needed.items() for _, labour_id in candidates.get(skill, ())[:count]}
+
+    graph = [[], []]            # node -> indices of its edges; 0 is the source, 1 the sink
+    head, capacity, cost = [], [], []
+    workers = {}                # worker id -> node
+    places = []                 # (edge, skill, worker id) for every skill -> worker edge
+
+    def add_node():
+        graph.append([])
+        return len(graph) - 1
+
+    def add_edge(tail, target, limit, rate):
+        # Edge e and its residual e ^ 1 are stored next to each other
+        for start, end, room, price in ((tail, target, limit, rate), (target, tail, 0, -rate)):
+            graph[start].append(len(head))
+            head.append(end)
+            capacity.append(room)
+            cost.append(price)
+
+    for skill, count in needed.items():
+        skill_node = add_node()
+        add_edge(0, skill_node, count, 0)
+        for hourly_rate, labour_id in candidates.get(skill, ()):
+            if labour_id not in workers:
+                workers[labour_id] = add_node()
+                add_edge(workers[labour_id], 1, 1, 0)
+            places.append((len(head), skill, labour_id))
+            add_edge(skill_node, workers[labour_id], 1, hourly_rate)
+
+    while True:
+        # Residual edges have negative costs, so the cheapest path is found by Bellman-Ford
+        distance = [math.inf] * len(graph)
+        via = [None] * len(graph)
+        distance[0] = 0
+        queue, queued = deque([0]), {0}
+        while queue:
+            node = queue.popleft()
+            queued.discard(node)
+            for edge in graph[node]:
+                target = head[edge]
+                if capacity[edge] and distance[node] + cost[edge] < distance[target] - 1e-9:
+                    distance[target] = distance[node] + cost[edge]
+                    via[target] = edge
+                    if target not in queued:
+                        queue.append(target)
+                        queued.add(target)
+        if via[1] is None:
+            break
+        # Every path ends in a worker -> sink edge of capacity 1, so each one adds one place
+        node = 1
+        while node != 0:
+            edge = via[node]
+            capacity[edge] -= 1
+            capacity[edge ^ 1] += 1
+            node = head[edge ^ 1]
+
+    return {labour_id: skill for edge, skill, labour_id in places if not capacity[edge]}
+
+
+class LabourIndex:
+    """
+    Inverted index from normalized skills to the available workers that have them.
+
+    Each skill's posting list holds (hourly_rate, id) in rate order, so the cheapest
+    matching workers come first and a rate cap ends a scan early. Skills are normalized
+    through SKILL_SYNONYMS, so "bricklayer" finds masons and "plumbing" finds plumbers.
+    The index is loaded from the labours table on first use and then kept in sync with
+    committed ORM changes (add_new_labour, remove_labour, availability updates).
+    """
+
+    def __init__(self):
+        self._workers = {}      # id -> (name, skills, hourly_rate, available)
+        self._postings = {}     # skill -> sorted [(hourly_rate, id)] of available workers
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._workers)
+
+    def load(self, rows=None):
+        """(Re)builds the index from (id, name, skillset, hourly_rate, available) rows, or from the database."""
+        with self._lock:
+            if rows is None:
+                with Session() as db:
+                    rows = db.connection().execute(
+                        select(Labour.id, Labour.name, Labour.skillset, Labour.hourly_rate, Labour.available)
+                    ).all()
+            self._workers.clear()
+            postings = {}
+            # Skill sets repeat a lot; parse each distinct one once
+            parsed = {}
+            for labour_id, name, skillset, hourly_rate, available in rows:
+                skills = parsed.get(skillset)
+                if skills is None:
+                    skills = parsed[skillset] = parse_skills(skillset)
+                available = available is not False
+                self._workers[labour_id] = (name, skills, hourly_rate, available)
+                if available:
+                    for skill in skills:
+                        postings.setdefault(skill, []).append((hourly_rate, labour_id))
+            for posting in postings.values():
+                posting.sort()
+            self._postings = postings
+            self._loaded = True
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def _add(self, labour_id, name, skills, hourly_rate, available):
+        self._remove(labour_id)
+        available = available is not False
+        self._workers[labour_id] = (name, skills, hourly_rate, available)
+        if available:
+            for skill in skills:
+                bisect.insort(self._postings.setdefault(skill, []), (hourly_rate, labour_id))
+
+    def _remove(self, labour_id):
+        worker = self._workers.pop(labour_id, None)
+        if worker is None or not worker[3]:
+            return
+        entry = (worker[2], labour_id)
+        for skill in worker[1]:
+            posting = self._postings[skill]
+            del posting[bisect.bisect_left(posting, entry)]
+            if not posting:
+                del self._postings[skill]
+
+    def apply(self, changes):
+        """Applies committed Change objects (see database.events) to the index."""
+        if not self._loaded:
+            return
+        with self._lock:
+            for change in changes:
+                if change.table != Labour.__tablename__:
+                    continue
+                values = change.values
+                if change.op == "delete":
+                    self._remove(values["id"])
+                    continue
+                self._add(values["id"], values["name"], parse_skills(values["skillset"]), values["hourly_rate"], values["available"])
+
+    def _describe(self, labour_id, coverage=None) -> dict:
+        name, skills, hourly_rate, _ = self._workers[labour_id]
+        worker = {"id": labour_id, "name": name, "skills": sorted(skills), "hourly_rate": hourly_rate}
+        if coverage is not None:
+            worker["coverage"] = coverage
+        return worker
+
+    def find(self, skills, max_hourly_rate: float = None, limit: int = 10) -> list:
+        """
+        Ranks available workers by how many of the skills they have, then by hourly rate.
+
+        Workers with every skill are found by walking the shortest posting list in rate
+        order, which usually fills `limit` without touching the rest; otherwise workers
+        with some of the skills are counted in and ranked after them.
+
+        Args:
+            skills: Skill names, free text; synonyms and plurals are understood.
+            max_hourly_rate (float): Leave out workers charging more than this.
+            limit (int): Maximum number of workers.
+
+        Returns:
+            list: Dicts with id, name, skills, hourly_rate and coverage (the share of the
+                wanted skills the worker has), best first.
+        """
+        self.ensure_loaded()
+        wanted = {normalize_skill(skill) for skill in skills} - {""}
+        if not wanted:
+            return []
+        cap = math.inf if max_hourly_rate is None else max_hourly_rate
+        with self._lock:
+            postings = {skill: self._postings.get(skill, []) for skill in wanted}
+            shortest = min(postings.values(), key=len)
+            found = []
+            for hourly_rate, labour_id in shortest:
+                if hourly_rate > cap or len(found) == limit:
+                    break
+                if wanted <= self._workers[labour_id][1]:
+                    found.append(labour_id)
+            if len(found) == limit or len(wanted) == 1:
+                return [self._describe(labour_id, 1.0) for labour_id in found]
+
+            # Not enough workers have every skill; rank the others by how many they have
+            counts = Counter()
+            for posting in postings.values():
+                end = bisect.bisect_right(posting, (cap, math.inf))
+                counts.update(labour_id for _, labour_id in posting[:end])
+            best = heapq.nsmallest(
+                limit,
+                counts.items(),
+                key=lambda item: (-item[1], self._workers[item[0]][2], item[0]),
+            )
+            return [self._describe(labour_id, count / len(wanted)) for labour_id, count in best]
+
+    def assemble_team(self, requirements: dict, max_hourly_rate: float = None, budget_per_hour: float = None) -> dict:
+        """
+        Picks the cheapest available team, one role per worker.
+
+        Roles are assigned together (see _cheapest_assignment), so a multi-skilled worker
+        goes where they save the most, rather than to whichever skill is filled first. The
+        team fills as many places as it can; no cheaper qualified team exists, so when it
+        is over the budget, the budget can't be met with these requirements.
+
+        Args:
+            requirements (dict): Skill -> number of workers needed.
+            max_hourly_rate (float): Leave out workers charging more than this.
+            budget_per_hour (float): The most the whole team may cost per hour.
+
+        Returns:
+            dict: team (workers with the skill they fill), hourly_cost, cost_by_role (skill
+                -> hourly cost of the workers filling it), missing (skill -> workers that
+                couldn't be found), within_budget and unaffordable (skills whose cheapest
+                workers alone cost more than the budget).
+        """
+        self.ensure_loaded()
+        needed = Counter()
+        for skill, count in requirements.items():
+            if normalize_skill(skill):
+                needed[normalize_skill(skill)] += count
+        cap = math.inf if max_hourly_rate is None else max_hourly_rate
+        # A skill can lose at most the other places' worth of its workers to other skills,
+        # so its cheapest sum(needed) workers are the only ones worth considering
+        places = sum(needed.values())
+        with self._lock:
+            candidates = {
+                skill: list(itertools.islice(itertools.takewhile(lambda posting: posting[0] <= cap, self._postings.get(skill, ())), places))
+                for skill in needed
+            }
+            assigned = _cheapest_assignment(needed, candidates)
+            team = [{"role": skill, **self._describe(labour_id)} for labour_id, skill in assigned.items()]
+        order = list(needed)
+        team.sort(key=lambda worker: (order.index(worker["role"]), worker["hourly_rate"], worker["id"]))
+
+        cost_by_role = Counter()
+        for worker in team:
+            cost_by_role[worker["role"]] += worker["hourly_rate"]
+        filled = Counter(worker["role"] for worker in team)
+        missing = {skill: needed[skill] - filled[skill] for skill in needed if filled[skill] < needed[skill]}
+        hourly_cost = sum(cost_by_role.values())
+        within_budget = budget_per_hour is None or hourly_cost <= budget_per_hour
+        unaffordable = []
+        if not within_budget:
+            unaffordable = [
+                skill for skill in needed
+                if sum(hourly_rate for hourly_rate, _ in candidates[skill][:needed[skill]]) > budget_per_hour
+            ]
+        return {
+            "team": team,
+            "hourly_cost": hourly_cost,
+            "cost_by_role": dict(cost_by_role),
+            "missing": missing,
+            "within_budget": within_budget,
+            "unaffordable": unaffordable,
+        }
+
+
+labour_index = LabourIndex()
+on_commit(labour_index.apply)
@@ -0,0 +1,138 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import DateTime, and_, or_, select
+from database.database import AsyncSessionLocal
+
+
+MAX_PAGE_SIZE = 500
+
+# Rows fetched per round trip while streaming an export
+_STREAM_BATCH = 1000
+
+
+class Listing:
+    """
+    Describes a keyset-paginated listing of one model.
+
+    Args:
+        model: The mapped class to list.
+        columns (list): Column names returned by default.
+        optional (list): Column names returned only when asked for with `fields`, e.g. large text.
+        filters (dict): Filter name -> function(value) returning a where clause.
+        sorts (dict): Sort name -> column names; the last one must be unique (the primary key)
+            so the keyset is a total order. Rows with NULL in an earlier column sort after
+            the others. The first entry is the default.
+    """
+
+    def __init__(self, model, columns, optional=(), filters=None, sorts=None):
+        self.model = model
+        self.columns = list(columns)
+        self.optional = list(optional)
+        self.filters = filters or {}
+        self.sorts = sorts or {"id": ["id"]}
+
+    def _fields(self, fields: str = None) -> list:
+        if not fields:
+            return self.columns
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = set(names) - set(self.columns) - set(self.optional)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        return names
+
+    def _sort(self, sort: str = None) -> tuple:
+        sort = sort or next(iter(self.sorts))
+        if sort not in self.sorts:
+            raise HTTPException(status_code=400, detail=f"Unknown sort: {sort}")
+        return sort, [getattr(self.model, name) for name in self.sorts[sort]]
+
+    def statement(self, fields: str = None, sort: str = None, cursor: str = None, **filters):
+        """
+        Builds the select for a page (or an export) with the requested projection,
+        filters and keyset position. Sort columns are always selected, since the next
+        cursor is built from them.
+
+        Returns:
+            tuple: (statement, names of the requested fields, sort name, sort columns)
+        """
+        names = self._fields(fields)
+        sort, keys = self._sort(sort)
+        selected = names + [key.key for key in keys if key.key not in names]
+        statement = select(*(getattr(self.model, name) for name in selected))
+        for name, value in filters.items():
+            if value is not None:
+                statement = statement.where(self.filters[name](value))
+        if cursor:
+            statement = statement.where(_after(keys, decode_cursor(cursor, sort, keys)))
+        # (key IS NULL, key, ..., id): NULLs last on every database, so rows without a value stay listed
+        order = [clause for key in keys[:-1] for clause in (key.is_(None), key)] + keys[-1:]
+        return statement.order_by(*order), names, sort, keys
+
+    async def page(self, db, limit: int = 50, fields: str = None, sort: str = None, cursor: str = None, **filters) -> dict:
+        """
+        Returns one page as {"items": [...], "next_cursor": str or None}.
+        """
+        statement, names, sort, keys = self.statement(fields, sort, cursor, **filters)
+        # One extra row tells whether there is a next page without a COUNT query
+        rows = (await db.execute(statement.limit(limit + 1))).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]._mapping
+            next_cursor = encode_cursor(sort, [last[key.key] for key in keys])
+        return {
+            "items": [{name: row._mapping[name] for name in names} for row in rows],
+            "next_cursor": next_cursor,
+        }
+
+    async def export(self, fields: str = None, sort: str = None, cursor: str = None, **filters):
+        """
+        Yields every matching row as an NDJSON line, streaming from the database in
+        batches so the whole result is never held in memory.
+
+        It opens its own session, since the request's session is closed before a
+        streaming response finishes.
+        """
+        statement, names, _, _ = self.statement(fields, sort, cursor, **filters)
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(statement.execution_options(yield_per=_STREAM_BATCH))
+            async for rows in result.partitions():
+                yield "".join(
+                    json.dumps(jsonable_encoder({name: row._mapping[name] for name in names})) + "\n"
+                    for row in rows
+                )
+
+
+def _after(keys, values):
+    """Where clause for the rows after `values` in the listing's order, with NULLs last."""
+    key, value = keys[0], values[0]
+    if len(keys) == 1:
+        return key > value
+    rest = _after(keys[1:], values[1:])
+    if value is None:
+        return and_(key.is_(None), rest)
+    return or_(key > value, and_(key == value, rest), key.is_(None))
+
+
+def encode_cursor(sort: str, values) -> str:
+    """Encodes the sort key values of the last row of a page as an opaque cursor."""
+    payload = json.dumps({"sort": sort, "after": jsonable_encoder(values)})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, keys) -> list:
+    """Decodes a cursor made by encode_cursor for the given sort, or raises a 400."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = payload["after"]
+        if payload["sort"] != sort or len(values) != len(keys):
+            raise ValueError("cursor does not match the sort")
+        return [
+            datetime.fromisoformat(value) if isinstance(key.type, DateTime) and value is not None else value
+            for key, value in zip(keys, values)
+        ]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
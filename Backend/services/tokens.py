@@ -0,0 +1,231 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi import Header, HTTPException
+from sqlalchemy import select
+from database.database import Session
+from database.events import on_commit
+from database.models import Token, User
+from utils.cache import LRUCache
+
+
+logger = logging.getLogger(__name__)
+
+AUTH_SECRET = os.getenv("AUTH_SECRET")
+# Lets a development server start without AUTH_SECRET, signing with a random per-process key
+AUTH_DEV_MODE = os.getenv("AUTH_DEV_MODE", "false").lower() in ("1", "true", "yes")
+if not AUTH_SECRET:
+    if not AUTH_DEV_MODE:
+        raise RuntimeError(
+            "AUTH_SECRET is not set. Set it to a long random string shared by every worker, "
+            "or set AUTH_DEV_MODE=1 to sign with a throwaway key in development."
+        )
+    # Tokens then only verify in this process and stop working on restart
+    logger.warning("AUTH_SECRET is not set; AUTH_DEV_MODE is on, using a random per-process signing key")
+    AUTH_SECRET = secrets.token_urlsafe(32)
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", "900"))
+REFRESH_TOKEN_TTL = int(os.getenv("REFRESH_TOKEN_TTL", str(14 * 24 * 3600)))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+# Seconds between reloads of the revocation list, to pick up logouts handled by other workers
+TOKEN_REVOCATION_SYNC = int(os.getenv("TOKEN_REVOCATION_SYNC", "30"))
+
+_HEADER = base64.urlsafe_b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}).encode()).decode().rstrip("=")
+
+# Verified token -> claims, so repeat requests skip the signature check and JSON parsing
+_verified = LRUCache(maxsize=TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_TTL)
+
+
+class InvalidToken(Exception):
+    """Raised for a token that is malformed, forged, expired, revoked or of the wrong type."""
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def _signature(signing_input: str) -> str:
+    digest = hmac.new(AUTH_SECRET.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def sign(claims: dict) -> str:
+    """Returns the claims as a compact HS256 JWT."""
+    payload = base64.urlsafe_b64encode(json.dumps(claims, separators=(",", ":")).encode()).decode().rstrip("=")
+    signing_input = f"{_HEADER}.{payload}"
+    return f"{signing_input}.{_signature(signing_input)}"
+
+
+def _decode(token: str) -> dict:
+    try:
+        header, payload, signature = token.split(".")
+    except ValueError:
+        raise InvalidToken("malformed token")
+    if header != _HEADER or not hmac.compare_digest(signature, _signature(f"{header}.{payload}")):
+        raise InvalidToken("bad signature")
+    try:
+        return json.loads(_b64decode(payload))
+    except ValueError:
+        raise InvalidToken("malformed token")
+
+
+class RevocationList:
+    """Session ids (sid claims) that were logged out, kept until their refresh token would expire."""
+
+    def __init__(self):
+        self._revoked = {}      # sid -> expiry as a unix timestamp
+        self._lock = threading.Lock()
+
+    def __contains__(self, sid) -> bool:
+        return sid in self._revoked
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def add(self, sid: str, expires_at: float):
+        with self._lock:
+            self._revoked[sid] = expires_at
+            if len(self._revoked) % 1000 == 0:
+                self._prune()
+
+    def replace(self, entries):
+        revoked = dict(entries)
+        with self._lock:
+            self._revoked = revoked
+            self._prune()
+
+    def _prune(self):
+        now = time.time()
+        for sid in [sid for sid, expires_at in self._revoked.items() if expires_at <= now]:
+            del self._revoked[sid]
+
+
+revoked = RevocationList()
+
+
+def _timestamp(value: datetime) -> float:
+    # expires_at is stored as naive UTC
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def load_revocations():
+    """Replays the revocation list from the tokens table (revoked sessions that haven't expired)."""
+    with Session() as db:
+        rows = db.execute(
+            select(Token.refresh_token, Token.expires_at).where(Token.revoked.is_(True), Token.expires_at > datetime.utcnow())
+        ).all()
+    revoked.replace((sid, _timestamp(expires_at)) for sid, expires_at in rows)
+
+
+@on_commit
+def _track_revocations(changes):
+    for change in changes:
+        if change.table == Token.__tablename__ and change.op != "delete" and change.values.get("revoked"):
+            expires_at = change.values.get("expires_at") or datetime.utcnow() + timedelta(seconds=REFRESH_TOKEN_TTL)
+            revoked.add(change.values["refresh_token"], _timestamp(expires_at))
+
+
+def verify_token(token: str, token_type: str = "access") -> dict:
+    """
+    Returns the claims of a valid token, checking the cache of verified tokens before the
+    signature. Expiry, type and revocation are checked on every call.
+
+    Raises:
+        InvalidToken: If the token is not a valid, live token of the given type.
+    """
+    claims = _verified.get(token)
+    if claims is None:
+        claims = _decode(token)
+        _verified.set(token, claims)
+    if claims.get("typ") != token_type:
+        raise InvalidToken("wrong token type")
+    if claims.get("exp", 0) <= time.time():
+        raise InvalidToken("token expired")
+    if claims.get("sid") in revoked:
+        raise InvalidToken("token revoked")
+    return claims
+
+
+def _access_token(user_id, role: str, sid: str) -> tuple:
+    now = int(time.time())
+    jti = secrets.token_hex(16)
+    token = sign({"sub": str(user_id), "role": role, "typ": "access", "sid": sid, "jti": jti, "iat": now, "exp": now + ACCESS_TOKEN_TTL})
+    return token, jti
+
+
+async def issue_tokens(db, user_id: int, role: str) -> dict:
+    """
+    Starts a session for the user: records it in the tokens table and returns a signed
+    access token and refresh token. The refresh token's id is the session id.
+    """
+    now = int(time.time())
+    sid = secrets.token_hex(16)
+    access_token, jti = _access_token(user_id, role, sid)
+    refresh_token = sign({"sub": str(user_id), "typ": "refresh", "sid": sid, "iat": now, "exp": now + REFRESH_TOKEN_TTL})
+    db.add(Token(
+        access_token=jti,
+        refresh_token=sid,
+        user_id=user_id,
+        expires_at=datetime.utcnow() + timedelta(seconds=REFRESH_TOKEN_TTL),
+    ))
+    await db.commit()
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_TTL,
+    }
+
+
+async def refresh_tokens(db, refresh_token: str) -> dict:
+    """
+    Issues a new access token for a live session, with the user's current role.
+
+    Raises:
+        InvalidToken: If the refresh token or its session is not valid, or the user is disabled.
+    """
+    claims = verify_token(refresh_token, "refresh")
+    session = (await db.execute(select(Token).where(Token.refresh_token == claims["sid"]))).scalars().first()
+    if session is None or session.revoked:
+        raise InvalidToken("session ended")
+    user = await db.get(User, int(claims["sub"]))
+    if user is None or user.disabled:
+        raise InvalidToken("user disabled")
+    access_token, jti = _access_token(user.id, user.role, claims["sid"])
+    session.access_token = jti
+    await db.commit()
+    return {"access_token": access_token, "token_type": "bearer", "expires_in": ACCESS_TOKEN_TTL}
+
+
+async def revoke_session(db, sid: str) -> bool:
+    """Ends a session; its access and refresh tokens are rejected from then on. Returns False if unknown."""
+    session = (await db.execute(select(Token).where(Token.refresh_token == sid))).scalars().first()
+    if session is None:
+        return False
+    session.revoked = True
+    await db.commit()
+    return True
+
+
+async def bearer_claims(authorization: Optional[str] = Header(None)) -> Optional[dict]:
+    """
+    FastAPI dependency returning the verified claims of the request's bearer token, or
+    None when there is no Authorization header. An invalid token is a 401. It is async
+    only so FastAPI calls it inline rather than on the threadpool; it never touches the database.
+    """
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Expected a bearer token", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return verify_token(token.strip())
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
@@ -0,0 +1,46 @@
+import itertools
+import os
+import sys
+import tempfile
+
+# Settings are read at import time, so they have to be in place before the app is imported
+_DB_DIR = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.sqlite')}"
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("CHECKPOINT_URL", "memory")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("AUTH_SECRET", "test-secret")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+    from database.database import Base, get_engine
+    Base.metadata.create_all(get_engine())
+    return main.app
+
+
+@pytest.fixture
+def client(app):
+    from fastapi.testclient import TestClient
+    # Not entered as a context manager, so the startup warm-up doesn't run
+    return TestClient(app)
+
+
+@pytest.fixture
+def scripted_llm(app):
+    """Replaces the app's chat model with one that streams a fixed reply word by word."""
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from utils import get_llm, set_llm
+
+    class ScriptedChatModel(GenericFakeChatModel):
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+    previous = get_llm()
+    set_llm(ScriptedChatModel(messages=itertools.repeat("The excavator costs 120 per day.")))
+    yield
+    set_llm(previous)
@@ -0,0 +1,144 @@
+import asyncio
+import pytest
+import agent.agent
+from agent.admission import CHAT_RETRY_AFTER, AdmissionRejected, Scheduler
+
+
+def _scheduler(**options):
+    return Scheduler(**{"concurrency": 1, "role_limits": {}, "queue_limit": 10, "queue_timeout": 5, "aging": 100, **options})
+
+
+def test_freed_slots_go_to_the_highest_priority_role():
+    async def run():
+        scheduler = _scheduler()
+        order = []
+
+        async def turn(role):
+            await scheduler.acquire(role)
+            order.append(role)
+            scheduler.release(role)
+
+        await scheduler.acquire("user")
+        turns = [asyncio.ensure_future(turn(role)) for role in ("user", "admin", "super_admin", "admin")]
+        await asyncio.sleep(0.01)
+        scheduler.release("user")
+        await asyncio.gather(*turns)
+        return order
+
+    assert asyncio.run(run()) == ["super_admin", "admin", "admin", "user"]
+
+
+def test_waiting_ages_a_turn_past_higher_priorities():
+    async def run():
+        scheduler = _scheduler(aging=0.01)
+        order = []
+
+        async def turn(role):
+            await scheduler.acquire(role)
+            order.append(role)
+            scheduler.release(role)
+
+        await scheduler.acquire("admin")
+        user = asyncio.ensure_future(turn("user"))
+        await asyncio.sleep(0.05)
+        admin = asyncio.ensure_future(turn("admin"))
+        await asyncio.sleep(0.01)
+        scheduler.release("admin")
+        await asyncio.gather(user, admin)
+        return order
+
+    assert asyncio.run(run()) == ["user", "admin"]
+
+
+def test_full_queue_sheds_the_lowest_ranked_turn():
+    async def run():
+        scheduler = _scheduler(queue_limit=1)
+        await scheduler.acquire("user")
+        queued_user = asyncio.ensure_future(scheduler.acquire("user"))
+        await asyncio.sleep(0.01)
+        queued_admin = asyncio.ensure_future(scheduler.acquire("admin"))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(AdmissionRejected) as shed:
+            await queued_user
+        with pytest.raises(AdmissionRejected) as refused:
+            await scheduler.acquire("user")
+        scheduler.release("user")
+        await queued_admin
+        return shed.value.status_code, refused.value.status_code, scheduler.stats()
+
+    shed, refused, stats = asyncio.run(run())
+    assert shed == refused == 429
+    assert stats["running"] == 1 and stats["waiting"] == 0
+
+
+def test_turns_that_wait_too_long_get_a_503():
+    async def run():
+        scheduler = _scheduler(queue_timeout=0.05)
+        await scheduler.acquire("user")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await scheduler.acquire("admin")
+        return rejected.value.status_code, scheduler.waiting
+
+    assert asyncio.run(run()) == (503, 0)
+
+
+def test_role_caps_keep_room_for_other_roles():
+    async def run():
+        scheduler = _scheduler(concurrency=2, role_limits={"user": 1})
+        await scheduler.acquire("user")
+        waiting_user = asyncio.ensure_future(scheduler.acquire("user"))
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(scheduler.acquire("admin"), timeout=0.1)
+        assert not waiting_user.done()
+
+        # A cancelled waiter leaves the queue
+        waiting_user.cancel()
+        await asyncio.sleep(0)
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats["running"] == 2 and stats["waiting"] == 0
+
+
+def test_chat_is_refused_with_retry_after_when_overloaded(client, monkeypatch):
+    monkeypatch.setattr(agent.agent, "scheduler", Scheduler(concurrency=0, queue_limit=0))
+    response = client.post("/chat/", json={"message": "Hello, can you help me plan a house extension?"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(CHAT_RETRY_AFTER)
+
+
+def test_stream_is_refused_with_retry_after_when_overloaded(client, monkeypatch):
+    monkeypatch.setattr(agent.agent, "scheduler", Scheduler(concurrency=0, queue_limit=0))
+    response = client.post("/chat/stream", json={"message": "Hello, can you help me plan a house extension?"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(CHAT_RETRY_AFTER)
+
+
+def test_stream_responds_at_once_and_holds_the_slot_until_it_ends(app, monkeypatch):
+    from routes.chat import chat_stream
+    from schema import ChatRequest
+
+    scheduler = _scheduler()
+    monkeypatch.setattr(agent.agent, "scheduler", scheduler)
+    started = []
+
+    async def reply(request):
+        started.append(request.message)
+        yield "done", {"response": "ok"}
+
+    monkeypatch.setattr("routes.chat.stream_chat_response", reply)
+
+    async def run():
+        response = await chat_stream(ChatRequest(message="hi"), None)
+        # The response exists before the agent has produced anything
+        before = (list(started), scheduler.running)
+        body = [chunk async for chunk in response.body_iterator]
+        return before, body, scheduler.running
+
+    before, body, running = asyncio.run(run())
+    assert before == ([], 1)
+    assert body == ['event: done\ndata: {"response": "ok"}\n\n']
+    assert running == 0
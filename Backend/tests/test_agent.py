@@ -0,0 +1,23 @@
+import pytest
+from agent.agent import ROLES, get_agent, reset_agents, warm_agents
+
+
+def test_agents_are_compiled_once_per_role(app):
+    reset_agents()
+    graphs = {role: get_agent(role) for role in ROLES}
+
+    assert all(get_agent(role) is graphs[role] for role in ROLES)
+    assert len({id(graph) for graph in graphs.values()}) == len(ROLES)
+
+
+def test_reset_agents_rebuilds_on_next_use(app):
+    warm_agents()
+    before = get_agent("user")
+    reset_agents()
+
+    assert get_agent("user") is not before
+
+
+def test_unknown_role_is_refused(app):
+    with pytest.raises(ValueError):
+        get_agent("guest")
@@ -0,0 +1,118 @@
+import os
+import subprocess
+import sys
+import uuid
+from passlib.context import CryptContext
+from sqlalchemy import update
+from database.database import Session
+from database.models import User
+from utils import auth
+
+
+def _register(client, headers=None, status=200, **fields):
+    name = uuid.uuid4().hex[:12]
+    body = {"username": name, "email": f"{name}@example.com", "password": "secret-pass", "phone_number": "0700000000", **fields}
+    response = client.post("/auth/register", json=body, headers=headers)
+    assert response.status_code == status
+    return body
+
+
+def _login(client, body):
+    return client.post("/auth/login", json={"email": body["email"], "password": body["password"]}).json()
+
+
+def test_register_then_login(client):
+    body = _register(client)
+
+    assert _login(client, body)["message"] == "Login successful"
+    assert _login(client, {**body, "password": "wrong"})["message"] == "Invalid credentials"
+
+
+def test_register_twice_is_refused(client):
+    body = _register(client)
+    response = client.post("/auth/register", json=body)
+
+    assert response.json()["message"] == "User already exists"
+
+
+def test_login_rehashes_at_the_configured_cost(client, monkeypatch):
+    body = _register(client)
+    monkeypatch.setattr(auth, "pwd_context", CryptContext(
+        schemes=["bcrypt"], bcrypt__rounds=5, bcrypt__min_rounds=5, bcrypt__max_rounds=5,
+    ))
+
+    assert _login(client, body)["message"] == "Login successful"
+    with Session() as db:
+        assert db.query(User.password).filter_by(email=body["email"]).scalar().startswith("$2b$05$")
+    assert _login(client, body)["message"] == "Login successful"
+
+
+def test_full_hashing_queue_is_refused_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(auth, "_pending", auth.HASH_WORKERS + auth.HASH_QUEUE_LIMIT)
+    name = uuid.uuid4().hex[:12]
+    response = client.post("/auth/register", json={
+        "username": name, "email": f"{name}@example.com", "password": "secret-pass", "phone_number": "0",
+    })
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(auth.HASH_RETRY_AFTER)
+
+
+def test_register_defaults_to_user_role(client):
+    assert _login(client, _register(client))["role"] == "user"
+
+
+def test_register_refuses_self_assigned_admin_roles(client):
+    _register(client, role="super_admin", status=403)
+    _register(client, role="admin", status=403)
+    user = _login(client, _register(client))
+    _register(client, role="admin", headers={"Authorization": f"Bearer {user['access_token']}"}, status=403)
+
+
+def test_super_admin_can_register_admins(client):
+    body = _register(client)
+    with Session() as db:
+        db.execute(update(User).filter_by(email=body["email"]).values(role="super_admin"))
+        db.commit()
+    headers = {"Authorization": f"Bearer {_login(client, body)['access_token']}"}
+
+    admin = _register(client, role="admin", headers=headers)
+    assert _login(client, admin)["role"] == "admin"
+    _register(client, role="owner", headers=headers, status=400)
+
+
+def test_refresh_then_logout_ends_the_session(client):
+    tokens = _login(client, _register(client))
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    refreshed = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert refreshed.status_code == 200 and refreshed.json()["access_token"]
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["access_token"]}).status_code == 401
+
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+    assert client.post("/auth/logout", headers=headers).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+
+def test_forged_tokens_are_refused(client):
+    token = _login(client, _register(client))["access_token"]
+    header, payload, signature = token.split(".")
+    forged = f"{header}.{payload}.{signature[::-1]}"
+
+    assert client.post("/auth/logout", headers={"Authorization": f"Bearer {forged}"}).status_code == 401
+    assert client.post("/auth/logout", headers={"Authorization": token}).status_code == 401
+
+
+def test_startup_requires_a_signing_secret(tmp_path):
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {key: value for key, value in os.environ.items() if key not in ("AUTH_SECRET", "AUTH_DEV_MODE")}
+    env["DATABASE_URL"] = f"sqlite:///{tmp_path / 'secret.sqlite'}"
+
+    def start(**extra):
+        return subprocess.run([sys.executable, "-c", "import services.tokens"], cwd=backend, env={**env, **extra},
+                              capture_output=True, text=True, timeout=120)
+
+    refused = start()
+    assert refused.returncode != 0 and "AUTH_SECRET is not set" in refused.stderr
+    assert start(AUTH_DEV_MODE="1").returncode == 0
+    assert start(AUTH_SECRET="s3cret").returncode == 0
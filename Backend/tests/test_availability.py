@@ -0,0 +1,115 @@
+import random
+from datetime import date, datetime
+import pytest
+from sqlalchemy.orm import load_only
+from database.database import Session
+from database.models import Equipment, Equipment_Request
+from services.availability import _Schedule, availability, check_availability, free_units_for_update
+
+MONDAY = date(2031, 3, 3)
+
+
+def test_schedule_matches_brute_force():
+    rng = random.Random(7)
+    schedule = _Schedule(units=5)
+    booked = {}
+    for request_id in range(300):
+        if booked and rng.random() < 0.3:
+            cancelled = rng.choice(list(booked))
+            schedule.cancel(cancelled)
+            del booked[cancelled]
+        start = rng.randrange(0, 400)
+        booked[request_id] = (start, start + rng.randrange(1, 30), rng.randrange(1, 3))
+        schedule.book(request_id, *booked[request_id])
+
+    def load(day):
+        return sum(quantity for start, end, quantity in booked.values() if start <= day < end)
+
+    for _ in range(200):
+        first = rng.randrange(-10, 420)
+        last = first + rng.randrange(0, 40)
+        assert schedule.peak(first, last + 1) == max(load(day) for day in range(first, last + 1))
+        threshold = rng.randrange(0, 5)
+        assert schedule.first(first, threshold, above=True) == next((day for day in range(first, 500) if load(day) > threshold), None)
+        assert schedule.first(first, threshold, above=False) == next(day for day in range(first, 500) if load(day) <= threshold)
+
+
+@pytest.fixture
+def crane(app):
+    """Equipment with three units, two of them booked from Monday for five days."""
+    with Session() as db:
+        crane = Equipment(name="Tower Crane", price_per_day=500.0, units=3)
+        db.add(crane)
+        db.flush()
+        db.add(Equipment_Request(equipment_id=crane.id, quantity=2, number_of_dates=5, start_date=datetime(2031, 3, 3), status="approved"))
+        db.commit()
+        return crane.id
+
+
+def test_free_units_and_earliest_start(crane):
+    assert availability.free_units(crane, MONDAY) == 1
+    assert availability.free_units(crane, date(2031, 3, 8)) == 3
+    summary = check_availability(crane, MONDAY, quantity=2, number_of_dates=3)
+    assert (summary["free_units"], summary["fits"], summary["earliest_start"]) == (1, False, date(2031, 3, 8))
+    assert availability.earliest_start(crane, quantity=4, after=MONDAY) is None
+
+
+def test_cancelling_frees_units(crane):
+    with Session() as db:
+        # Only the status is loaded; the change still carries the booking's dates
+        request = db.query(Equipment_Request).options(load_only(Equipment_Request.status)).filter_by(equipment_id=crane).one()
+        request.status = "cancelled"
+        db.commit()
+
+    assert availability.free_units(crane, MONDAY, date(2031, 3, 7)) == 3
+
+
+def test_approval_refuses_to_overbook(client, crane):
+    with Session() as db:
+        fits = Equipment_Request(equipment_id=crane, quantity=1, number_of_dates=5, start_date=datetime(2031, 3, 3))
+        too_many = Equipment_Request(equipment_id=crane, quantity=1, number_of_dates=2, start_date=datetime(2031, 3, 6))
+        db.add_all([fits, too_many])
+        db.commit()
+        ids = fits.id, too_many.id
+
+    assert client.put(f"/admin/equipment-requests/approve/{ids[0]}").status_code == 200
+    response = client.put(f"/admin/equipment-requests/approve/{ids[1]}")
+    assert response.status_code == 409
+    assert response.json()["detail"] == {
+        "message": "Not enough units are free for the requested dates", "free_units": 0, "earliest_start": "2031-03-08",
+    }
+
+
+def test_approval_counts_bookings_in_the_transaction(crane):
+    with Session() as db:
+        # Not committed yet, so only the transaction knows about it
+        db.add(Equipment_Request(equipment_id=crane, quantity=1, number_of_dates=10, start_date=datetime(2031, 2, 25), status="approved"))
+        db.flush()
+        assert free_units_for_update(db, crane, datetime(2031, 3, 6), 1) == 0
+        assert free_units_for_update(db, crane, datetime(2031, 3, 7), 3) == 1
+        assert free_units_for_update(db, crane, datetime(2031, 3, 8), 1) == 3
+        assert free_units_for_update(db, crane, datetime(2031, 2, 20), 5) == 3
+        db.rollback()
+    assert free_units_for_update(Session(), 999999, MONDAY) == 0
+
+
+def test_undated_and_missing_requests_are_not_approved(client, crane):
+    with Session() as db:
+        undated = Equipment_Request(equipment_id=crane, quantity=3, number_of_dates=2)
+        db.add(undated)
+        db.commit()
+        undated_id = undated.id
+
+    response = client.put(f"/admin/equipment-requests/approve/{undated_id}")
+    assert response.status_code == 409
+    assert "start date" in response.json()["detail"]["message"]
+    with Session() as db:
+        assert db.get(Equipment_Request, undated_id).status == "pending"
+    assert client.put("/admin/equipment-requests/approve/999999").status_code == 404
+    assert client.put("/admin/equipment-requests/cancel/999999").status_code == 404
+
+
+def test_availability_endpoint(client, crane):
+    body = client.get(f"/catalog/availability/{crane}", params={"start_date": "2031-03-03", "end_date": "2031-03-04", "quantity": 2}).json()
+    assert (body["units"], body["free_units"], body["fits"], body["earliest_start"]) == (3, 1, False, "2031-03-08")
+    assert client.get("/catalog/availability/999999", params={"start_date": "2031-03-03"}).status_code == 404
@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(module, tmp_path, *args):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'benchmark.sqlite'}", "CHECKPOINT_URL": "memory"}
+    result = subprocess.run(
+        [sys.executable, "-m", module, *args], cwd=BACKEND, env=env, capture_output=True, text=True, timeout=300,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    return result.stdout
+
+
+def test_load_benchmark_writes_and_compares_results(tmp_path):
+    output = tmp_path / "results.json"
+    small = ["--requests", "12", "--concurrency", "3", "--latency", "0", "--equipment", "50", "--labours", "50",
+             "--projects", "50", "--history", "50"]
+    _run("benchmarks.load", tmp_path, *small, "--output", str(output))
+
+    results = json.loads(output.read_text())
+    assert set(results["scenarios"]) == {"chat", "auth", "admin"}
+    for scenario in results["scenarios"].values():
+        assert scenario["requests"] == 12 and scenario["errors"] == 0
+    assert 0 < results["scenarios"]["chat"]["llm_calls_per_request"] < 2
+
+    stdout = _run("benchmarks.load", tmp_path, *small, "--scenarios", "admin", "--compare", str(output))
+    assert f"vs {results['commit']}:" in stdout
+
+
+def test_concurrent_logins_are_not_shed_at_the_defaults(tmp_path):
+    # More clients than HASH_WORKERS + the default HASH_QUEUE_LIMIT
+    stdout = _run("benchmarks.db_concurrency", tmp_path, "--clients", "60", "--requests", "1", "--users", "10", "--projects", "10")
+    assert "/auth/login      60 requests (0 shed)" in stdout
+
+
+def test_singleflight_benchmark_admits_the_whole_burst(tmp_path, monkeypatch):
+    # Turns queued behind the default role limit would time out and be refused
+    monkeypatch.setenv("CHAT_QUEUE_TIMEOUT", "0.01")
+    stdout = _run("benchmarks.singleflight", tmp_path, "--users", "40", "--latency", "0.05")
+    assert "coalescing off" in stdout and "coalescing on" in stdout
+
+
+def test_import_defers_the_llm_client_and_engine(tmp_path):
+    stdout = _run("benchmarks.startup", tmp_path, "--runs", "1", "--forbid", "openai", "--forbid", "langchain_openai")
+    assert "time to ready" in stdout
+
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'lazy.sqlite'}", "CHECKPOINT_URL": "memory"}
+    check = "import sys, main, database.database as db; print(db._engine is None, 'openai' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", check], cwd=BACKEND, env=env, capture_output=True, text=True, timeout=120)
+    assert result.stdout.split() == ["True", "False"], result.stderr[-2000:]
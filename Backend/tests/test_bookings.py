@@ -0,0 +1,83 @@
+import uuid
+from datetime import datetime
+import pytest
+from database.database import Session
+from database.models import Equipment, Equipment_Request
+from services.bookings import book_equipment, parse_date
+
+
+@pytest.fixture
+def machines(app):
+    """Adds an available machine with two units and an unavailable one, with unique names."""
+    suffix = uuid.uuid4().hex[:8]
+    with Session() as db:
+        db.add_all([
+            Equipment(name=f"Loader {suffix}", price_per_day=80.0, units=2),
+            Equipment(name=f"Crane {suffix}", price_per_day=300.0, available=False),
+        ])
+        db.commit()
+    return f"loader {suffix}", f"crane {suffix}"
+
+
+def test_parse_date_accepts_llm_and_python_dates():
+    assert parse_date("2025-06-02") == datetime(2025, 6, 2)
+    assert parse_date("2025-06-02T08:00:00Z").hour == 8
+    assert parse_date(None) is None
+    with pytest.raises(ValueError):
+        parse_date("next monday")
+
+
+def test_bulk_request_reports_each_item(client, machines):
+    loader, crane = machines
+    response = client.post("/client/equipment-requests", json={
+        "location": "Colombo",
+        "start_date": "2025-06-02T00:00:00",
+        "items": [
+            {"equipment_name": loader.upper(), "quantity": 2, "number_of_dates": 3},
+            {"equipment_name": crane},
+            {"equipment_name": "teleporter"},
+            {"equipment_name": loader, "quantity": 0},
+        ],
+    })
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["requested", "unavailable", "not_found", "invalid"]
+    with Session() as db:
+        request = db.get(Equipment_Request, results[0]["request_id"])
+        assert (request.quantity, request.number_of_dates, request.location) == (2, 3, "Colombo")
+        assert request.start_date == datetime(2025, 6, 2)
+
+
+def test_bulk_request_needs_items(client):
+    assert client.post("/client/equipment-requests", json={"items": []}).status_code == 400
+
+
+def test_requests_that_do_not_fit_their_dates_are_refused(app, machines):
+    loader, _ = machines
+    with Session() as db:
+        loader_id = db.query(Equipment.id).filter(Equipment.name.ilike(loader)).scalar()
+        db.add(Equipment_Request(equipment_id=loader_id, quantity=1, number_of_dates=4, start_date=datetime(2032, 5, 3), status="approved"))
+        db.commit()
+
+    with Session() as db:
+        results = book_equipment(db, [
+            {"equipment_name": loader, "quantity": 2, "number_of_dates": 2, "start_date": "2032-05-05"},
+            {"equipment_name": loader, "quantity": 3, "start_date": "2032-05-05"},
+            {"equipment_name": loader, "quantity": 1, "start_date": "2032-05-05"},
+            {"equipment_name": loader, "quantity": 2},
+        ])
+
+    assert [result["status"] for result in results] == ["unavailable", "unavailable", "requested", "requested"]
+    assert (results[0]["free_units"], results[0]["earliest_start"]) == (1, datetime(2032, 5, 7).date())
+    assert (results[1]["free_units"], results[1]["earliest_start"]) == (1, None)
+
+
+def test_booking_tool_reports_when_units_are_free(app, machines):
+    from agent.tools.database import place_request_for_equipment
+
+    loader, _ = machines
+    message = place_request_for_equipment.invoke({
+        "equipment_name": loader, "number_of_dates": 2, "quantity": 3, "location": "Kandy", "start_date": "2032-06-01",
+    })
+    assert message == f"Only 2 units of {loader} are free for those dates. {loader} does not have 3 units."
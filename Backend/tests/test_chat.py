@@ -0,0 +1,91 @@
+import asyncio
+import json
+from services.tokens import _access_token
+
+
+def _events(response):
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_stream_sends_tokens_then_the_full_reply(client, scripted_llm):
+    response = client.post("/chat/stream", json={"message": "How much is the excavator?"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response)
+    tokens = [data["content"] for event, data in events if event == "token"]
+    assert len(tokens) > 1
+    assert events[-1][0] == "done"
+    assert "".join(tokens) == events[-1][1]["response"] == "The excavator costs 120 per day."
+
+
+def test_role_and_user_come_from_the_token_not_the_body(client, monkeypatch):
+    seen = []
+
+    async def record(request):
+        seen.append((request.role, request.user_id))
+        yield "done", {"response": "ok"}
+
+    monkeypatch.setattr("routes.chat.stream_chat_response", record)
+    client.post("/chat/stream", json={"message": "hi", "role": "super_admin", "user_id": "victim"})
+    token, _ = _access_token(7, "admin", "test-session")
+    client.post("/chat/stream", json={"message": "hi", "role": "super_admin"}, headers={"Authorization": f"Bearer {token}"})
+
+    assert seen == [("user", None), ("admin", "7")]
+
+
+def test_stream_reports_errors_in_band(client, monkeypatch):
+    async def broken(request):
+        raise RuntimeError("model unavailable")
+        yield
+
+    monkeypatch.setattr("routes.chat.stream_chat_response", broken)
+    response = client.post("/chat/stream", json={"message": "hi"})
+
+    assert response.status_code == 200
+    assert _events(response) == [("error", {"detail": "model unavailable"})]
+
+
+def _state(conversation_id, user_id=None):
+    from agent import get_agent
+    from agent.checkpointer import thread_key
+
+    config = {"configurable": {"thread_id": thread_key(user_id, conversation_id)}}
+    return asyncio.run(get_agent("user").aget_state(config))
+
+
+def test_chats_without_ids_get_separate_conversations(client, scripted_llm):
+    first = client.post("/chat/", json={"message": "How much is the excavator?"}).json()
+    second = client.post("/chat/", json={"message": "And the crane?"}).json()
+
+    assert first["conversation_id"] and second["conversation_id"]
+    assert first["conversation_id"] != second["conversation_id"]
+    assert len(_state(first["conversation_id"]).values["messages"]) == 2
+    assert len(_state(second["conversation_id"]).values["messages"]) == 2
+
+
+def test_returned_conversation_id_continues_the_conversation(client, scripted_llm):
+    conversation_id = client.post("/chat/", json={"message": "How much is the excavator?"}).json()["conversation_id"]
+    reply = client.post("/chat/", json={"message": "And per week?", "conversation_id": conversation_id}).json()
+
+    assert reply["conversation_id"] == conversation_id
+    messages = _state(conversation_id).values["messages"]
+    assert [m.content for m in messages if m.type == "human"] == ["How much is the excavator?", "And per week?"]
+
+
+def test_stream_reports_the_conversation_id(client, scripted_llm):
+    done = _events(client.post("/chat/stream", json={"message": "How much is the excavator?"}))[-1]
+
+    assert done[0] == "done"
+    assert len(_state(done[1]["conversation_id"]).values["messages"]) == 2
+
+
+def test_anonymous_callers_cannot_choose_a_user_id(client, scripted_llm):
+    reply = client.post("/chat/", json={"message": "How much is the excavator?", "user_id": "victim", "conversation_id": "c1"}).json()
+
+    assert reply["conversation_id"] == "c1"
+    assert "messages" not in _state("c1", user_id="victim").values
+    assert len(_state("c1").values["messages"]) == 2
@@ -0,0 +1,79 @@
+import asyncio
+from sqlalchemy import select
+from agent.checkpointer import BoundedCheckpointer, thread_key
+from database.database import Session
+from database.models import ChatThread
+
+
+def test_thread_key_without_conversation_is_unique():
+    assert thread_key("7", "abc") == "7:abc"
+    assert thread_key("7") != thread_key("7")
+    assert thread_key(None, "abc") == "anonymous:abc"
+
+
+def test_sweep_keeps_only_the_most_recently_active_threads(app):
+    saver = BoundedCheckpointer(url="memory", max_threads=2, sweep_interval=3600)
+
+    async def run():
+        for name in ("first", "second", "third"):
+            await saver._touch(f"sweeper:{name}")
+            await asyncio.sleep(0.01)
+        return await saver.sweep()
+
+    assert asyncio.run(run()) >= 1
+    with Session() as db:
+        remaining = db.execute(select(ChatThread.thread_id)).scalars().all()
+    assert set(remaining) == {"sweeper:second", "sweeper:third"}
+
+
+def _counter_graph(saver):
+    from operator import add
+    from typing import Annotated
+    from typing_extensions import TypedDict
+    from langgraph.graph import END, START, StateGraph
+
+    class Counter(TypedDict):
+        steps: Annotated[list, add]
+
+    builder = StateGraph(Counter)
+    builder.add_node("step", lambda state: {"steps": [len(state["steps"])]})
+    builder.add_edge(START, "step")
+    builder.add_edge("step", END)
+    return builder.compile(checkpointer=saver)
+
+
+def test_sync_calls_are_delegated(tmp_path):
+    saver = BoundedCheckpointer(url=f"sqlite:///{tmp_path / 'checkpoints.sqlite'}", sweep_interval=3600)
+    graph = _counter_graph(saver)
+    config = {"configurable": {"thread_id": "sync:one"}}
+
+    # No loop is running: each call opens the store on a loop of its own
+    graph.invoke({"steps": []}, config)
+    assert graph.invoke({"steps": []}, config)["steps"] == [0, 1]
+    assert len(list(saver.list(config))) >= 2
+
+    async def from_the_loop():
+        # Once the loop has the store open, calls from other threads run on it
+        await graph.ainvoke({"steps": []}, config)
+        state = await asyncio.to_thread(graph.get_state, config)
+        try:
+            saver.get_tuple(config)
+        except asyncio.InvalidStateError:
+            blocked = True
+        else:
+            blocked = False
+        await saver.aclose()
+        return state.values["steps"], blocked
+
+    assert asyncio.run(from_the_loop()) == ([0, 1, 2], True)
+
+
+def test_default_store_does_not_depend_on_the_working_directory(monkeypatch, tmp_path):
+    from agent import checkpointer
+
+    monkeypatch.setattr(checkpointer, "DATABASE_URL", f"sqlite:///{tmp_path / 'app.db'}")
+    assert checkpointer._default_checkpoint_url() == f"sqlite:///{tmp_path / 'checkpoints.sqlite'}"
+    monkeypatch.setattr(checkpointer, "DATABASE_URL", "sqlite://")
+    assert checkpointer._default_checkpoint_url().startswith("sqlite:////")
+    monkeypatch.setattr(checkpointer, "DATABASE_URL", "postgresql://app@db/app")
+    assert checkpointer._default_checkpoint_url() == "postgresql://app@db/app"
@@ -0,0 +1,58 @@
+import asyncio
+import contextvars
+import threading
+import time
+from agent.tools.concurrency import limit_tool_concurrency, offload, parallel_tool
+
+_request = contextvars.ContextVar("request", default=None)
+
+
+def test_offloaded_calls_run_on_the_pool_with_the_callers_context():
+    def work():
+        return threading.current_thread().name, _request.get()
+
+    async def run():
+        _request.set("req-1")
+        return await offload(work)()
+
+    thread, request = asyncio.run(run())
+    assert thread.startswith("agent-tool")
+    assert request == "req-1"
+
+
+def test_calls_of_one_request_respect_its_limit():
+    lock = threading.Lock()
+    running = {"now": 0, "peak": 0}
+
+    def work():
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        time.sleep(0.05)
+        with lock:
+            running["now"] -= 1
+
+    async def run():
+        limit_tool_concurrency(2)
+        await asyncio.gather(*(offload(work)() for _ in range(6)))
+
+    asyncio.run(run())
+    assert running["peak"] == 2
+
+
+def test_tool_calls_of_one_step_overlap():
+    @parallel_tool
+    def slow_lookup(question: str) -> str:
+        """Looks something up slowly."""
+        time.sleep(0.2)
+        return question.upper()
+
+    async def run():
+        limit_tool_concurrency(3)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(slow_lookup.ainvoke({"question": q}) for q in ("a", "b", "c")))
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(run())
+    assert results == ["A", "B", "C"]
+    assert elapsed < 0.5
@@ -0,0 +1,41 @@
+import asyncio
+import uuid
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from utils import set_llm
+from utils.config import get_llm
+from utils.fake_llm import FakeChatModel
+from agent.agent import build_agent
+
+
+def test_prompt_history_stays_within_the_budget(app, monkeypatch):
+    monkeypatch.setenv("CONTEXT_BUDGET_USER", "300")
+    prompts = []
+
+    def respond(messages):
+        if "running summary" in messages[0].content:
+            return "Summary: the user is planning a site build."
+        prompts.append(messages)
+        return "Noted, tell me more about the site. " * 10
+
+    previous = get_llm()
+    set_llm(FakeChatModel(responses=[respond]))
+    try:
+        graph = build_agent("user")
+        config = {"configurable": {"thread_id": f"test:{uuid.uuid4().hex}"}}
+
+        async def run():
+            for n in range(8):
+                await graph.ainvoke({"messages": [("human", f"Turn {n}: we need scaffolding for block {n}. " * 4)]}, config)
+
+        asyncio.run(run())
+    finally:
+        set_llm(previous)
+
+    for prompt in prompts:
+        # The role's system message, then only the trimmed history (and summary) as separate messages
+        assert isinstance(prompt[0], SystemMessage) and "Rise Construction" in prompt[0].content
+        assert count_tokens_approximately(prompt[1:]) <= 300
+    last = prompts[-1]
+    assert isinstance(last[-1], HumanMessage) and last[-1].content.startswith("Turn 7:")
+    assert any("Summary of the earlier conversation" in message.content for message in last[1:])
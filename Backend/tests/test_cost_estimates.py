@@ -0,0 +1,98 @@
+from datetime import datetime
+import numpy as np
+import pytest
+from database.database import Session
+from database.models import ProjectHistory
+from services.cost_estimates import CostEstimator, _worker_group, _worker_groups, cost_estimator
+
+
+def _estimator():
+    # Leeds ran 20% over on every project at 1000 a day over 10 days; the rest ran 50% over
+    rows = [(i, 10000.0 / 1.2, 10000.0, "2024-01-01", "2024-01-10", "Leeds", 4) for i in range(1, 41)]
+    rows += [(i, 20000.0 / 1.5, 20000.0, "2024-02-01", "2024-02-05", "York", 16) for i in range(41, 51)]
+    estimator = CostEstimator()
+    estimator.load(rows)
+    return estimator
+
+
+def test_worker_groups_are_powers_of_two():
+    workers = [1, 2, 3, 4, 5, 8, 9, 100000]
+    assert [_worker_group(n) for n in workers] == [1, 2, 3, 3, 4, 4, 5, 16]
+    assert list(_worker_groups(np.array(workers))) == [1, 2, 3, 3, 4, 4, 5, 16]
+
+
+def test_budget_is_scaled_by_the_locations_overrun():
+    estimate = _estimator().estimate(initial_budget=50000, location="leeds city centre")
+
+    assert (estimate["basis"], estimate["location"], estimate["samples"]) == ("budget", "Leeds", 40)
+    assert estimate["estimate"] == pytest.approx(60000, rel=0.03)
+    assert estimate["low"] <= estimate["estimate"] <= estimate["high"]
+
+
+def test_thin_locations_fall_back_to_every_project():
+    estimate = _estimator().estimate(initial_budget=50000, location="York")
+
+    assert (estimate["location"], estimate["samples"]) == (None, 50)
+    assert 60000 * 0.97 <= estimate["estimate"] <= 75000 * 1.03
+
+
+def test_duration_and_crew_size_bases():
+    estimator = _estimator()
+
+    by_duration = estimator.estimate(location="Leeds", duration_days=20)
+    assert by_duration["basis"] == "duration"
+    assert by_duration["estimate"] == pytest.approx(20000, rel=0.03)
+
+    by_crew = estimator.estimate(location="Leeds", workers=3)
+    assert by_crew["basis"] == "workers"
+    assert by_crew["duration_days"]["median"] == pytest.approx(10, rel=0.03)
+    assert by_crew["estimate"] == pytest.approx(10000, rel=0.05)
+
+
+def test_an_estimate_needs_a_basis_and_history():
+    with pytest.raises(ValueError):
+        _estimator().estimate(location="Leeds")
+    empty = CostEstimator()
+    empty.load([])
+    with pytest.raises(ValueError):
+        empty.estimate(initial_budget=1000)
+
+
+def test_estimator_follows_committed_changes(client):
+    cost_estimator.load()
+    before = len(cost_estimator)
+    with Session() as db:
+        project = ProjectHistory(
+            initial_budget=1000.0, actual_cost=3000.0, location="Atlantis",
+            start_date=datetime(2024, 3, 1), completion_date=datetime(2024, 3, 3), workers_used=2,
+        )
+        db.add(project)
+        db.commit()
+        project_id = project.id
+
+    assert len(cost_estimator) == before + 1
+    assert cost_estimator.match_location("Atlantis") != 0
+    with Session() as db:
+        db.get(ProjectHistory, project_id).actual_cost = 6000.0
+        db.commit()
+    column_row = cost_estimator._columns.rows[project_id]
+    assert cost_estimator._columns.actual[column_row] == 6000.0
+
+    with Session() as db:
+        db.delete(db.get(ProjectHistory, project_id))
+        db.commit()
+    assert len(cost_estimator) == before
+
+
+def test_estimate_endpoint(client):
+    with Session() as db:
+        db.add(ProjectHistory(
+            initial_budget=1000.0, actual_cost=1100.0, location="Leeds",
+            start_date=datetime(2024, 3, 1), completion_date=datetime(2024, 3, 10), workers_used=4,
+        ))
+        db.commit()
+
+    response = client.get("/projects/estimate", params={"initial_budget": 1000})
+    assert response.status_code == 200
+    assert response.json()["basis"] == "budget"
+    assert client.get("/projects/estimate", params={"location": "Leeds"}).status_code == 400
@@ -0,0 +1,39 @@
+from database.database import Session as session_factory, pool_options, release_session, session
+from database.models import Project_Request
+
+
+def test_in_memory_sqlite_gets_no_pool_settings():
+    assert pool_options("sqlite://") == {}
+    assert pool_options("sqlite:///file.db")["pool_size"] > 0
+
+
+def test_release_session_returns_the_thread_session(app):
+    @release_session
+    def tool():
+        session.execute(Project_Request.__table__.select().limit(1))
+        assert session.registry.has()
+
+    tool()
+    assert not session.registry.has()
+
+
+def test_admin_routes_use_request_sessions(client):
+    response = client.get("/admin/projects")
+
+    assert response.status_code == 200
+    assert "projects" in response.json()
+
+
+def test_project_approve_and_cancel_routes(client):
+    with session_factory() as db:
+        project = Project_Request(title="Boundary wall", description="Rebuild the east wall")
+        db.add(project)
+        db.commit()
+        project_id = project.id
+
+    assert client.put(f"/admin/approve/{project_id}").status_code == 200
+    assert client.put(f"/admin/cancel/{project_id}").json() == {"message": "Project cancelled successfully"}
+    with session_factory() as db:
+        assert db.get(Project_Request, project_id).status == "cancelled"
+    assert client.put("/admin/approve/999999").status_code == 404
+    assert client.put("/admin/cancel/999999").status_code == 404
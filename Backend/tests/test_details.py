@@ -0,0 +1,74 @@
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from agent.tools import database as tools
+from agent.tools.query_cache import result_cache, sql_cache
+from agent.tools.sql_database import QueryResult, format_result, run_query
+from utils import get_llm, set_llm
+
+
+def test_format_result_is_compact_and_deterministic():
+    assert format_result(QueryResult(("count",), ((3,),))) == "count: 3"
+    assert format_result(QueryResult(("name",), ())) == "No matching records."
+    table = QueryResult(("name", "price", "available", "since"), (("Mini  digger", 120.5, True, datetime(2025, 1, 2)), ("Crane", None, False, None)))
+    assert format_result(table) == "name | price | available | since\nMini digger | 120.5 | yes | 2025-01-02\nCrane | - | no | -"
+
+
+def test_run_query_truncates_at_max_rows(app):
+    result = run_query("SELECT 1 AS n UNION ALL SELECT 2 UNION ALL SELECT 3", max_rows=2)
+    assert result.columns == ("n",) and result.rows == ((1,), (2,)) and result.truncated
+
+
+class _Models:
+    """Fake SQL-writing and answering models, counting the answer (synthesis) calls."""
+
+    def __init__(self, query):
+        self.query = query
+        self.answers = 0
+
+    def invoke(self, prompt):
+        self.answers += 1
+        return SimpleNamespace(content="summary")
+
+
+@pytest.fixture
+def models(monkeypatch):
+    models = _Models(None)
+    monkeypatch.setattr(tools, "structured_llm", lambda: SimpleNamespace(invoke=lambda prompt: {"query": models.query}))
+    previous = get_llm()
+    set_llm(models)
+    sql_cache.invalidate()
+    result_cache.invalidate()
+    yield models
+    set_llm(previous)
+
+
+def _call(question):
+    return tools.get_details.invoke({"name": "get_details", "args": {"question": question}, "id": "call-1", "type": "tool_call"})
+
+
+def test_small_results_skip_the_synthesis_call(models):
+    models.query = "SELECT 'Excavator' AS name, 120.0 AS price_per_day"
+    message = _call("price of the excavator")
+
+    assert message.content == "name | price_per_day\nExcavator | 120"
+    assert message.artifact == {"columns": ["name", "price_per_day"], "rows": [["Excavator", 120.0]], "truncated": False}
+    assert models.answers == 0
+
+
+def test_large_results_are_summarised(models):
+    models.query = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 30) SELECT i, i * 2 FROM n"
+    message = _call("list thirty numbers")
+
+    assert message.content == "summary"
+    assert len(message.artifact["rows"]) == 30
+    assert models.answers == 1
+
+
+def test_sql_errors_are_returned_without_a_model_call(models):
+    models.query = "SELECT nope FROM nowhere"
+    message = _call("a question with broken sql")
+
+    assert message.content.startswith("Error: ")
+    assert message.artifact is None and models.answers == 0
+    assert sql_cache.get(sql_cache.key("a question with broken sql")) is None
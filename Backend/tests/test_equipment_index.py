@@ -0,0 +1,63 @@
+from sqlalchemy.orm import load_only
+from database.database import Session
+from database.models import Equipment
+from services.equipment_index import EquipmentIndex, equipment_index
+
+
+def _index(*rows):
+    index = EquipmentIndex()
+    index.load([{"id": i, "description": None, "price_per_day": 100.0, "available": True, **row} for i, row in enumerate(rows, 1)])
+    return index
+
+
+def test_search_tolerates_typos_plurals_and_extra_words():
+    index = _index({"name": "Excavator"}, {"name": "Mini Excavator"}, {"name": "Concrete Mixer"})
+
+    assert index.search("excavaters")[0]["name"] == "Excavator"
+    assert index.search("JCB mini excavator")[0]["name"] == "Mini Excavator"
+    assert index.search("concret mixers")[0]["name"] == "Concrete Mixer"
+
+
+def test_units_of_one_name_are_grouped():
+    index = _index(
+        {"name": "Scaffold Tower", "price_per_day": 40.0, "available": False},
+        {"name": "scaffold tower", "price_per_day": 35.0},
+    )
+
+    [result] = index.search("scaffold tower")
+    assert (result["units"], result["available_units"], result["price_per_day"], result["id"]) == (2, 1, 35.0, 2)
+    assert index.search("scaffold", available_only=True)
+
+
+def test_match_is_confident_only_with_a_clear_winner():
+    index = _index({"name": "Excavator"}, {"name": "Plate Compactor"}, {"name": "Roller Compactor"})
+
+    best, _ = index.match("excavtor")
+    assert best["name"] == "Excavator"
+    best, candidates = index.match("compactor")
+    assert best is None
+    assert {candidate["name"] for candidate in candidates} == {"Plate Compactor", "Roller Compactor"}
+    assert index.match("helicopter") == (None, [])
+
+
+def test_index_follows_committed_changes(client):
+    equipment_index.ensure_loaded()
+    with Session() as db:
+        pump = Equipment(name="Putzmeister Concrete Pump", price_per_day=900.0)
+        db.add(pump)
+        db.commit()
+        pump_id = pump.id
+
+    assert client.get("/catalog/search", params={"q": "putzmeister pumps"}).json()["results"][0]["name"] == "Putzmeister Concrete Pump"
+
+    # A partial update still reports the unloaded name, so the unit stays under it
+    with Session() as db:
+        pump = db.query(Equipment).options(load_only(Equipment.price_per_day)).filter(Equipment.id == pump_id).one()
+        pump.price_per_day = 750.0
+        db.commit()
+    assert equipment_index.search("putzmeister pump")[0]["price_per_day"] == 750.0
+
+    with Session() as db:
+        db.delete(db.get(Equipment, pump_id))
+        db.commit()
+    assert all(result["name"] != "Putzmeister Concrete Pump" for result in equipment_index.search("putzmeister pump"))
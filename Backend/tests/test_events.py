@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy.orm import load_only
+from database import events
+from database.database import Session
+from database.models import Labour
+
+
+@pytest.fixture
+def published(app):
+    changes = []
+    events.on_commit(changes.extend)
+    yield changes
+    events._listeners.remove(changes.extend)
+
+
+def _add_worker(**fields):
+    with Session() as db:
+        worker = Labour(**{"name": "Ruwan", "skillset": "Mason", "hourly_rate": 15, **fields})
+        db.add(worker)
+        db.commit()
+        return worker.id
+
+
+def test_commit_bumps_versions_of_the_written_tables(published):
+    before = events.table_versions(("labours", "equipment"))
+    _add_worker()
+
+    assert events.table_versions(("labours", "equipment")) == (before[0] + 1, before[1])
+    assert [(change.op, change.table) for change in published] == [("insert", "labours")]
+
+
+def test_rollback_publishes_nothing(published):
+    before = events.table_version("labours")
+    with Session() as db:
+        db.add(Labour(name="Ajith", skillset="Welder", hourly_rate=12))
+        db.flush()
+        db.rollback()
+
+    assert events.table_version("labours") == before
+    assert published == []
+
+
+def test_partly_loaded_update_reports_every_column(published):
+    worker_id = _add_worker(name="Saman", skillset="Carpenter")
+    with Session() as db:
+        worker = db.query(Labour).options(load_only(Labour.hourly_rate)).filter_by(id=worker_id).one()
+        worker.hourly_rate = 18
+        db.commit()
+
+    change = published[-1]
+    assert change.op == "update"
+    assert change.values["name"] == "Saman" and change.values["skillset"] == "Carpenter"
+    assert change.values["hourly_rate"] == 18 and change.previous == {"hourly_rate": 15}
+
+
+def test_update_of_an_expired_object_is_published(published):
+    with Session() as db:
+        worker = Labour(name="Kamal", skillset="Roofer", hourly_rate=18)
+        db.add(worker)
+        db.commit()
+        # The commit expired the worker, so the new rate has no known old value
+        worker.hourly_rate = 20
+        db.commit()
+
+    assert published[-1].op == "update"
+    assert published[-1].values["hourly_rate"] == 20 and published[-1].values["skillset"] == "Roofer"
@@ -0,0 +1,130 @@
+from sqlalchemy.orm import load_only
+from database.database import Session
+from database.models import Labour
+from services.labour_index import LabourIndex, labour_index, normalize_skill, parse_skills
+
+
+def _index(*rows):
+    index = LabourIndex()
+    index.load([(i, name, skillset, rate, available) for i, (name, skillset, rate, available) in enumerate(rows, 1)])
+    return index
+
+
+def test_skills_are_normalized():
+    assert normalize_skill("Bricklayers") == "mason"
+    assert normalize_skill(" Electrical ") == "electrician"
+    assert parse_skills("Mason, Electrician & plumbing/Tiles") == {"mason", "electrician", "plumber", "tile"}
+    assert parse_skills(None) == frozenset()
+
+
+def test_find_ranks_by_coverage_then_rate():
+    index = _index(
+        ("Asha", "electrician", 30, True),
+        ("Bo", "Electrical, plumbing", 40, True),
+        ("Cy", "plumber", 20, True),
+        ("Di", "electrician, plumber", 35, False),
+    )
+
+    assert [worker["name"] for worker in index.find(["electrician"])] == ["Asha", "Bo"]
+    found = index.find(["electrician", "plumber"])
+    assert [(worker["name"], worker["coverage"]) for worker in found] == [("Bo", 1.0), ("Cy", 0.5), ("Asha", 0.5)]
+    assert [worker["name"] for worker in index.find(["electrician"], max_hourly_rate=35)] == ["Asha"]
+    assert index.find(["astronaut"]) == []
+
+
+def test_team_fills_the_scarcest_skill_first():
+    # Bo is the only crane operator; filling masons first would use them up
+    index = _index(
+        ("Asha", "mason", 25, True),
+        ("Bo", "mason, crane operator", 20, True),
+        ("Cy", "mason", 30, True),
+    )
+
+    team = index.assemble_team({"bricklayer": 2, "crane driver": 1})
+    assert {(worker["role"], worker["name"]) for worker in team["team"]} == {
+        ("crane operator", "Bo"), ("mason", "Asha"), ("mason", "Cy"),
+    }
+    assert (team["hourly_cost"], team["missing"], team["within_budget"]) == (75, {}, True)
+    assert index.assemble_team({"mason": 4})["missing"] == {"mason": 1}
+
+
+def test_index_follows_committed_changes(app):
+    labour_index.ensure_loaded()
+    with Session() as db:
+        worker = Labour(name="Nimal", skillset="Glazing, tiler", hourly_rate=20)
+        db.add(worker)
+        db.commit()
+        worker_id = worker.id
+
+    assert [worker["id"] for worker in labour_index.find(["glazier", "tiling"])] == [worker_id]
+
+    with Session() as db:
+        db.get(Labour, worker_id).available = False
+        db.commit()
+    assert labour_index.find(["glazier"]) == []
+
+    with Session() as db:
+        db.get(Labour, worker_id).available = True
+        db.commit()
+    with Session() as db:
+        db.delete(db.get(Labour, worker_id))
+        db.commit()
+    assert labour_index.find(["glazier"]) == []
+
+
+def test_updating_only_the_rate_keeps_the_worker_searchable(app):
+    labour_index.ensure_loaded()
+    with Session() as db:
+        worker = Labour(name="Sunil", skillset="scaffolding", hourly_rate=20)
+        db.add(worker)
+        db.commit()
+        # The commit expired the worker, so only hourly_rate is set on this update
+        worker.hourly_rate = 22
+        db.commit()
+        worker_id = worker.id
+    with Session() as db:
+        worker = db.query(Labour).options(load_only(Labour.hourly_rate)).filter_by(id=worker_id).one()
+        worker.hourly_rate = 24
+        db.commit()
+
+    found = labour_index.find(["scaffolder"])
+    assert [(worker["id"], worker["name"], worker["hourly_rate"]) for worker in found] == [(worker_id, "Sunil", 24)]
+
+
+def test_team_puts_multi_skilled_workers_where_they_save_most():
+    # Asha is the cheapest for both skills; she saves more as the plumber
+    index = _index(
+        ("Asha", "electrician, plumber", 10, True),
+        ("Bo", "electrician", 50, True),
+        ("Cy", "plumber", 100, True),
+        ("Di", "plumber", 100, True),
+    )
+
+    team = index.assemble_team({"electrician": 1, "plumber": 1}, budget_per_hour=80)
+    assert [(worker["role"], worker["name"]) for worker in team["team"]] == [("electrician", "Bo"), ("plumber", "Asha")]
+    assert (team["hourly_cost"], team["within_budget"]) == (60, True)
+
+
+def test_team_over_budget_reports_the_requirements_that_cannot_fit(monkeypatch):
+    from agent.tools import database as tools
+
+    index = _index(
+        ("Asha", "mason", 30, True),
+        ("Bo", "mason", 30, True),
+        ("Cy", "mason", 30, True),
+        ("Di", "carpenter", 20, True),
+    )
+
+    team = index.assemble_team({"mason": 3, "carpenter": 1}, budget_per_hour=100)
+    assert (team["hourly_cost"], team["cost_by_role"], team["within_budget"], team["unaffordable"]) == (
+        110, {"mason": 90, "carpenter": 20}, False, [],
+    )
+    assert index.assemble_team({"mason": 3, "carpenter": 1}, budget_per_hour=80)["unaffordable"] == ["mason"]
+
+    monkeypatch.setattr(tools, "labour_index", index)
+    reply = tools.find_labour.invoke({
+        "skills": [{"skill": "mason", "count": 3}, {"skill": "carpenter", "count": 1}],
+        "team_budget_per_hour": 80, "assemble_team": True,
+    })
+    assert "the cheapest is 30 over (mason 90, carpenter 20)" in reply
+    assert "alone cost more than the budget: mason." in reply
@@ -0,0 +1,80 @@
+import json
+import uuid
+from datetime import datetime
+import pytest
+from database.database import Session
+from database.models import Project_Request
+
+
+@pytest.fixture
+def projects(app):
+    """Nine projects sharing a unique status, with start dates out of id order and two without one."""
+    status = f"listing-{uuid.uuid4().hex[:8]}"
+    days = [5, 3, None, 3, 9, 1, None, 7, 2]
+    with Session() as db:
+        rows = [Project_Request(title=f"Site {i}", description="x" * 50, status=status, start_date=day and datetime(2030, 1, day))
+                for i, day in enumerate(days)]
+        db.add_all(rows)
+        db.commit()
+        return status, [(row.start_date, row.id) for row in rows]
+
+
+def _walk(client, **params):
+    items, cursor = [], None
+    while True:
+        page = client.get("/admin/projects", params={**params, **({"cursor": cursor} if cursor else {})}).json()
+        items += page["projects"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_cursor_walks_every_row_once(client, projects):
+    status, rows = projects
+    items = _walk(client, status=status, limit=3)
+
+    assert [item["id"] for item in items] == sorted(row_id for _, row_id in rows)
+    assert "description" not in items[0]
+
+
+def test_start_date_order_breaks_ties_on_id_and_lists_undated_rows_last(client, projects):
+    status, rows = projects
+    expected = [row_id for start, row_id in sorted(rows, key=lambda row: (row[0] is None, row[0] or datetime.min, row[1]))]
+
+    for limit in (1, 2, 4):
+        items = _walk(client, status=status, limit=limit, sort="start_date")
+        assert [item["id"] for item in items] == expected
+    assert [item["start_date"] for item in items][-2:] == [None, None]
+
+
+def test_filters_and_projection(client, projects):
+    status, rows = projects
+    page = client.get("/admin/projects", params={
+        "status": status, "start_date_from": "2030-01-03T00:00:00", "start_date_to": "2030-01-07T00:00:00", "fields": "id,description",
+    }).json()
+
+    assert len(page["projects"]) == 4
+    assert set(page["projects"][0]) == {"id", "description"}
+
+
+def test_ndjson_export_streams_every_row(client, projects):
+    status, rows = projects
+    response = client.get("/admin/projects", params={"status": status, "format": "ndjson", "fields": "id"})
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == sorted(row_id for _, row_id in rows)
+
+
+@pytest.mark.parametrize("params", [
+    {"cursor": "not-a-cursor"},
+    {"fields": "id,password"},
+    {"sort": "title"},
+])
+def test_bad_parameters_are_refused(client, params):
+    assert client.get("/admin/projects", params=params).status_code == 400
+
+
+def test_cursor_is_tied_to_its_sort(client, projects):
+    status, _ = projects
+    cursor = client.get("/admin/projects", params={"status": status, "limit": 2}).json()["next_cursor"]
+    assert client.get("/admin/projects", params={"status": status, "sort": "start_date", "cursor": cursor}).status_code == 400
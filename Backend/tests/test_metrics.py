@@ -0,0 +1,32 @@
+from utils.metrics import NODE_DURATION, Histogram
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_wait_seconds", "Test histogram", ["queue"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, queue='a"b')
+
+    lines = histogram.render()
+    assert 'test_wait_seconds_bucket{queue="a\\"b",le="0.1"} 1' in lines
+    assert 'test_wait_seconds_bucket{queue="a\\"b",le="1.0"} 3' in lines
+    assert 'test_wait_seconds_bucket{queue="a\\"b",le="+Inf"} 4' in lines
+    assert 'test_wait_seconds_count{queue="a\\"b"} 4' in lines
+
+
+def test_requests_are_traced_by_route_template(client):
+    response = client.get("/admin/projects", headers={"X-Request-ID": "trace-admin-1"})
+
+    assert response.headers["X-Trace-Id"] == "trace-admin-1"
+    [trace] = client.get("/metrics/traces", params={"trace_id": "trace-admin-1"}).json()["traces"]
+    assert trace["route"] == "/admin/projects" and trace["status"] == 200
+    assert trace["sql_statements"] >= 1
+    assert 'http_request_duration_seconds_count{method="GET",route="/admin/projects",status="200"}' in client.get("/metrics").text
+
+
+def test_chat_turns_record_llm_and_node_time(client, scripted_llm):
+    agent_runs = NODE_DURATION.count(node="agent")
+    client.post("/chat/", json={"message": "Hello there"}, headers={"X-Request-ID": "trace-chat-1"})
+
+    [trace] = client.get("/metrics/traces", params={"trace_id": "trace-chat-1"}).json()["traces"]
+    assert trace["llm_calls"] == 1
+    assert NODE_DURATION.count(node="agent") == agent_runs + 1
@@ -0,0 +1,82 @@
+import time
+from types import SimpleNamespace
+import pytest
+from agent.tools import database as tools
+from agent.tools.query_cache import normalize_question, result_cache, sql_cache
+from utils import get_llm, set_llm
+from utils.cache import LRUCache
+
+
+class _FakeSQLModel:
+    """Stands in for the structured-output LLM; records the questions it wrote SQL for."""
+
+    def __init__(self, query):
+        self.query = query
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return {"query": self.query}
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    sql_model = _FakeSQLModel("SELECT name, price_per_day FROM equipment")
+    monkeypatch.setattr(tools, "structured_llm", lambda: sql_model)
+    previous = get_llm()
+    set_llm(SimpleNamespace(invoke=lambda prompt: SimpleNamespace(content="answer")))
+    sql_cache.invalidate()
+    yield sql_model
+    set_llm(previous)
+
+
+def test_rewordings_normalize_to_the_same_question():
+    assert normalize_question("What are the Equipments available?") == normalize_question("show me all equipment available")
+    assert normalize_question("Give me five labours") == normalize_question("list 5 labour")
+    assert normalize_question("equipment not available") != normalize_question("equipment available")
+
+
+def test_lru_cache_evicts_oldest_and_expires():
+    cache = LRUCache(maxsize=2, ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+
+def test_repeated_question_reuses_generated_sql(app, fake_llm):
+    tools.get_details.invoke({"question": "What equipment is available?"})
+    tools.get_details.invoke({"question": "what equipments are available"})
+
+    assert fake_llm.calls == 1
+
+
+def test_sql_that_fails_is_not_cached(app, fake_llm):
+    fake_llm.query = "SELECT missing_column FROM equipment"
+    tools.get_details.invoke({"question": "Which machines are broken?"})
+    tools.get_details.invoke({"question": "Which machines are broken?"})
+
+    assert fake_llm.calls == 2
+
+
+def test_results_are_reused_until_their_tables_change(app, fake_llm):
+    result_cache.invalidate()
+    ask = lambda: tools.get_details.invoke({"question": "What equipment is available?"})
+    ask()
+    hits = result_cache.stats()["hits"]
+
+    ask()
+    assert result_cache.stats()["hits"] == hits + 1
+
+    tools.add_new_equipment.invoke({"equipment_name": "Jack hammer", "description": "Electric breaker", "price_per_day": 30})
+    ask()
+    assert result_cache.stats()["hits"] == hits + 1
+
+
+def test_writes_and_unknown_tables_are_not_cached():
+    assert result_cache.key("DELETE FROM equipment") is None
+    assert result_cache.key("SELECT 1") is None
+    assert result_cache.key("SELECT name FROM equipment") is not None
@@ -0,0 +1,66 @@
+import asyncio
+import json
+import pytest
+from agent.router import router
+from database.database import Session
+from database.models import Equipment, Labour
+
+
+def _route(message):
+    return asyncio.run(router.route(message))
+
+
+@pytest.mark.parametrize("message", [
+    "What is the status of project 12?",
+    "project 7 status",
+    "Has project 3 been approved yet?",
+    "Check the status of project number 4",
+])
+def test_project_status_questions_use_fast_path(app, message):
+    assert _route(message) is not None
+
+
+@pytest.mark.parametrize("message", [
+    "Mark project 12 as approved",
+    "Set the status of project 9 to cancelled",
+    "remove project 5 if it was rejected",
+    "Approve project 4, its status is pending",
+    "Reject project 8 and update its status",
+    "Cancel project 6, what is its status?",
+])
+def test_project_actions_fall_through_to_agent(app, message):
+    assert _route(message) is None
+
+
+def test_price_questions_follow_catalog_changes(app):
+    with Session() as db:
+        db.add(Equipment(name="Wacker Plate", price_per_day=45.0))
+        db.commit()
+
+    answer = _route("How much is the wacker plate per day?")
+    assert answer is not None and "Wacker Plate: 45.00 per day" in answer
+
+
+def test_labour_rates_are_summarised(app):
+    with Session() as db:
+        db.add_all([Labour(name="Ann", skillset="Tiler", hourly_rate=20), Labour(name="Raj", skillset="Tiler, Mason", hourly_rate=30)])
+        db.commit()
+
+    answer = _route("What is the hourly rate of a tiler?")
+    assert "2 tiler worker(s)" in answer and "20.00 to 30.00" in answer
+
+
+def test_open_questions_go_to_the_agent(app):
+    assert _route("Which excavator would suit a narrow urban site?") is None
+
+
+def test_streamed_fast_path_answers_report_the_conversation_id(client):
+    with Session() as db:
+        db.add(Equipment(name="Laser Level", price_per_day=30.0))
+        db.commit()
+
+    response = client.post("/chat/stream", json={"message": "How much is the laser level per day?"})
+    event, data = response.text.strip().split("\n\n")[-1].split("\n", 1)
+    done = json.loads(data.removeprefix("data: "))
+    assert event == "event: done"
+    assert "Laser Level: 30.00 per day" in done["response"] and done["conversation_id"]
@@ -0,0 +1,193 @@
+import asyncio
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.prompt_values import ChatPromptValue
+from utils.config import _prompt_digest
+from utils.singleflight import SingleFlight
+
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight("test-threads")
+    calls = []
+
+    def slow(value):
+        calls.append(value)
+        time.sleep(0.1)
+        return value * 2
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: flight.do("key", slow, 21), range(8)))
+
+    assert results == [42] * 8
+    assert len(calls) == 1
+    # Nothing is cached once the call is over
+    flight.do("key", slow, 1)
+    assert len(calls) == 2
+
+
+def test_a_failure_is_shared_only_by_waiting_callers():
+    flight = SingleFlight("test-failure")
+    started = threading.Event()
+    attempts = []
+
+    def failing():
+        attempts.append(1)
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("provider down")
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "key", failing)
+        started.wait()
+        follower = pool.submit(flight.do, "key", failing)
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError):
+                future.result()
+
+    assert len(attempts) == 1
+    assert flight.do("key", lambda: "recovered") == "recovered"
+
+
+def test_coroutines_share_one_call_and_none_keys_do_not():
+    flight = SingleFlight("test-async")
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value
+
+    async def run():
+        shared = await asyncio.gather(*(flight.ado("key", fetch, "a") for _ in range(5)))
+        alone = await asyncio.gather(*(flight.ado(None, fetch, "b") for _ in range(2)))
+        return shared, alone
+
+    shared, alone = asyncio.run(run())
+    assert shared == ["a"] * 5 and alone == ["b"] * 2
+    assert calls == ["a", "b", "b"]
+
+
+def test_call_is_cancelled_only_when_nobody_waits():
+    flight = SingleFlight("test-cancel")
+    finished = []
+
+    async def fetch():
+        await asyncio.sleep(0.1)
+        finished.append(1)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flight.ado("key", fetch))
+        second = asyncio.ensure_future(flight.ado("key", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "done"
+
+        lone = asyncio.ensure_future(flight.ado("other", fetch))
+        await asyncio.sleep(0.01)
+        lone.cancel()
+        await asyncio.sleep(0.15)
+
+    asyncio.run(run())
+    assert finished == [1]
+
+
+def test_prompts_differing_only_in_tool_calls_are_not_coalesced():
+    def prompt(args):
+        call = {"name": "get_details", "args": args, "id": "call-1"}
+        return ChatPromptValue(messages=[HumanMessage("price?"), AIMessage("", tool_calls=[call])])
+
+    assert _prompt_digest(prompt({"question": "excavator"})) != _prompt_digest(prompt({"question": "crane"}))
+    assert _prompt_digest(prompt({"question": "crane"})) == _prompt_digest(prompt({"question": "crane"}))
+
+
+def _slow_chat_model(calls, reply):
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+
+    class SlowChatModel(GenericFakeChatModel):
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+        def _generate(self, *args, **kwargs):
+            calls.append(1)
+            time.sleep(0.2)
+            return super()._generate(*args, **kwargs)
+
+    return SlowChatModel(messages=itertools.repeat(reply))
+
+
+def _run_with_model(model, *turns):
+    from utils import get_llm, set_llm
+
+    async def run():
+        return await asyncio.gather(*turns)
+
+    previous = get_llm()
+    set_llm(model)
+    try:
+        return asyncio.run(run())
+    finally:
+        set_llm(previous)
+
+
+def test_agent_turns_with_the_same_prompt_share_one_model_call(app):
+    from agent.agent import get_chat_response
+    from schema import ChatRequest
+
+    calls = []
+    model = _slow_chat_model(calls, "All quiet on site.")
+    replies = _run_with_model(model, *(
+        get_chat_response(ChatRequest(message="Summarise the site diary for me", user_id=user_id))
+        for user_id in ("flight-a", "flight-b")
+    ))
+
+    assert replies == ["All quiet on site."] * 2
+    assert len(calls) == 1
+
+
+def test_streams_sharing_a_model_call_both_get_the_reply(app):
+    from agent.agent import stream_chat_response
+    from schema import ChatRequest
+
+    async def events(user_id):
+        request = ChatRequest(message="Summarise the site diary for me", user_id=user_id)
+        return [event async for event in stream_chat_response(request)]
+
+    calls = []
+    model = _slow_chat_model(calls, "All quiet on site.")
+    streams = _run_with_model(model, events("stream-a"), events("stream-b"))
+
+    assert len(calls) == 1
+    for stream in streams:
+        assert "".join(data["content"] for kind, data in stream if kind == "token") == "All quiet on site."
+        assert stream[-1][1]["response"] == "All quiet on site."
+
+
+def test_get_details_coalesces_on_the_sql_not_the_question(app, monkeypatch):
+    from types import SimpleNamespace
+    from agent.tools import database as tools
+    from agent.tools.query_cache import result_cache
+
+    runs = []
+    run_query = tools.run_query
+
+    def slow_run_query(sql):
+        runs.append(sql)
+        time.sleep(0.2)
+        return run_query(sql)
+
+    sql_model = SimpleNamespace(invoke=lambda prompt: {"query": "SELECT name FROM equipment"})
+    monkeypatch.setattr(tools, "structured_llm", lambda: sql_model)
+    monkeypatch.setattr(tools, "run_query", slow_run_query)
+    result_cache.invalidate()
+
+    questions = ["Which machines do we own?", "Name every piece of equipment"]
+    with ThreadPoolExecutor(2) as pool:
+        results = list(pool.map(lambda question: tools.get_details.invoke({"question": question}), questions))
+
+    assert len(runs) == 1
+    assert results[0] == results[1]
@@ -0,0 +1,40 @@
+from agent.tools import sql_database
+from agent.tools.database import add_new_equipment
+from agent.tools.sql_database import get_db, get_table_info, invalidate_schema_cache
+
+
+def _count_renders(monkeypatch):
+    renders = []
+    render = get_db().get_table_info
+    monkeypatch.setattr(get_db(), "get_table_info", lambda *args, **kwargs: renders.append(1) or render(*args, **kwargs))
+    return renders
+
+
+def test_database_handle_is_reused(app):
+    assert get_db() is get_db()
+
+
+def test_table_info_is_rendered_once(app, monkeypatch):
+    invalidate_schema_cache()
+    renders = _count_renders(monkeypatch)
+
+    first = get_table_info()
+    assert get_table_info() is first
+    assert len(renders) == 1
+
+
+def test_write_tools_refresh_the_table_info(app, monkeypatch):
+    before = get_table_info()
+    renders = _count_renders(monkeypatch)
+
+    add_new_equipment.invoke({"equipment_name": "Cement mixer", "description": "350 litre drum", "price_per_day": 25})
+
+    assert get_table_info() is not before
+    assert len(renders) == 1
+
+
+def test_reflect_drops_the_database_handle(app):
+    db = get_db()
+    invalidate_schema_cache(reflect=True)
+    assert sql_database._db is None
+    assert get_db() is not db
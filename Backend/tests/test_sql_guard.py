@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+from agent.tools import sql_guard
+from agent.tools.sql_database import get_db
+from agent.tools.sql_guard import QueryRejected, guard_query, statement_timed_out
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT email, password FROM users",
+    'SELECT * FROM "users" LIMIT 5',
+    "SELECT jti FROM public.tokens",
+    "SELECT e.name FROM equipment e JOIN users u ON u.id = e.id",
+    "WITH u AS (SELECT password FROM Users) SELECT * FROM u",
+    "SELECT name FROM equipment WHERE id IN (SELECT user_id FROM tokens)",
+])
+def test_credential_tables_are_rejected(sql):
+    with pytest.raises(QueryRejected) as error:
+        guard_query(sql, 50)
+    assert error.value.kind == "hidden_table"
+
+
+def test_catalog_tables_are_allowed():
+    assert guard_query("SELECT name, price_per_day FROM equipment", 50) == "SELECT name, price_per_day FROM equipment LIMIT 51"
+
+
+def test_credential_tables_are_left_out_of_the_schema(app):
+    tables = set(get_db().get_usable_table_names())
+    assert "equipment" in tables
+    assert not tables & {"users", "tokens", "chat_threads"}
+
+
+@pytest.mark.parametrize("sql, kind", [
+    ("DELETE FROM equipment", "not_select"),
+    ("SELECT 1; DROP TABLE equipment", "multiple_statements"),
+    ("WITH gone AS (DELETE FROM equipment RETURNING id) SELECT * FROM gone", "write"),
+    ("SELECT * FROM equipment FOR UPDATE", "write"),
+    ("SELECT pg_sleep(10)", "denied_function"),
+    ("SELECT name FROM sqlite_master", "system_catalog"),
+    ("SELECT 'unterminated FROM equipment", "syntax"),
+    ("", "syntax"),
+])
+def test_unsafe_queries_are_rejected(sql, kind):
+    with pytest.raises(QueryRejected) as error:
+        guard_query(sql, 50)
+    assert error.value.kind == kind
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT name FROM equipment;", "SELECT name FROM equipment LIMIT 51"),
+    ("SELECT name FROM equipment LIMIT 10", "SELECT name FROM equipment LIMIT 10"),
+    ("SELECT name FROM equipment LIMIT 1000 OFFSET 5", "SELECT name FROM equipment LIMIT 51 OFFSET 5"),
+    ("SELECT name FROM equipment WHERE id IN (SELECT id FROM equipment LIMIT 900)",
+     "SELECT name FROM equipment WHERE id IN (SELECT id FROM equipment LIMIT 900) LIMIT 51"),
+    ("SELECT name FROM equipment FETCH FIRST 500 ROWS ONLY",
+     "SELECT * FROM (SELECT name FROM equipment FETCH FIRST 500 ROWS ONLY) AS limited LIMIT 51"),
+])
+def test_result_size_is_capped(sql, expected):
+    assert guard_query(sql, 50) == expected
+
+
+def test_expensive_plans_are_rejected(monkeypatch):
+    class Connection:
+        dialect = type("Dialect", (), {"name": "postgresql"})
+
+        def execute(self, statement):
+            plan = [{"Plan": {"Total Cost": 5e6, "Plan Rows": 10, "Plans": [{"Plan Rows": 2e7}]}}]
+            return type("Result", (), {"scalar": lambda self: plan})()
+
+    with pytest.raises(QueryRejected) as error:
+        sql_guard.check_plan(Connection(), "SELECT * FROM equipment")
+    assert error.value.kind == "cost"
+    monkeypatch.setattr(sql_guard, "SQL_MAX_COST", 1e7)
+    monkeypatch.setattr(sql_guard, "SQL_MAX_PLAN_ROWS", 1e8)
+    sql_guard.check_plan(Connection(), "SELECT * FROM equipment")
+
+
+def test_statement_timeouts_are_recognised():
+    assert statement_timed_out(SimpleNamespace(orig=SimpleNamespace(pgcode="57014")))
+    assert statement_timed_out(SimpleNamespace(orig=SimpleNamespace(args=(3024, "max_execution_time exceeded"))))
+    assert statement_timed_out(SimpleNamespace(orig=Exception("interrupted")))
+    assert not statement_timed_out(SimpleNamespace(orig=Exception("no such column: nme")))
@@ -1,2 +1,9 @@
-from .config import llm, State, config
-from .auth import hash_pass, verify_password
+from .config import State, config, get_llm, set_llm, invoke_llm
+from .auth import hash_pass, verify_password, ahash_pass, averify_and_update, HashingOverloaded
+
+
+def __getattr__(name):
+    # `from utils import llm` builds the chat model on first access, see get_llm
+    if name == "llm":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
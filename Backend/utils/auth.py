@@ -1,8 +1,47 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 
 
+# bcrypt cost factor. Hashes made with a different cost are upgraded on the next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Threads hashing passwords; bcrypt releases the GIL, so these run in parallel with the event loop
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hash jobs allowed to wait for a worker before new ones are refused
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "32"))
+# Seconds a refused client is told to wait before retrying
+HASH_RETRY_AFTER = int(os.getenv("HASH_RETRY_AFTER", "1"))
+# Niceness added to the hashing threads, so the scheduler favours the event loop when CPUs are contended
+HASH_THREAD_NICENESS = int(os.getenv("HASH_THREAD_NICENESS", "10"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    # Pinning the accepted range to the configured cost makes verify_and_update rehash
+    # passwords whose cost differs, whether it was raised or lowered
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+def _lower_priority():
+    # On Linux a thread id is a valid PRIO_PROCESS target and only that thread changes
+    if HASH_THREAD_NICENESS and hasattr(os, "setpriority") and hasattr(threading, "get_native_id"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), os.getpriority(os.PRIO_PROCESS, 0) + HASH_THREAD_NICENESS)
+        except OSError:
+            pass
+
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt", initializer=_lower_priority)
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+class HashingOverloaded(Exception):
+    """Raised when the password hashing queue is full; the caller should retry later."""
 
 
 def hash_pass(password:str):
@@ -10,4 +49,50 @@ def hash_pass(password:str):
 
 
 def verify_password(plain_password, hashed_password):
-        return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+        return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update(plain_password, hashed_password):
+    """Returns (valid, new_hash); new_hash is set when the stored hash should be replaced."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def _release(_):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+async def _offload(func, *args):
+    """
+    Runs a hashing function on the bcrypt pool without blocking the event loop.
+
+    Jobs are counted from submission until they finish (even if the awaiting request
+    goes away), and once HASH_WORKERS + HASH_QUEUE_LIMIT are outstanding new ones are
+    refused with HashingOverloaded instead of queueing without bound.
+    """
+    global _pending
+    with _pending_lock:
+        if _pending >= HASH_WORKERS + HASH_QUEUE_LIMIT:
+            raise HashingOverloaded()
+        _pending += 1
+    try:
+        future = _executor.submit(func, *args)
+    except BaseException:
+        _release(None)
+        raise
+    future.add_done_callback(_release)
+    return await asyncio.wrap_future(future)
+
+
+async def ahash_pass(password: str) -> str:
+    return await _offload(hash_pass, password)
+
+
+async def averify_and_update(plain_password, hashed_password):
+    """Async verify_and_update, run on the bcrypt pool."""
+    return await _offload(verify_and_update, plain_password, hashed_password)
+
+
+def hashing_stats() -> dict:
+    return {"workers": HASH_WORKERS, "queue_limit": HASH_QUEUE_LIMIT, "pending": _pending}
@@ -1,23 +1,97 @@
+import hashlib
+import os
+import threading
 from dotenv import load_dotenv
 from typing_extensions import TypedDict, Annotated
 from langgraph.graph.message import add_messages
-from langchain_openai.chat_models import ChatOpenAI
+from utils.singleflight import SingleFlight
 
 
 load_dotenv()
 
 
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0.7,
-)
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    """
+    Returns the chat model used across the app.
+
+    The OpenAI client is built on first use, so importing the app doesn't pay for the
+    langchain_openai/openai imports; the startup warm-up normally triggers it.
+    """
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                from langchain_openai.chat_models import ChatOpenAI
+                _llm = ChatOpenAI(
+                    model="gpt-4o-mini",
+                    temperature=0.7,
+                )
+    return _llm
+
+
+def set_llm(model):
+    """Replaces the chat model used across the app, e.g. with utils.fake_llm.FakeChatModel for offline runs."""
+    global _llm
+    _llm = model
+
+
+def __getattr__(name):
+    # `llm` used to be a module attribute built at import time; keep it readable
+    if name == "llm":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_llm_flight = SingleFlight("llm")
+
+
+def _prompt_digest(prompt) -> str:
+    """Hashes a prompt string or prompt value, including the tool calls of its messages (but not their ids)."""
+    if isinstance(prompt, str):
+        text = prompt
+    else:
+        text = repr([
+            (message.type, message.content, [(call["name"], call["args"]) for call in getattr(message, "tool_calls", [])])
+            for message in prompt.to_messages()
+        ])
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def invoke_llm(prompt, model=None):
+    """
+    Invokes the chat model (or a runnable built from it, such as a structured-output
+    wrapper or a model with tools bound) with the prompt. Identical prompts sent to the
+    same model at the same time share one provider call.
+    """
+    model = model or get_llm()
+    return _llm_flight.do((id(model), _prompt_digest(prompt)), model.invoke, prompt)
 
 
 class State(TypedDict):
     messages: Annotated[list, add_messages]
     name: str
+    summary: str  # running summary of the turns trimmed from messages, see agent.context
 
 
 config={"configurable": {"thread_id": "2"}}
 
 
+# Question -> generated SQL cache used by get_details
+SQL_CACHE_SIZE = int(os.getenv("SQL_CACHE_SIZE", "512"))
+SQL_CACHE_TTL = float(os.getenv("SQL_CACHE_TTL", "3600"))
+
+# SQL result cache used by get_details, invalidated through per-table versions. The TTL
+# only bounds staleness from writes made by other worker processes.
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "300"))
+
+# get_details returns results up to this many cells (rows x columns) as a compact table;
+# larger ones, or ones with long text, are summarised by an extra LLM call
+DETAILS_SYNTHESIS_CELLS = int(os.getenv("DETAILS_SYNTHESIS_CELLS", "40"))
+DETAILS_SYNTHESIS_TEXT = int(os.getenv("DETAILS_SYNTHESIS_TEXT", "300"))
+# Rows of a get_details query kept in its result
+DETAILS_MAX_ROWS = int(os.getenv("DETAILS_MAX_ROWS", "100"))
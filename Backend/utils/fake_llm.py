@@ -0,0 +1,122 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+from typing import Any, Callable, List, Union
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import PrivateAttr
+
+
+Response = Union[str, AIMessage, Callable[[List[BaseMessage]], Union[str, AIMessage]]]
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic chat model for offline runs and benchmarks.
+
+    Swap it in with `utils.set_llm(FakeChatModel(...))`.
+
+    Args:
+        responses: Replies returned in order (cycling when exhausted). Each is a string,
+            an AIMessage (e.g. carrying tool_calls) or a callable receiving the prompt
+            messages. With no responses the model echoes the last message.
+        structured_responses: Dicts returned in order by `with_structured_output(...)`.
+        latency: Seconds each call sleeps before answering, to mimic a provider.
+    """
+
+    responses: List[Any] = []
+    structured_responses: List[Any] = []
+    latency: float = 0.0
+
+    _responses = PrivateAttr(default=None)
+    _structured = PrivateAttr(default=None)
+    _lock = PrivateAttr(default_factory=threading.Lock)
+    _calls = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def calls(self) -> int:
+        """Number of model calls made so far, including structured-output calls."""
+        return self._calls
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def with_structured_output(self, schema, **kwargs):
+        def respond(prompt):
+            self._sleep()
+            with self._lock:
+                self._calls += 1
+                if self._structured is None:
+                    self._structured = itertools.cycle(self.structured_responses or [{}])
+                response = next(self._structured)
+            return response(prompt) if callable(response) else response
+
+        return RunnableLambda(respond)
+
+    def _sleep(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _next_message(self, messages) -> AIMessage:
+        with self._lock:
+            self._calls += 1
+            if self._responses is None:
+                self._responses = itertools.cycle(self.responses) if self.responses else None
+            response = next(self._responses) if self._responses is not None else None
+
+        if response is None:
+            last = messages[-1].content if messages else ""
+            response = f"Echo: {last}"
+        elif callable(response):
+            response = response(messages)
+        message = response if isinstance(response, AIMessage) else AIMessage(content=response)
+
+        input_tokens = count_tokens_approximately(messages)
+        output_tokens = count_tokens_approximately([message])
+        return message.model_copy(update={"usage_metadata": {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._sleep()
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._sleep()
+        message = self._next_message(messages)
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=message.content,
+                tool_call_chunks=[
+                    {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                    for index, call in enumerate(message.tool_calls)
+                ],
+                usage_metadata=message.usage_metadata,
+            ))
+            return
+        words = message.content.split(" ")
+        for index, word in enumerate(words):
+            last = index == len(words) - 1
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=word if last else word + " ",
+                usage_metadata=message.usage_metadata if last else None,
+            ))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
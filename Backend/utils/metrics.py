@@ -0,0 +1,343 @@
+import bisect
+import contextvars
+import threading
+import time
+import uuid
+from collections import deque
+from langchain_core.callbacks import BaseCallbackHandler
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Completed request traces kept for /metrics/traces
+RECENT_TRACES = 200
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value) -> list:
+        return [f"{self.name}{_labels(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, e.g. LLM tokens used."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, e.g. requests in flight."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their count and sum."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # Per-bucket counts (the last one is +Inf), then the sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def count(self, **labels) -> int:
+        counts = self._values.get(self._key(labels))
+        return sum(counts[:-1]) if counts else 0
+
+    def _samples(self, key, counts) -> list:
+        samples, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = 'le="%s"' % ("+Inf" if bound == float("inf") else repr(bound))
+            samples.append(f"{self.name}_bucket{_labels(self.labelnames, key, [le])} {cumulative}")
+        samples.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        samples.append(f"{self.name}_sum{_labels(self.labelnames, key)} {counts[-1]}")
+        return samples
+
+
+def render() -> str:
+    """Returns every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_DURATION = Histogram("http_request_duration_seconds", "Time to handle an HTTP request", ["method", "route", "status"])
+NODE_DURATION = Histogram("graph_node_duration_seconds", "Time spent in an agent graph node", ["node"])
+TOOL_DURATION = Histogram("tool_duration_seconds", "Time spent in an agent tool call", ["tool", "status"])
+LLM_DURATION = Histogram("llm_request_duration_seconds", "Time of an LLM call, by the graph node that made it", ["node"])
+LLM_TOKENS = Counter("llm_tokens_total", "LLM tokens used, by the graph node that made the call", ["node", "type"])
+SQL_DURATION = Histogram("sql_statement_duration_seconds", "Time to execute a SQL statement", ["operation"], buckets=SQL_BUCKETS)
+
+
+class Trace:
+    """What one request spent its time on. Updated from worker threads too, hence the lock."""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.route = None
+        self.status = None
+        self.duration = 0.0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self.llm_tokens = 0
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.tools = []
+        self._lock = threading.Lock()
+
+    def add_llm(self, seconds: float, tokens: int):
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+            self.llm_tokens += tokens
+
+    def add_sql(self, seconds: float):
+        with self._lock:
+            self.sql_statements += 1
+            self.sql_seconds += seconds
+
+    def add_tool(self, name: str, seconds: float):
+        with self._lock:
+            self.tools.append((name, seconds))
+
+    def as_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "route": self.route,
+            "status": self.status,
+            "duration_ms": round(self.duration * 1000, 2),
+            "llm_calls": self.llm_calls,
+            "llm_ms": round(self.llm_seconds * 1000, 2),
+            "llm_tokens": self.llm_tokens,
+            "sql_statements": self.sql_statements,
+            "sql_ms": round(self.sql_seconds * 1000, 2),
+            "tools": [{"name": name, "ms": round(seconds * 1000, 2)} for name, seconds in self.tools],
+        }
+
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+_recent = deque(maxlen=RECENT_TRACES)
+
+
+def current_trace():
+    """Returns the Trace of the request being handled, or None outside a request."""
+    return _current_trace.get()
+
+
+def trace_id() -> str:
+    """Returns the current request's trace id, or "-" outside a request (for log lines)."""
+    trace = _current_trace.get()
+    return trace.trace_id if trace else "-"
+
+
+def recent_traces(trace_id: str = None) -> list:
+    traces = list(_recent)
+    if trace_id:
+        traces = [trace for trace in traces if trace.trace_id == trace_id]
+    return [trace.as_dict() for trace in reversed(traces)]
+
+
+class TraceMiddleware:
+    """
+    ASGI middleware giving every HTTP request a trace id (the client's X-Request-ID, or a
+    new one) that is echoed in the X-Trace-Id response header. It records the request
+    duration by route template, and the LLM, tool and SQL time collected on the trace.
+    For streaming responses the duration runs until the stream ends.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:64]
+        trace = Trace(request_id or uuid.uuid4().hex)
+        token = _current_trace.set(trace)
+        status = 500
+
+        async def send_with_trace_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", trace.trace_id.encode("latin-1"))]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        finally:
+            trace.duration = time.perf_counter() - started
+            # The template, not the raw path, so ids in URLs don't create a series each
+            trace.route = getattr(scope.get("route"), "path", "unmatched")
+            trace.status = status
+            REQUEST_DURATION.observe(trace.duration, method=scope["method"], route=trace.route, status=status)
+            _recent.append(trace)
+            _current_trace.reset(token)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Times graph nodes, tool calls and LLM calls of an agent run and counts LLM tokens.
+    Pass it in the run's config callbacks; LLM calls made inside tools inherit it.
+    """
+
+    # Called on the event loop instead of a thread pool; it only does bookkeeping
+    run_inline = True
+
+    def __init__(self):
+        self._started = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # Only the node's own run, not the runnables inside it
+        if node and kwargs.get("name") == node:
+            self._started[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started:
+            NODE_DURATION.observe(time.perf_counter() - started[1], node=started[0])
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.on_chain_end(None, run_id=run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._started[run_id] = ((serialized or {}).get("name") or kwargs.get("name", "unknown"), time.perf_counter())
+
+    def _tool_done(self, run_id, status):
+        started = self._started.pop(run_id, None)
+        if started:
+            elapsed = time.perf_counter() - started[1]
+            TOOL_DURATION.observe(elapsed, tool=started[0], status=status)
+            trace = _current_trace.get()
+            if trace:
+                trace.add_tool(started[0], elapsed)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._tool_done(run_id, "ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._tool_done(run_id, "error")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._started[run_id] = ((metadata or {}).get("langgraph_node", "none"), time.perf_counter())
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self.on_chat_model_start(serialized, prompts, run_id=run_id, metadata=metadata)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if not started:
+            return
+        node, elapsed = started[0], time.perf_counter() - started[1]
+        LLM_DURATION.observe(elapsed, node=node)
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+        LLM_TOKENS.inc(input_tokens, node=node, type="input")
+        LLM_TOKENS.inc(output_tokens, node=node, type="output")
+        trace = _current_trace.get()
+        if trace:
+            trace.add_llm(elapsed, input_tokens + output_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started:
+            LLM_DURATION.observe(time.perf_counter() - started[1], node=started[0])
+
+
+# One handler serves every run; it keys its timers by run id
+metrics_callbacks = MetricsCallbackHandler()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _sql_started(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _sql_finished(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    words = statement.split(None, 1)
+    SQL_DURATION.observe(elapsed, operation=words[0].upper() if words else "OTHER")
+    trace = _current_trace.get()
+    if trace:
+        trace.add_sql(elapsed)
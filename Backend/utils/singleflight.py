@@ -0,0 +1,121 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Future
+from utils.metrics import Counter
+
+
+# Set to false to run every call on its own, e.g. to measure what coalescing saves
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+CALLS = Counter(
+    "singleflight_calls_total",
+    "Calls through a single-flight group; coalesced ones shared another call's result",
+    ["flight", "outcome"],
+)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution whose result (or
+    exception) every caller receives. Nothing is cached: once the call finishes the key
+    is free, and the next caller starts a new one. A failure is shared by the callers
+    that were waiting on it, and the one after them tries again.
+
+    `do` is for threads, `ado` for coroutines; the two keep separate sets of calls.
+
+    Args:
+        name (str): Label for the metrics.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._tasks = {}    # key -> [task, number of callers awaiting it]
+
+    def do(self, key, func, *args, **kwargs):
+        """Runs func(*args, **kwargs) unless a call with the same key is running, in which case it waits for that one."""
+        if key is None or not SINGLE_FLIGHT_ENABLED:
+            return func(*args, **kwargs)
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            CALLS.inc(flight=self.name, outcome="coalesced")
+            return future.result()
+        CALLS.inc(flight=self.name, outcome="leader")
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def ado(self, key, func, *args, **kwargs):
+        """
+        Awaits func(*args, **kwargs) unless a call with the same key is running, in which
+        case it awaits that one.
+
+        The call runs as its own task, so a caller that is cancelled only stops waiting;
+        the call itself is cancelled once no caller is waiting for it any more.
+        """
+        if key is None or not SINGLE_FLIGHT_ENABLED:
+            return await func(*args, **kwargs)
+        entry = self._tasks.get(key)
+        if entry is None or entry[0].done():
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            entry = self._tasks[key] = [task, 0]
+            task.add_done_callback(functools.partial(self._task_done, key))
+            CALLS.inc(flight=self.name, outcome="leader")
+        else:
+            CALLS.inc(flight=self.name, outcome="coalesced")
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                entry[1] -= 1
+                if entry[1] == 0:
+                    task.cancel()
+                    # Later callers start afresh instead of joining a call being cancelled
+                    if self._tasks.get(key) is entry:
+                        del self._tasks[key]
+            raise
+
+    def _task_done(self, key, task):
+        entry = self._tasks.get(key)
+        if entry is not None and entry[0] is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Mark the exception retrieved, for when every caller was cancelled before it was raised
+            task.exception()
+
+    def wrap(self, func, key):
+        """Returns func coalesced by key(*args, **kwargs); a None key runs the call on its own."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.do(key(*args, **kwargs), func, *args, **kwargs)
+        return wrapper
+
+    def awrap(self, func, key):
+        """Async counterpart of `wrap` for a coroutine function."""
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await self.ado(key(*args, **kwargs), func, *args, **kwargs)
+        return wrapper
+
+    def stats(self) -> dict:
+        return {
+            "leader": CALLS.value(flight=self.name, outcome="leader"),
+            "coalesced": CALLS.value(flight=self.name, outcome="coalesced"),
+        }